@@ -0,0 +1,189 @@
+"""
+FreshRoute Logistics - Address Matching
+
+Normalization and fuzzy clustering of recipient addresses, so spellings
+such as "12 Main St." and "12 main street" are counted as one place.
+
+Fuzzy comparison is limited with a blocking index: each address is filed
+under keys made of its house number and the first or last characters of
+one of its words, and only addresses that share a key are compared.
+Addresses with different house numbers or street types are never merged.
+"""
+
+import collections
+import re
+from difflib import SequenceMatcher
+
+
+# Similarity (0-1) two normalized addresses need to be clustered together
+DEFAULT_SIMILARITY = 0.85
+
+# Blocks larger than this are not compared pairwise; the addresses in them
+# are still matched through their other, more selective keys
+MAX_BLOCK_SIZE = 200
+
+# Spellings folded to one standard abbreviation
+ABBREVIATIONS = {
+    "street": "st", "str": "st",
+    "avenue": "ave", "av": "ave",
+    "road": "rd",
+    "boulevard": "blvd",
+    "drive": "dr",
+    "lane": "ln",
+    "court": "ct",
+    "place": "pl",
+    "highway": "hwy",
+    "building": "bldg",
+    "apartment": "apt",
+    "suite": "ste",
+    "floor": "fl",
+    "barangay": "brgy",
+    "subdivision": "subd",
+    "north": "n", "south": "s", "east": "e", "west": "w",
+}
+
+# Thoroughfare types; "12 Rizal St" and "12 Rizal Ave" are different places
+STREET_TYPES = frozenset({"st", "ave", "rd", "blvd", "dr", "ln", "ct", "pl", "hwy"})
+
+# Characters of each word used as prefix/suffix blocking keys
+BLOCKING_NGRAM = 3
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_NUMBER_SUFFIX = re.compile(r"^(\d+)(st|nd|rd|th)$")
+
+
+def normalize_address(address):
+    """
+    Reduce an address to a canonical form for matching.
+    
+    Lowercases, drops punctuation, folds common abbreviations and
+    collapses whitespace.
+    
+    Args:
+        address (str): Address as entered
+    
+    Returns:
+        str: Normalized address, e.g. "12 main st" for "12 Main Street."
+    """
+    words = _PUNCTUATION.sub(" ", (address or "").lower()).split()
+    normalized = []
+    for word in words:
+        match = _NUMBER_SUFFIX.match(word)
+        if match:
+            word = match.group(1)
+        normalized.append(ABBREVIATIONS.get(word, word))
+    return " ".join(normalized)
+
+
+def _parts(normalized):
+    """Split a normalized address into (house numbers, street types, name)."""
+    words = normalized.split()
+    numbers = tuple(w for w in words if w.isdigit())
+    types = frozenset(w for w in words if w in STREET_TYPES)
+    name = " ".join(w for w in words if not w.isdigit() and w not in STREET_TYPES)
+    return numbers, types, name
+
+
+def blocking_keys(normalized):
+    """
+    Get the blocking keys for a normalized address.
+    
+    Each name word gives a key from its first and one from its last few
+    characters, paired with the house numbers, so a typo at either end of
+    a word still leaves a shared key.
+    
+    Args:
+        normalized (str): Output of normalize_address
+    
+    Returns:
+        set: Hashable keys; addresses are only compared with others
+            sharing at least one key
+    """
+    numbers, _types, name = _parts(normalized)
+    keys = set()
+    for word in name.split():
+        keys.add((numbers, word[:BLOCKING_NGRAM] + "*"))
+        keys.add((numbers, "*" + word[-BLOCKING_NGRAM:]))
+    return keys or {(numbers, normalized)}
+
+
+def similarity(a, b):
+    """
+    Score how alike two normalized addresses are.
+    
+    Args:
+        a (str): Normalized address
+        b (str): Normalized address
+    
+    Returns:
+        float: 0 to 1 from the street names; always 0 when the house
+            numbers or street types differ
+    """
+    if a == b:
+        return 1.0
+    numbers_a, types_a, name_a = _parts(a)
+    numbers_b, types_b, name_b = _parts(b)
+    if numbers_a != numbers_b or types_a != types_b:
+        return 0.0
+    return SequenceMatcher(None, name_a, name_b).ratio()
+
+
+def cluster_addresses(counts, threshold=DEFAULT_SIMILARITY):
+    """
+    Group near-duplicate addresses together.
+    
+    Args:
+        counts (dict): Address as entered -> number of packages
+        threshold (float): Minimum similarity to merge two addresses
+    
+    Returns:
+        list: (address, count, variants) per cluster, largest first;
+            address is the most common spelling in the cluster and
+            variants lists every spelling seen
+    """
+    # Exact matches after normalization need no fuzzy comparison
+    groups = {}
+    for address, count in counts.items():
+        groups.setdefault(normalize_address(address), {})[address] = count
+    
+    names = sorted(groups)
+    parent = list(range(len(names)))
+    
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+    
+    blocks = collections.defaultdict(list)
+    for i, name in enumerate(names):
+        for key in blocking_keys(name):
+            blocks[key].append(i)
+    
+    compared = set()
+    for members in blocks.values():
+        if len(members) < 2 or len(members) > MAX_BLOCK_SIZE:
+            continue
+        for pos, i in enumerate(members):
+            for j in members[pos + 1:]:
+                if (i, j) in compared or find(i) == find(j):
+                    continue
+                compared.add((i, j))
+                a, b = names[i], names[j]
+                if similarity(a, b) >= threshold:
+                    parent[find(j)] = find(i)
+    
+    clusters = {}
+    for i, name in enumerate(names):
+        clusters.setdefault(find(i), []).append(groups[name])
+    
+    result = []
+    for members in clusters.values():
+        # Name the cluster by the most common spelling of its most common
+        # normalized form
+        main = min(members, key=lambda variants: -sum(variants.values()))
+        address = min(main, key=lambda addr: (-main[addr], addr))
+        variants = sorted(addr for group in members for addr in group)
+        result.append((address, sum(sum(group.values()) for group in members), variants))
+    result.sort(key=lambda cluster: (-cluster[1], cluster[0]))
+    return result
@@ -0,0 +1,444 @@
+"""
+FreshRoute Logistics - Report Aggregates
+
+Reports expressed as mergeable aggregates over packages. An aggregate
+holds the read-only context a report needs (routes, parameters) and works
+on separate "partial" results: packages are added to a partial, and
+partials computed on different chunks of the data can be merged. That
+lets a report run over one stream of packages, or over chunks of the
+packages spread across a process pool with run_parallel.
+"""
+
+import bisect
+import collections
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from addresses import DEFAULT_SIMILARITY, cluster_addresses
+from database_sqlite import PACKAGE_COLUMNS
+from models import Package
+from routing import DEFAULT_VEHICLE, ROUTE_MATRICES, estimate_fuel
+
+
+class ReportAggregate:
+    """Base class for a report computed by adding packages to partials."""
+    
+    # Package fields add() reads, or None for all of them. run_parallel
+    # only sends these to its workers, and the Package objects built there
+    # have no other attributes set.
+    fields = None
+    
+    def new_partial(self):
+        """
+        Create an empty partial result.
+        
+        Returns:
+            Partial result for add() and merge()
+        """
+        raise NotImplementedError
+    
+    def add(self, partial, package):
+        """
+        Count one package into a partial result.
+        
+        Args:
+            partial: Partial result to update in place
+            package (Package): Package to count
+        """
+        raise NotImplementedError
+    
+    def merge(self, partial, other):
+        """
+        Fold another partial result into this one.
+        
+        Args:
+            partial: Partial result to update in place
+            other: Partial result from a later chunk of packages
+        """
+        raise NotImplementedError
+    
+    def result(self, partial):
+        """
+        Turn a complete partial result into the report result.
+        
+        Args:
+            partial: Partial result covering every package
+        
+        Returns:
+            The same value as the report's serial compute function
+        """
+        return partial
+
+
+class DeliveredPerDay(ReportAggregate):
+    """Delivered packages grouped by delivery day over a date range."""
+    
+    def __init__(self, start_date, end_date):
+        """
+        Initialize the aggregate.
+        
+        Args:
+            start_date (str): First day (YYYY-MM-DD), inclusive
+            end_date (str): Last day (YYYY-MM-DD), inclusive
+        """
+        self.start_date = start_date
+        self.end_date = end_date
+    
+    def new_partial(self):
+        return {}
+    
+    def add(self, partial, package):
+        if package.status == "Delivered" and package.delivered_at:
+            day = package.delivered_at[:10]
+            if self.start_date <= day <= self.end_date:
+                partial.setdefault(day, []).append(package)
+    
+    def merge(self, partial, other):
+        for day, packages in other.items():
+            partial.setdefault(day, []).extend(packages)
+    
+    def result(self, partial):
+        return dict(sorted(partial.items()))
+
+
+class DelayedDeliveries(ReportAggregate):
+    """Packages not delivered yet: pending ones, then those out for delivery."""
+    
+    STATUSES = ("Pending", "Out for Delivery")
+    
+    def new_partial(self):
+        return {status: [] for status in self.STATUSES}
+    
+    def add(self, partial, package):
+        if package.status in partial:
+            partial[package.status].append(package)
+    
+    def merge(self, partial, other):
+        for status, packages in other.items():
+            partial[status].extend(packages)
+    
+    def result(self, partial):
+        return [pkg for status in self.STATUSES for pkg in partial[status]]
+
+
+class DeliveryAging(ReportAggregate):
+    """
+    Age histogram and the K oldest undelivered packages.
+    
+    Only K packages are kept at any time (in a min-heap on age), so the
+    report stays small however many packages are waiting.
+    """
+    
+    STATUSES = ("Pending", "Out for Delivery")
+    
+    def __init__(self, top_k, bucket_hours, now=None):
+        """
+        Initialize the aggregate.
+        
+        Args:
+            top_k (int): Number of oldest packages to keep
+            bucket_hours: Ascending SLA thresholds in hours, e.g. (24, 48, 72)
+            now (datetime): Time ages are measured from (default now)
+        """
+        self.top_k = top_k
+        self.bucket_hours = tuple(bucket_hours)
+        self.now = now or datetime.now()
+    
+    def bucket_labels(self):
+        """
+        Get a label for each age bucket.
+        
+        Returns:
+            list: Labels such as "< 24h", "24-48h" and ">= 72h"
+        """
+        if not self.bucket_hours:
+            return ["all"]
+        bounds = self.bucket_hours
+        labels = [f"< {bounds[0]}h"]
+        labels += [f"{low}-{high}h" for low, high in zip(bounds, bounds[1:])]
+        labels.append(f">= {bounds[-1]}h")
+        return labels
+    
+    def new_partial(self):
+        return {"counts": [0] * (len(self.bucket_hours) + 1), "oldest": []}
+    
+    def add(self, partial, package):
+        if package.status not in self.STATUSES:
+            return
+        try:
+            age = (self.now - datetime.fromisoformat(package.created_at)).total_seconds() / 3600
+        except (TypeError, ValueError):
+            return
+        partial["counts"][bisect.bisect_right(self.bucket_hours, age)] += 1
+        self._keep(partial["oldest"], (age, package.package_id, package))
+    
+    def merge(self, partial, other):
+        partial["counts"] = [a + b for a, b in zip(partial["counts"], other["counts"])]
+        for entry in other["oldest"]:
+            self._keep(partial["oldest"], entry)
+    
+    def result(self, partial):
+        oldest = sorted(partial["oldest"], key=lambda entry: entry[:2], reverse=True)
+        return {
+            "total": sum(partial["counts"]),
+            "buckets": dict(zip(self.bucket_labels(), partial["counts"])),
+            "oldest": [(package, age) for age, _package_id, package in oldest],
+        }
+    
+    def _keep(self, heap, entry):
+        """Push an (age, id, package) entry, keeping only the top_k oldest."""
+        if len(heap) < self.top_k:
+            heapq.heappush(heap, entry)
+        elif entry[:2] > heap[0][:2]:
+            heapq.heapreplace(heap, entry)
+
+
+class ProblematicAddresses(ReportAggregate):
+    """
+    Addresses with more than one undelivered package.
+    
+    Spellings of the same address ("12 Main St." and "12 main street")
+    are clustered together with addresses.cluster_addresses and reported
+    under their most common spelling.
+    """
+    
+    fields = ('status', 'recipient_address')
+    
+    def __init__(self, threshold=DEFAULT_SIMILARITY):
+        """
+        Initialize the aggregate.
+        
+        Args:
+            threshold (float): Minimum similarity to treat two addresses
+                as the same place
+        """
+        self.threshold = threshold
+    
+    def new_partial(self):
+        return {}
+    
+    def add(self, partial, package):
+        if package.status != "Delivered":
+            addr = package.recipient_address
+            partial[addr] = partial.get(addr, 0) + 1
+    
+    def merge(self, partial, other):
+        for addr, count in other.items():
+            partial[addr] = partial.get(addr, 0) + count
+    
+    def result(self, partial):
+        return {addr: count for addr, count, _variants in cluster_addresses(partial, self.threshold)
+                if count > 1}
+
+
+class DriverPerformance(ReportAggregate):
+    """Assigned and delivered package counts per driver."""
+    
+    fields = ('package_id', 'status')
+    
+    def __init__(self, routes):
+        """
+        Initialize the aggregate.
+        
+        Args:
+            routes: Route objects whose drivers are reported
+        """
+        self.drivers = list(dict.fromkeys(route.driver_name for route in routes))
+        # A package listed on several routes counts once for each of them
+        self.package_drivers = {}
+        for route in routes:
+            for pkg_id in route.package_ids:
+                self.package_drivers.setdefault(pkg_id, []).append(route.driver_name)
+    
+    def new_partial(self):
+        return {}
+    
+    def add(self, partial, package):
+        for driver in self.package_drivers.get(package.package_id, ()):
+            stats = partial.setdefault(driver, [0, 0])
+            stats[0] += 1
+            if package.status == "Delivered":
+                stats[1] += 1
+    
+    def merge(self, partial, other):
+        for driver, (assigned, delivered) in other.items():
+            stats = partial.setdefault(driver, [0, 0])
+            stats[0] += assigned
+            stats[1] += delivered
+    
+    def result(self, partial):
+        driver_stats = {}
+        for driver in self.drivers:
+            assigned, delivered = partial.get(driver, (0, 0))
+            driver_stats[driver] = {"assigned": assigned, "delivered": delivered}
+        return driver_stats
+
+
+class SummaryStatistics(ReportAggregate):
+    """Totals in the summary.json format (see summary.build_summary)."""
+    
+    fields = ('status', 'delivered_at')
+    
+    def __init__(self, routes):
+        """
+        Initialize the aggregate.
+        
+        Args:
+            routes: Route objects to total
+        """
+        self.total_routes = len(routes)
+        self.assigned_packages = sum(len(route.package_ids) for route in routes)
+    
+    def new_partial(self):
+        return {"packages_by_status": collections.Counter(), "delivered_per_day": collections.Counter()}
+    
+    def add(self, partial, package):
+        partial["packages_by_status"][package.status] += 1
+        if package.status == "Delivered" and package.delivered_at:
+            partial["delivered_per_day"][package.delivered_at[:10]] += 1
+    
+    def merge(self, partial, other):
+        partial["packages_by_status"].update(other["packages_by_status"])
+        partial["delivered_per_day"].update(other["delivered_per_day"])
+    
+    def result(self, partial):
+        return {
+            "total_packages": sum(partial["packages_by_status"].values()),
+            "packages_by_status": dict(partial["packages_by_status"]),
+            "delivered_per_day": dict(partial["delivered_per_day"]),
+            "total_routes": self.total_routes,
+            "assigned_packages": self.assigned_packages,
+        }
+
+
+class FuelUsage(ReportAggregate):
+    """Estimated fuel and distance per route from its stops' locations."""
+    
+    def __init__(self, routes, vehicle=DEFAULT_VEHICLE):
+        """
+        Initialize the aggregate.
+        
+        Args:
+            routes: Route objects to estimate
+            vehicle (str): Vehicle fuel profile (see routing.VEHICLE_PROFILES)
+        """
+        self.routes = list(routes)
+        self.vehicle = vehicle
+        self.stop_ids = {pkg_id for route in self.routes for pkg_id in route.package_ids}
+    
+    def new_partial(self):
+        return {}
+    
+    def add(self, partial, package):
+        if package.package_id in self.stop_ids:
+            partial[package.package_id] = package
+    
+    def merge(self, partial, other):
+        partial.update(other)
+    
+    def result(self, partial):
+        usage = []
+        for route in self.routes:
+            packages = [partial[pkg_id] for pkg_id in route.package_ids if pkg_id in partial]
+            liters, distance = estimate_fuel(ROUTE_MATRICES.get(route, packages), self.vehicle)
+            usage.append((route, liters, distance))
+        return usage
+
+
+def run_serial(aggregate, packages):
+    """
+    Compute an aggregate over packages in this process.
+    
+    Args:
+        aggregate (ReportAggregate): Report to compute
+        packages: Iterable of Package objects
+    
+    Returns:
+        The report result
+    """
+    partial = aggregate.new_partial()
+    for package in packages:
+        aggregate.add(partial, package)
+    return aggregate.result(partial)
+
+
+def run_combined(aggregates, packages):
+    """
+    Compute several aggregates in one pass over the packages.
+    
+    Args:
+        aggregates (dict): Name -> ReportAggregate
+        packages: Iterable of Package objects
+    
+    Returns:
+        dict: Name -> report result
+    """
+    partials = {name: aggregate.new_partial() for name, aggregate in aggregates.items()}
+    adders = [(aggregate.add, partials[name]) for name, aggregate in aggregates.items()]
+    for package in packages:
+        for add, partial in adders:
+            add(partial, package)
+    return {name: aggregate.result(partials[name]) for name, aggregate in aggregates.items()}
+
+
+def run_parallel(aggregate, package_db, workers=None, status=None):
+    """
+    Compute an aggregate over chunks of the packages in a process pool.
+    
+    The packages are read once, in this process, as tuples of just the
+    aggregate's fields (package_db.package_rows), so every worker sees the
+    same snapshot and the file is parsed only once. Each worker gets one
+    contiguous chunk of tuples and builds the Package objects itself; only
+    the tuples, the aggregate and the partial results are pickled. Chunks
+    are merged in order, so the result matches run_serial.
+    
+    The read and the pickling are not parallel: on "json" and "journal"
+    storage, parsing the file stays a serial cost that more workers do
+    not reduce.
+    
+    Args:
+        aggregate (ReportAggregate): Report to compute; sent once to each
+            worker process
+        package_db (PackageDatabase): Package database instance
+        workers (int): Worker processes (default: one per CPU)
+        status: Only count packages with this status, or with any of a
+            tuple of statuses, if given
+    
+    Returns:
+        The report result
+    """
+    workers = workers or os.cpu_count() or 1
+    rows = package_db.package_rows(status, aggregate.fields)
+    total = aggregate.new_partial()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(aggregate,)) as executor:
+        futures = [executor.submit(_aggregate_rows, rows[len(rows) * i // workers:len(rows) * (i + 1) // workers])
+                   for i in range(workers)]
+        for future in futures:
+            aggregate.merge(total, future.result())
+    return aggregate.result(total)
+
+
+# Aggregate sent to this worker process by run_parallel
+_worker_aggregate = None
+
+
+def _init_worker(aggregate):
+    global _worker_aggregate
+    _worker_aggregate = aggregate
+
+
+def _aggregate_rows(rows):
+    aggregate = _worker_aggregate
+    partial = aggregate.new_partial()
+    if aggregate.fields is None:
+        for row in rows:
+            aggregate.add(partial, Package.from_dict(dict(zip(PACKAGE_COLUMNS, row))))
+        return partial
+    for row in rows:
+        package = Package.__new__(Package)
+        for field, value in zip(aggregate.fields, row):
+            setattr(package, field, value)
+        aggregate.add(partial, package)
+    return partial
@@ -0,0 +1,260 @@
+"""
+FreshRoute Logistics - Automatic Package Assignment
+
+Assigns unassigned packages to a day's routes without exceeding each
+route's weight capacity. Packages are placed heaviest first, each on the
+route with the most capacity left (worst-fit decreasing), which keeps
+loads balanced across drivers. A plan is plain data (route ID -> package
+IDs), so it can be shown first and committed as is; commit_assignment
+saves it with one assign_packages and one add_packages_to_routes call.
+
+Before a day has routes, propose_routes drafts them: located packages are
+swept by bearing around the depot and cut into one sector per driver,
+balanced by stop count and weight.
+"""
+
+import bisect
+import heapq
+import itertools
+import math
+from joins import join_routes_packages
+from models import Route
+from routing import DEFAULT_VEHICLE, DEPOT_LOCATION, VEHICLE_PROFILES, np, package_location
+
+
+def package_weight(package):
+    """Weight of a package in kg; a missing weight counts as 0."""
+    return package.weight or 0.0
+
+
+def plan_assignment(packages, routes, loads, capacities):
+    """
+    Decide which route each package goes on.
+    
+    Args:
+        packages: Unassigned Package objects; they are not modified
+        routes: Route objects to fill
+        loads (dict): Route ID -> kg already on the route
+        capacities (dict): Route ID -> maximum kg for the route
+    
+    Returns:
+        tuple: (plan, leftover) where plan maps route ID -> list of
+            package IDs to add, and leftover lists the IDs of packages
+            that fit on no route
+    """
+    # Max-heap on remaining capacity; route order breaks ties
+    heap = [(-(capacities[route.route_id] - loads.get(route.route_id, 0.0)), n, route.route_id)
+            for n, route in enumerate(routes)]
+    heapq.heapify(heap)
+    plan = {route.route_id: [] for route in routes}
+    leftover = []
+    for package in sorted(packages, key=lambda pkg: (-package_weight(pkg), pkg.package_id)):
+        weight = package_weight(package)
+        if not heap or -heap[0][0] < weight:
+            # Not even the emptiest route can take it
+            leftover.append(package.package_id)
+            continue
+        remaining, n, route_id = heap[0]
+        plan[route_id].append(package.package_id)
+        heapq.heapreplace(heap, (remaining + weight, n, route_id))
+    return plan, leftover
+
+
+def auto_assign(package_db, route_db, date, vehicle=DEFAULT_VEHICLE, capacities=None, commit=True):
+    """
+    Assign the unassigned packages to the active routes of a day.
+    
+    Args:
+        package_db (PackageDatabase): Package database instance
+        route_db (RouteDatabase): Route database instance
+        date (str): Day whose routes are filled (YYYY-MM-DD)
+        vehicle (str): Vehicle profile giving the default route capacity
+            (see routing.VEHICLE_PROFILES)
+        capacities (dict): Route ID -> kg, overriding the vehicle capacity
+            for some routes
+        commit (bool): Save the assignment; False only plans it, and the
+            "assigned" plan can be saved later with commit_assignment
+    
+    Returns:
+        dict: "assigned" (route ID -> package IDs added), "unassigned"
+            (IDs of packages that did not fit), "loads" (route ID -> kg
+            after assignment) and "capacities" (route ID -> kg)
+    """
+    routes = [route for route in route_db.get_routes_by_date(date) if route.status == "Active"]
+    default_capacity = VEHICLE_PROFILES[vehicle]["capacity_kg"]
+    capacities = {route.route_id: (capacities or {}).get(route.route_id, default_capacity) for route in routes}
+    loads = {route.route_id: sum(package_weight(pkg) for pkg in packages)
+             for route, packages in join_routes_packages(routes, package_db)}
+    
+    packages = package_db.get_unassigned_packages()
+    plan, leftover = plan_assignment(packages, routes, loads, capacities)
+    
+    weights = {pkg.package_id: package_weight(pkg) for pkg in packages}
+    for route_id, package_ids in plan.items():
+        loads[route_id] += sum(weights[pid] for pid in package_ids)
+    assigned = {route_id: package_ids for route_id, package_ids in plan.items() if package_ids}
+    
+    if commit:
+        assigned = commit_assignment(package_db, route_db, assigned)
+    
+    return {
+        "assigned": assigned,
+        "unassigned": leftover,
+        "loads": loads,
+        "capacities": capacities,
+    }
+
+
+def commit_assignment(package_db, route_db, assigned):
+    """
+    Save a plan made by auto_assign.
+    
+    The packages are re-read under the database's write lock, so ones
+    that were assigned elsewhere after planning are left alone.
+    
+    Args:
+        package_db (PackageDatabase): Package database instance
+        route_db (RouteDatabase): Route database instance
+        assigned (dict): Route ID -> package IDs, the "assigned" plan
+    
+    Returns:
+        dict: Route ID -> IDs of the packages actually assigned
+    """
+    if not assigned:
+        return {}
+    saved = package_db.assign_packages(assigned)
+    route_db.add_packages_to_routes(saved)
+    return {route_id: package_ids for route_id, package_ids in saved.items() if package_ids}
+
+
+def sweep_order(locations, depot=DEPOT_LOCATION):
+    """
+    Order points by bearing around the depot.
+    
+    The sweep starts just after the widest empty angle, so a group of
+    nearby points is not split between the first and last sector.
+    
+    Args:
+        locations: Sequence of (latitude, longitude) tuples
+        depot (tuple): (latitude, longitude) of the depot
+    
+    Returns:
+        list: Indexes into locations in sweep order
+    """
+    if not locations:
+        return []
+    # Equirectangular projection is accurate enough for bearings in a city
+    scale = math.cos(math.radians(depot[0]))
+    if np is not None:
+        coords = np.asarray(locations, dtype=float)
+        angles = np.arctan2(coords[:, 0] - depot[0], (coords[:, 1] - depot[1]) * scale)
+        order = np.argsort(angles, kind="stable")
+        sorted_angles = angles[order]
+        gaps = np.diff(np.append(sorted_angles, sorted_angles[0] + 2 * math.pi))
+        start = (int(gaps.argmax()) + 1) % len(order)
+        return np.roll(order, -start).tolist()
+    angles = [math.atan2(lat - depot[0], (lon - depot[1]) * scale) for lat, lon in locations]
+    order = sorted(range(len(angles)), key=angles.__getitem__)
+    sorted_angles = [angles[i] for i in order]
+    gaps = [b - a for a, b in zip(sorted_angles, sorted_angles[1:])]
+    gaps.append(sorted_angles[0] + 2 * math.pi - sorted_angles[-1])
+    start = (max(range(len(gaps)), key=gaps.__getitem__) + 1) % len(order)
+    return order[start:] + order[:start]
+
+
+def split_balanced(weights, parts):
+    """
+    Cut a sequence into contiguous runs of about equal stops and weight.
+    
+    Each item's share is the mean of its share of the stops and its share
+    of the total weight; a run ends where the running share passes the
+    next 1/parts boundary.
+    
+    Args:
+        weights: Item weights in sequence order
+        parts (int): Number of runs
+    
+    Returns:
+        list: parts (start, end) index pairs; runs may be empty when there
+            are fewer items than parts
+    """
+    count = len(weights)
+    total = sum(weights)
+    if np is not None:
+        if total:
+            shares = 0.5 / count + np.asarray(weights, dtype=float) * (0.5 / total)
+        else:
+            shares = np.full(count, 1.0 / count if count else 0.0)
+        # An item belongs to the run its share midpoint falls in
+        midpoints = np.cumsum(shares) - shares / 2
+        cuts = np.searchsorted(midpoints, np.arange(1, parts) / parts).tolist()
+    else:
+        shares = [0.5 / count + 0.5 * w / total if total else 1.0 / count for w in weights]
+        midpoints = [c - s / 2 for c, s in zip(itertools.accumulate(shares), shares)]
+        cuts = [bisect.bisect_left(midpoints, j / parts) for j in range(1, parts)]
+    bounds = [0, *cuts, count]
+    return list(zip(bounds, bounds[1:]))
+
+
+def propose_routes(packages, date, driver_count, depot=DEPOT_LOCATION):
+    """
+    Draft one route per driver from packages' locations.
+    
+    Args:
+        packages: Package objects to route, usually get_unassigned_packages()
+        date (str): Date of the drafted routes (YYYY-MM-DD)
+        driver_count (int): Number of routes to draft
+        depot (tuple): (latitude, longitude) the routes start from
+    
+    Returns:
+        tuple: (routes, unlocated) where routes are draft Route objects
+            with IDs DRAFT01, DRAFT02, ... (empty sectors are dropped) and
+            unlocated lists packages without coordinates
+    """
+    located = []
+    unlocated = []
+    for package in packages:
+        (located if package_location(package) else unlocated).append(package)
+    
+    order = sweep_order([package_location(pkg) for pkg in located], depot)
+    swept = [located[i] for i in order]
+    routes = []
+    for start, end in split_balanced([package_weight(pkg) for pkg in swept], driver_count):
+        if start == end:
+            continue
+        number = len(routes) + 1
+        route = Route(f"DRAFT{number:02d}", f"{date} Sector {number}", f"Driver {number}", "", date)
+        route.package_ids = [pkg.package_id for pkg in swept[start:end]]
+        routes.append(route)
+    return routes, unlocated
+
+
+def save_proposed_routes(route_db, package_db, routes):
+    """
+    Save draft routes under new route IDs and assign their packages.
+    
+    The routes are added empty first; their packages are then assigned
+    like a commit_assignment plan, so packages assigned elsewhere since
+    the drafts were made are left where they are.
+    
+    Args:
+        route_db (RouteDatabase): Route database instance
+        package_db (PackageDatabase): Package database instance
+        routes: Draft Route objects from propose_routes; their route_id is
+            replaced with the allocated ID and their package_ids with the
+            packages actually assigned
+    
+    Returns:
+        tuple: (routes, packages) numbers of routes created and packages
+            assigned; a route that could not be added gets no packages
+    """
+    plan = {}
+    for route in routes:
+        package_ids, route.package_ids = route.package_ids, []
+        route.route_id = route_db.next_route_id()
+        if route_db.add_route(route):
+            plan[route.route_id] = package_ids
+    saved = commit_assignment(package_db, route_db, plan)
+    for route in routes:
+        route.package_ids = list(saved.get(route.route_id, []))
+    return len(plan), sum(len(package_ids) for package_ids in saved.values())
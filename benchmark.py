@@ -0,0 +1,557 @@
+"""
+FreshRoute Logistics - Benchmarks
+
+Generates synthetic packages.json/routes.json datasets and times every
+database method and report against them, so results can be compared
+between commits.
+
+Run with:
+    python benchmark.py generate --packages 100000 --data-dir bench_data
+    python benchmark.py suite --sizes 10000 100000 --out results.json
+    python benchmark.py parallel --sizes 1000000 --workers 1 2 4 8 16
+    python benchmark.py compare baseline.json results.json
+    python benchmark.py models --sizes 100000 1000000
+"""
+
+import argparse
+import builtins
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from unittest import mock
+from database_packages import PackageDatabase
+from database_routes import RouteDatabase
+from models import Package, Route
+from routing import DEPOT_LOCATION
+from storage import write_json_atomic
+import reports
+
+
+DEFAULT_STATUS_WEIGHTS = {"Pending": 0.2, "Out for Delivery": 0.1, "Delivered": 0.7}
+
+STREETS = ("Main", "Rizal", "Mabini", "Bonifacio", "Luna", "Aguinaldo", "Quezon",
+           "Roxas", "Magsaysay", "Osmena", "Burgos", "Jacinto", "Del Pilar")
+STREET_TYPES = ("St", "Ave", "Rd", "Blvd")
+CATEGORIES = ("Electronics", "Documents", "Food", "Clothing", "Other")
+
+# Addresses are placed within this many degrees of the depot
+GEO_SPREAD = 0.15
+
+# Repeats per method when timing warm calls
+WARM_REPEATS = 5
+
+
+def generate_dataset(package_count, packages_per_route=40, status_weights=None,
+                     assigned_ratio=0.8, days=30, start_date="2025-11-01", seed=0):
+    """
+    Build a consistent synthetic set of package and route records.
+    
+    Args:
+        package_count (int): Number of packages
+        packages_per_route (int): Average stops per route
+        status_weights (dict): Relative weight of each status
+        assigned_ratio (float): Share of packages assigned to a route;
+            Out for Delivery and Delivered packages are always assigned
+        days (int): Number of days the data is spread over
+        start_date (str): First day (YYYY-MM-DD)
+        seed (int): Random seed so runs are repeatable
+    
+    Returns:
+        tuple: (package records, route records) as stored in the JSON files
+    """
+    rng = random.Random(seed)
+    weights = status_weights or DEFAULT_STATUS_WEIGHTS
+    statuses = rng.choices(list(weights), list(weights.values()), k=package_count)
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    
+    routes_per_day = max(1, round(package_count * assigned_ratio / packages_per_route / days))
+    drivers = [f"Driver {i}" for i in range(1, max(routes_per_day, 2) + 1)]
+    routes = []
+    for day in range(days):
+        date = (start + timedelta(days=day)).strftime("%Y-%m-%d")
+        for n in range(routes_per_day):
+            route = Route(f"RT{len(routes) + 1:04d}", f"Route {date} #{n + 1}", drivers[n],
+                          f"0911{rng.randint(0, 9999999):07d}", date)
+            route.created_at = f"{date}T06:00:00"
+            routes.append(route)
+    
+    address_pool = [f"{rng.randint(1, 999)} {rng.choice(STREETS)} {rng.choice(STREET_TYPES)}"
+                    for _ in range(max(50, package_count // 3))]
+    # Coordinates come from their own generator so the other fields stay
+    # the same as in datasets generated before packages had locations
+    geo_rng = random.Random(seed + 1)
+    locations = {address: (round(DEPOT_LOCATION[0] + geo_rng.uniform(-GEO_SPREAD, GEO_SPREAD), 6),
+                           round(DEPOT_LOCATION[1] + geo_rng.uniform(-GEO_SPREAD, GEO_SPREAD), 6))
+                 for address in address_pool}
+    packages = []
+    for i, status in enumerate(statuses, start=1):
+        day = rng.randrange(days)
+        created = start + timedelta(days=day, seconds=rng.randrange(8 * 3600))
+        pkg = Package(f"PKG{i:04d}", f"Sender {rng.randint(1, 500)}", f"Recipient {i}",
+                      rng.choice(address_pool), f"0912{rng.randint(0, 9999999):07d}",
+                      round(rng.uniform(0.1, 30), 2), rng.choice(CATEGORIES), status)
+        pkg.latitude, pkg.longitude = locations[pkg.recipient_address]
+        pkg.created_at = pkg.updated_at = created.isoformat()
+        if status != "Pending" or rng.random() < assigned_ratio:
+            route = routes[day * routes_per_day + rng.randrange(routes_per_day)]
+            pkg.route_id = route.route_id
+            route.package_ids.append(pkg.package_id)
+        if status == "Delivered":
+            pkg.delivered_at = pkg.updated_at = (created + timedelta(hours=rng.uniform(1, 30))).isoformat()
+            pkg.proof_of_delivery = "Delivered successfully"
+        packages.append(pkg)
+    return [p.to_dict() for p in packages], [r.to_dict() for r in routes]
+
+
+def write_dataset(data_dir, package_records, route_records):
+    """
+    Write a dataset in the layout PackageDatabase and RouteDatabase expect.
+    
+    Args:
+        data_dir (str): Directory to write packages.json and routes.json to
+        package_records (list): Package dictionaries
+        route_records (list): Route dictionaries
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    write_json_atomic(os.path.join(data_dir, "packages.json"), package_records)
+    write_json_atomic(os.path.join(data_dir, "routes.json"), route_records)
+
+
+def time_call(func, repeats=WARM_REPEATS):
+    """
+    Time a call once cold and then several times warm.
+    
+    Args:
+        func: Callable taking no arguments
+        repeats (int): Number of warm calls
+    
+    Returns:
+        dict: cold_seconds and median warm_seconds
+    """
+    start = time.perf_counter()
+    func()
+    cold = time.perf_counter() - start
+    warm = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        warm.append(time.perf_counter() - start)
+    return {"cold_seconds": round(cold, 6), "warm_seconds": round(statistics.median(warm), 6)}
+
+
+def _sample_ids(records, key, count=50, seed=1):
+    rng = random.Random(seed)
+    return [r[key] for r in rng.sample(records, min(count, len(records)))]
+
+
+def database_benchmarks(package_db, route_db, package_records, route_records):
+    """
+    Build the list of database operations to time.
+    
+    Mutating operations undo themselves so every benchmark sees the same
+    data.
+    
+    Args:
+        package_db: Package database under test
+        route_db: Route database under test
+        package_records (list): Package dictionaries in the dataset
+        route_records (list): Route dictionaries in the dataset
+    
+    Returns:
+        list: (benchmark name, callable) pairs
+    """
+    package_id = _sample_ids(package_records, 'package_id', 1)[0]
+    package_ids = _sample_ids(package_records, 'package_id')
+    route_id = _sample_ids(route_records, 'route_id', 1)[0] if route_records else "RT0001"
+    route_sample = next((r for r in route_records if r['route_id'] == route_id), None)
+    date = route_sample['date'] if route_sample else "2025-11-01"
+    driver = route_sample['driver_name'] if route_sample else "Driver 1"
+    new_package = Package("PKGBENCH", "Sender", "Recipient", "1 Main St", "09120000000", 1.0, "Other")
+    new_packages = [Package(f"PKGBENCH{i}", "Sender", "Recipient", "1 Main St", "09120000000", 1.0, "Other")
+                    for i in range(50)]
+    new_route = Route("RTBENCH", "Bench", "Driver", "09110000000", date)
+    
+    def add_then_delete_package():
+        package_db.add_package(new_package)
+        package_db.delete_package(new_package.package_id)
+    
+    def add_then_delete_packages():
+        package_db.add_packages(new_packages)
+        for pkg in new_packages:
+            package_db.delete_package(pkg.package_id)
+    
+    def add_then_delete_route():
+        route_db.add_route(new_route)
+        route_db.delete_route(new_route.route_id)
+    
+    return [
+        ("PackageDatabase.get_all_packages", package_db.get_all_packages),
+        ("PackageDatabase.get_package_by_id", lambda: package_db.get_package_by_id(package_id)),
+        ("PackageDatabase.get_packages_by_ids", lambda: package_db.get_packages_by_ids(package_ids)),
+        ("PackageDatabase.get_packages_by_status", lambda: package_db.get_packages_by_status("Pending")),
+        ("PackageDatabase.get_packages_by_route", lambda: package_db.get_packages_by_route(route_id)),
+        ("PackageDatabase.get_unassigned_packages", package_db.get_unassigned_packages),
+        ("PackageDatabase.get_packages_delivered_between",
+         lambda: package_db.get_packages_delivered_between(date, date)),
+        ("PackageDatabase.iter_packages", lambda: sum(1 for _ in package_db.iter_packages("Delivered"))),
+        ("PackageDatabase.update_package",
+         lambda: package_db.update_package(package_db.get_package_by_id(package_id))),
+        ("PackageDatabase.update_packages",
+         lambda: package_db.update_packages(package_db.get_packages_by_ids(package_ids))),
+        ("PackageDatabase.add_package+delete_package", add_then_delete_package),
+        ("PackageDatabase.add_packages+delete_package", add_then_delete_packages),
+        ("PackageDatabase.next_package_id", package_db.next_package_id),
+        ("RouteDatabase.get_all_routes", route_db.get_all_routes),
+        ("RouteDatabase.get_route_by_id", lambda: route_db.get_route_by_id(route_id)),
+        ("RouteDatabase.get_routes_by_date", lambda: route_db.get_routes_by_date(date)),
+        ("RouteDatabase.get_routes_by_driver", lambda: route_db.get_routes_by_driver(driver)),
+        ("RouteDatabase.update_route", lambda: route_db.update_route(route_db.get_route_by_id(route_id))),
+        ("RouteDatabase.update_routes", lambda: route_db.update_routes(route_db.get_routes_by_date(date))),
+        ("RouteDatabase.add_route+delete_route", add_then_delete_route),
+        ("RouteDatabase.next_route_id", route_db.next_route_id),
+    ]
+
+
+def report_benchmarks(package_db, route_db, date):
+    """
+    Build the list of reports.py functions to time.
+    
+    Args:
+        package_db: Package database under test
+        route_db: Route database under test
+        date (str): Date answered when a report asks for one
+    
+    Returns:
+        list: (benchmark name, callable) pairs
+    """
+    calls = {
+        "report_packages_delivered_per_day": lambda: reports.report_packages_delivered_per_day(package_db),
+        "report_driver_performance": lambda: reports.report_driver_performance(route_db, package_db),
+        "report_delayed_deliveries": lambda: reports.report_delayed_deliveries(package_db),
+        "report_fuel_usage_estimates": lambda: reports.report_fuel_usage_estimates(route_db, package_db),
+        "report_problematic_addresses": lambda: reports.report_problematic_addresses(package_db),
+        "generate_summary_statistics": lambda: reports.generate_summary_statistics(package_db, route_db),
+        "report_all": lambda: reports.report_all(package_db, route_db),
+    }
+    out_dir = os.path.join(package_db.data_dir, "reports")
+    return [(f"reports.{name}", _headless(call, date, out_dir)) for name, call in calls.items()]
+
+
+def _headless(call, date, out_dir):
+    """Wrap an interactive report so it answers its own prompts silently."""
+    def answer(prompt=""):
+        if "YYYY-MM-DD" in prompt:
+            return date
+        if "(y/n)" in prompt:
+            return "n"
+        if "directory" in prompt:
+            return out_dir
+        return ""
+    
+    def run():
+        # Time the computation, not a result cached by an earlier call
+        reports.REPORT_CACHE.clear()
+        with mock.patch.object(builtins, "input", answer), contextlib.redirect_stdout(io.StringIO()):
+            call()
+    return run
+
+
+def run_suite(sizes, storages=("json",), indexed=False, skip=(), seed=0):
+    """
+    Time every database method and report for each dataset size and storage.
+    
+    Args:
+        sizes: Package counts to generate
+        storages: Storage engines to test
+        indexed (bool): Open the JSON databases in indexed mode
+        skip: Benchmark names to leave out (e.g. slow reports at 1M)
+        seed (int): Dataset random seed
+    
+    Returns:
+        list: One result dictionary per benchmark, size and storage
+    """
+    results = []
+    for size in sizes:
+        package_records, route_records = generate_dataset(size, seed=seed)
+        delivered = [r['delivered_at'][:10] for r in package_records if r['delivered_at']]
+        date = max(set(delivered), key=delivered.count) if delivered else "2025-11-01"
+        for storage in storages:
+            data_dir = tempfile.mkdtemp(prefix="freshroute-bench-")
+            try:
+                write_dataset(data_dir, package_records, route_records)
+                package_db = PackageDatabase(data_dir, indexed=indexed, storage=storage)
+                route_db = RouteDatabase(data_dir, indexed=indexed, storage=storage)
+                benchmarks = (database_benchmarks(package_db, route_db, package_records, route_records)
+                              + report_benchmarks(package_db, route_db, date))
+                for name, func in benchmarks:
+                    if name in skip:
+                        continue
+                    result = {"benchmark": name, "storage": storage, "indexed": indexed, "packages": size}
+                    result.update(time_call(func))
+                    results.append(result)
+                    print(f"{storage:8} {size:>8} {name:48} cold {result['cold_seconds']:9.4f} s "
+                          f"warm {result['warm_seconds']:9.4f} s", flush=True)
+            finally:
+                shutil.rmtree(data_dir, ignore_errors=True)
+    return results
+
+
+def measure_hydration(model, records):
+    """
+    Time and measure building model objects from records.
+    
+    Args:
+        model: Package or Route
+        records (list): Stored dictionaries to hydrate
+    
+    Returns:
+        dict: Seconds taken and bytes held by the objects
+    """
+    gc.collect()
+    start = time.perf_counter()
+    objects = [model.from_dict(r) for r in records]
+    seconds = time.perf_counter() - start
+    del objects
+    
+    gc.collect()
+    tracemalloc.start()
+    objects = [model.from_dict(r) for r in records]
+    memory, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return {"seconds": round(seconds, 4), "bytes": memory, "bytes_per_object": memory // max(len(records), 1)}
+
+
+def benchmark_models(sizes):
+    """
+    Benchmark Package and Route hydration at several sizes.
+    
+    Args:
+        sizes: Record counts to test
+    
+    Returns:
+        list: One result dictionary per model and size
+    """
+    results = []
+    for size in sizes:
+        package_records, route_records = generate_dataset(size, packages_per_route=1, assigned_ratio=1.0)
+        for model, records in ((Package, package_records), (Route, route_records)):
+            result = measure_hydration(model, records)
+            result.update({"benchmark": f"{model.__name__}.from_dict", "records": len(records)})
+            results.append(result)
+            print(f"{model.__name__:8} {len(records):>9} records: {result['seconds']:8.3f} s "
+                  f"{result['bytes'] / 1024 / 1024:9.1f} MiB ({result['bytes_per_object']} B/object)")
+        del package_records, route_records
+    return results
+
+
+def benchmark_parallel(sizes, worker_counts, storage="json", seed=0):
+    """
+    Time the scanning reports in a process pool at several worker counts.
+    
+    run_parallel reads the packages once in the parent before handing
+    chunks to the workers, and that read is timed on its own as
+    "PackageDatabase.package_rows". It does not shrink with more workers.
+    On "json" and "journal" storage, its cold time is mostly parsing the
+    file, which every report pays again after a write. Pickling the rows
+    and starting the pool are also serial. Expect the speedup to level
+    off well below the worker count, at about the report's serial time
+    divided by that serial part. Warm timings reuse the parent's cached
+    parse, so they show the best case.
+    
+    Args:
+        sizes: Package counts to generate
+        worker_counts: Worker process counts; 1 runs the serial functions
+        storage (str): Storage engine to read from
+        seed (int): Dataset random seed
+    
+    Returns:
+        list: One result dictionary per report, size and worker count
+    """
+    computations = {
+        "reports.compute_driver_performance":
+            lambda package_db, route_db, workers: reports.compute_driver_performance(route_db, package_db, workers),
+        "reports.compute_problematic_addresses":
+            lambda package_db, route_db, workers: reports.compute_problematic_addresses(package_db, workers),
+        "reports.compute_summary_statistics":
+            lambda package_db, route_db, workers: reports.compute_summary_statistics(package_db, route_db, workers),
+    }
+    results = []
+    for size in sizes:
+        data_dir = tempfile.mkdtemp(prefix="freshroute-bench-")
+        try:
+            write_dataset(data_dir, *generate_dataset(size, seed=seed))
+            package_db = PackageDatabase(data_dir, storage=storage)
+            route_db = RouteDatabase(data_dir, storage=storage)
+            timing = time_call(package_db.package_rows, repeats=3)
+            result = {"benchmark": "PackageDatabase.package_rows", "storage": storage, "packages": size}
+            result.update(timing)
+            results.append(result)
+            print(f"{'PackageDatabase.package_rows':40} {size:>8} packages serial read "
+                  f"{timing['warm_seconds']:9.4f} s ({timing['cold_seconds']:.4f} s cold)", flush=True)
+            for name, compute in computations.items():
+                serial_seconds = None
+                for workers in worker_counts:
+                    timing = time_call(lambda: compute(package_db, route_db, workers), repeats=3)
+                    if workers == 1:
+                        serial_seconds = timing["warm_seconds"]
+                    result = {"benchmark": name, "storage": storage, "packages": size, "workers": workers}
+                    result.update(timing)
+                    if serial_seconds:
+                        result["speedup"] = round(serial_seconds / timing["warm_seconds"], 2)
+                    results.append(result)
+                    print(f"{name:40} {size:>8} packages {workers:>3} workers "
+                          f"{timing['warm_seconds']:9.4f} s", flush=True)
+        finally:
+            shutil.rmtree(data_dir, ignore_errors=True)
+    return results
+
+
+def compare_results(baseline, current, threshold=1.25):
+    """
+    Compare two result lists and find regressions.
+    
+    Args:
+        baseline (list): Results from an earlier run
+        current (list): Results from this run
+        threshold (float): Slowdown ratio counted as a regression
+    
+    Returns:
+        list: (benchmark key, baseline seconds, current seconds, ratio)
+            for every benchmark slower than the threshold
+    """
+    def key(result):
+        return (result["benchmark"], result.get("storage"), result.get("indexed"),
+                result.get("packages", result.get("records")), result.get("workers"))
+    
+    def seconds(result):
+        return result.get("warm_seconds", result.get("seconds"))
+    
+    before = {key(r): seconds(r) for r in baseline}
+    regressions = []
+    for result in current:
+        old = before.get(key(result))
+        new = seconds(result)
+        if old and new / old > threshold:
+            regressions.append((key(result), old, new, new / old))
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def save_results(path, results, command):
+    """
+    Write results with enough context to compare them across commits.
+    
+    Args:
+        path (str): Output JSON file
+        results (list): Result dictionaries
+        command (str): Benchmark command that produced them
+    """
+    document = {
+        "command": command,
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.now().isoformat(),
+        "results": results,
+    }
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2)
+
+
+def _parse_weights(pairs):
+    weights = {}
+    for pair in pairs:
+        status, _, weight = pair.rpartition("=")
+        weights[status] = float(weight)
+    return weights
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="FreshRoute Logistics benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    generate_parser = subparsers.add_parser("generate", help="write a synthetic dataset")
+    generate_parser.add_argument("--packages", type=int, default=10000)
+    generate_parser.add_argument("--data-dir", default="bench_data")
+    generate_parser.add_argument("--packages-per-route", type=int, default=40)
+    generate_parser.add_argument("--assigned-ratio", type=float, default=0.8)
+    generate_parser.add_argument("--days", type=int, default=30)
+    generate_parser.add_argument("--status-weights", nargs="+", metavar="STATUS=WEIGHT",
+                                 help='e.g. Pending=0.2 "Out for Delivery=0.1" Delivered=0.7')
+    generate_parser.add_argument("--seed", type=int, default=0)
+    
+    suite_parser = subparsers.add_parser("suite", help="time database methods and reports")
+    suite_parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    suite_parser.add_argument("--storage", nargs="+", default=["json"], choices=["json", "journal", "sqlite"])
+    suite_parser.add_argument("--indexed", action="store_true")
+    suite_parser.add_argument("--skip", nargs="*", default=[], help="benchmark names to skip")
+    suite_parser.add_argument("--seed", type=int, default=0)
+    suite_parser.add_argument("--out", help="write results to this JSON file")
+    
+    parallel_parser = subparsers.add_parser("parallel", help="report scaling across worker processes")
+    parallel_parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+    parallel_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parallel_parser.add_argument("--storage", default="json", choices=["json", "journal", "sqlite"])
+    parallel_parser.add_argument("--seed", type=int, default=0)
+    parallel_parser.add_argument("--out", help="write results to this JSON file")
+    
+    models_parser = subparsers.add_parser("models", help="model hydration time and memory")
+    models_parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+    models_parser.add_argument("--out", help="write results to this JSON file")
+    
+    compare_parser = subparsers.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args(argv)
+    
+    if args.command == "generate":
+        weights = _parse_weights(args.status_weights) if args.status_weights else None
+        package_records, route_records = generate_dataset(
+            args.packages, args.packages_per_route, weights, args.assigned_ratio, args.days, seed=args.seed)
+        write_dataset(args.data_dir, package_records, route_records)
+        print(f"Wrote {len(package_records)} packages and {len(route_records)} routes to {args.data_dir}")
+    elif args.command == "compare":
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        with open(args.current) as f:
+            current = json.load(f)["results"]
+        regressions = compare_results(baseline, current, args.threshold)
+        for key, old, new, ratio in regressions:
+            print(f"REGRESSION {key}: {old:.4f} s -> {new:.4f} s ({ratio:.2f}x)")
+        if not regressions:
+            print("No regressions.")
+        sys.exit(1 if regressions else 0)
+    else:
+        if args.command == "suite":
+            results = run_suite(args.sizes, args.storage, args.indexed, set(args.skip), args.seed)
+        elif args.command == "parallel":
+            results = benchmark_parallel(args.sizes, args.workers, args.storage, args.seed)
+        else:
+            results = benchmark_models(args.sizes)
+        if args.out:
+            save_results(args.out, results, " ".join(sys.argv[1:] if argv is None else argv))
+
+
+if __name__ == "__main__":
+    main()
@@ -7,24 +7,71 @@ TODO: Implement all package database operations (CRUD).
 
 import json
 import os
+from database_sqlite import PACKAGE_COLUMNS, SQLitePackageDatabase
+from indexes import PackageIndex
 from models import Package
+from sequence import SequenceAllocator
+from storage import (DEFAULT_COMPACT_THRESHOLD, STORAGE_ENGINES, ChangeNotifier, FileLock,
+                     JournalStore, file_signature, lock_context, with_lock, write_json_atomic)
 
 
-class PackageDatabase:
+class PackageDatabase(ChangeNotifier):
     """Handles package data storage and retrieval using JSON file."""
     
-    def __init__(self, data_dir="data"):
+    def __new__(cls, data_dir="data", indexed=False, storage="json",
+                compact_threshold=DEFAULT_COMPACT_THRESHOLD, locking=False):
+        """
+        Create the database, handing "sqlite" storage to SQLitePackageDatabase.
+        
+        indexed, compact_threshold and locking do not apply to SQLite and
+        are ignored for it: lookups use the table's primary key, and
+        SQLite locks the database file itself.
+        """
+        if storage == "sqlite":
+            return SQLitePackageDatabase(data_dir)
+        return super().__new__(cls)
+    
+    def __init__(self, data_dir="data", indexed=False, storage="json",
+                 compact_threshold=DEFAULT_COMPACT_THRESHOLD, locking=False):
         """
         Initialize package database.
         
         Args:
             data_dir (str): Directory for data files
+            indexed (bool): Load the file once and serve lookups from an
+                in-memory index instead of re-reading it on every call
+            storage (str): "json" rewrites packages.json on every change,
+                "journal" appends each change to a journal (always indexed),
+                "sqlite" stores data in SQLite (see database_sqlite) and
+                ignores indexed, compact_threshold and locking
+            compact_threshold (int): Journal size in bytes that triggers
+                compaction into packages.json
+            locking (bool): Take fcntl file locks so several processes can
+                share the data directory safely
         
         TODO: Set up database file path and initialize
         """
+        if storage not in STORAGE_ENGINES:
+            raise ValueError(f"Unknown storage engine: {storage}")
         self.data_dir = data_dir
         self.packages_file = os.path.join(data_dir, "packages.json")
+        self.lock_file = self.packages_file + ".lock"
+        self.storage = storage
+        self.indexed = indexed or storage == "journal"
+        self.locking = locking
+        self._index = None
+        self._index_signature = None
+        # (file signature, parsed records)
+        self._cache = None
+        self._sequence = None
+        self._lock = None
+        if locking:
+            self._lock = FileLock(self.lock_file)
         self._initialize()
+        self._journal = None
+        if storage == "journal":
+            self._journal = JournalStore(self.packages_file, 'package_id', compact_threshold,
+                                         self.lock_file if locking else None)
     
     def _initialize(self):
         """
@@ -32,11 +79,10 @@ class PackageDatabase:
         
         TODO: Create directory and empty packages.json file
         """
-        if not os.path.exists(self.data_dir):
-            os.makedirs(self.data_dir)
-        if not os.path.exists(self.packages_file):
-            with open(self.packages_file, 'w') as f:
-                json.dump([], f)
+        os.makedirs(self.data_dir, exist_ok=True)
+        with lock_context(self._lock, exclusive=True):
+            if not os.path.exists(self.packages_file):
+                write_json_atomic(self.packages_file, [])
     
     def _read_packages(self):
         """
@@ -47,8 +93,11 @@ class PackageDatabase:
         
         TODO: Read and parse JSON file
         """
-        with open(self.packages_file, 'r') as f:
-            return json.load(f)
+        signature = file_signature(self.packages_file)
+        if self._cache is None or self._cache[0] != signature:
+            with open(self.packages_file, 'r') as f:
+                self._cache = (signature, json.load(f))
+        return list(self._cache[1])
     
     def _write_packages(self, packages_data):
         """
@@ -59,9 +108,72 @@ class PackageDatabase:
         
         TODO: Write data to JSON file with proper formatting
         """
-        with open(self.packages_file, 'w') as f:
-            json.dump(packages_data, f, indent=2)
+        write_json_atomic(self.packages_file, packages_data)
+        self._cache = (file_signature(self.packages_file), list(packages_data))
+    
+    def _external_version(self):
+        # Every write replaces the data file or grows the journal
+        return self._storage_signature()
+    
+    def _storage_signature(self):
+        """Get the stat signature of the files the index is loaded from."""
+        if self._journal:
+            return self._journal.signature()
+        return file_signature(self.packages_file)
+    
+    def storage_signature(self):
+        """
+        Get a fingerprint of the stored packages that changes on every
+        write, including writes made by other processes.
+        
+        Returns:
+            tuple: Stat signatures of packages.json and of the journal
+        """
+        return (file_signature(self.packages_file), self._journal.signature() if self._journal else None)
+    
+    def _load_index(self):
+        """
+        Get the in-memory package index, reloading it if the data file was
+        changed by another process.
+        
+        Returns:
+            PackageIndex: Index of all package records
+        """
+        signature = self._storage_signature()
+        if self._index is None or signature != self._index_signature:
+            if self._journal:
+                self._index = PackageIndex(self._journal.load())
+            else:
+                self._index = PackageIndex(self._read_packages())
+            self._index_signature = signature
+        return self._index
+    
+    def _commit(self, changes):
+        """
+        Persist changes already applied to the index.
+        
+        Args:
+            changes (list): ("put", record) or ("delete", package_id) tuples
+        """
+        if self._journal:
+            self._journal.append(changes, self._index.records)
+        else:
+            self._write_packages(self._index.records())
+        self._index_signature = self._storage_signature()
+    
+    def _packages_for(self, package_ids):
+        """
+        Build Package objects for IDs taken from the index.
+        
+        Args:
+            package_ids: Package IDs present in the index
+        
+        Returns:
+            list: List of Package objects
+        """
+        return [Package.from_dict(self._index.get(package_id)) for package_id in package_ids]
     
+    @with_lock()
     def get_all_packages(self):
         """
         Get all packages from database.
@@ -71,9 +183,11 @@ class PackageDatabase:
         
         TODO: Read JSON and convert to Package objects
         """
-        data = self._read_packages()
-        return [Package.from_dict(pkg) for pkg in data]
+        if self.indexed:
+            return [Package.from_dict(pkg) for pkg in self._load_index().records()]
+        return [Package.from_dict(pkg) for pkg in self._read_packages()]
     
+    @with_lock()
     def get_package_by_id(self, package_id):
         """
         Get a specific package by ID.
@@ -86,12 +200,15 @@ class PackageDatabase:
         
         TODO: Search for package by ID
         """
-        packages = self.get_all_packages()
-        for pkg in packages:
-            if pkg.package_id == package_id:
-                return pkg
+        if self.indexed:
+            record = self._load_index().get(package_id)
+            return Package.from_dict(record) if record else None
+        for pkg in self._read_packages():
+            if pkg['package_id'] == package_id:
+                return Package.from_dict(pkg)
         return None
     
+    @with_lock(exclusive=True)
     def add_package(self, package):
         """
         Add a new package to database.
@@ -104,14 +221,26 @@ class PackageDatabase:
         
         TODO: Add package to JSON file (check for duplicates)
         """
+        if self.indexed:
+            index = self._load_index()
+            if package.package_id in index:
+                return False
+            record = package.to_dict()
+            index.put(record)
+            self._commit([("put", record)])
+            self._notify([(None, record)])
+            return True
         data = self._read_packages()
         for pkg in data:
             if pkg['package_id'] == package.package_id:
                 return False
-        data.append(package.to_dict())
+        record = package.to_dict()
+        data.append(record)
         self._write_packages(data)
+        self._notify([(None, record)])
         return True
     
+    @with_lock(exclusive=True)
     def update_package(self, package):
         """
         Update an existing package.
@@ -124,14 +253,25 @@ class PackageDatabase:
         
         TODO: Update package in JSON file
         """
+        if self.indexed:
+            index = self._load_index()
+            if package.package_id not in index:
+                return False
+            record = package.to_dict()
+            old = index.put(record)
+            self._commit([("put", record)])
+            self._notify([(old, record)])
+            return True
         data = self._read_packages()
         for i, pkg in enumerate(data):
             if pkg['package_id'] == package.package_id:
-                data[i] = package.to_dict()
+                old, data[i] = data[i], package.to_dict()
                 self._write_packages(data)
+                self._notify([(old, data[i])])
                 return True
         return False
     
+    @with_lock(exclusive=True)
     def delete_package(self, package_id):
         """
         Delete a package by ID.
@@ -144,14 +284,156 @@ class PackageDatabase:
         
         TODO: Remove package from JSON file
         """
+        if self.indexed:
+            index = self._load_index()
+            old = index.remove(package_id)
+            if old is None:
+                return False
+            self._commit([("delete", package_id)])
+            self._notify([(old, None)])
+            return True
         data = self._read_packages()
         for i, pkg in enumerate(data):
             if pkg['package_id'] == package_id:
-                data.pop(i)
+                old = data.pop(i)
                 self._write_packages(data)
+                self._notify([(old, None)])
                 return True
         return False
     
+    def next_package_id(self):
+        """
+        Allocate a new unique package ID.
+        
+        Returns:
+            str: New ID (e.g., "PKG0001")
+        """
+        if self._sequence is None:
+            self._sequence = SequenceAllocator(self.data_dir, "PKG", seed=self._existing_ids)
+        return self._sequence.next_id()
+    
+    def _existing_ids(self):
+        """List the IDs in the database, used to seed a new sequence."""
+        with lock_context(self._lock):
+            if self.indexed:
+                return [r['package_id'] for r in self._load_index().records()]
+            return [r['package_id'] for r in self._read_packages()]
+    
+    @with_lock()
+    def get_packages_by_ids(self, package_ids):
+        """
+        Get several packages with a single read.
+        
+        Args:
+            package_ids: Package IDs to look up
+        
+        Returns:
+            List of Package objects in the order requested; unknown IDs
+            are skipped
+        """
+        if self.indexed:
+            index = self._load_index()
+            return self._packages_for([pid for pid in package_ids if pid in index])
+        by_id = {pkg['package_id']: pkg for pkg in self._read_packages()}
+        return [Package.from_dict(by_id[pid]) for pid in package_ids if pid in by_id]
+    
+    @with_lock(exclusive=True)
+    def add_packages(self, packages):
+        """
+        Add many packages with a single write.
+        
+        Args:
+            packages: Package objects to add
+        
+        Returns:
+            int: Number of packages added (duplicates are skipped)
+        """
+        added = []
+        if self.indexed:
+            index = self._load_index()
+            for package in packages:
+                if package.package_id not in index:
+                    record = package.to_dict()
+                    index.put(record)
+                    added.append((None, record))
+            if added:
+                self._commit([("put", record) for _old, record in added])
+        else:
+            data = self._read_packages()
+            existing = {pkg['package_id'] for pkg in data}
+            for package in packages:
+                if package.package_id not in existing:
+                    existing.add(package.package_id)
+                    record = package.to_dict()
+                    data.append(record)
+                    added.append((None, record))
+            if added:
+                self._write_packages(data)
+        self._notify(added)
+        return len(added)
+    
+    @with_lock(exclusive=True)
+    def update_packages(self, packages):
+        """
+        Update many existing packages with a single write.
+        
+        Args:
+            packages: Package objects with updated data
+        
+        Returns:
+            int: Number of packages updated (unknown IDs are skipped)
+        """
+        updated = []
+        if self.indexed:
+            index = self._load_index()
+            for package in packages:
+                if package.package_id in index:
+                    record = package.to_dict()
+                    updated.append((index.put(record), record))
+            if updated:
+                self._commit([("put", record) for _old, record in updated])
+        else:
+            data = self._read_packages()
+            positions = {pkg['package_id']: i for i, pkg in enumerate(data)}
+            for package in packages:
+                i = positions.get(package.package_id)
+                if i is not None:
+                    record = package.to_dict()
+                    updated.append((data[i], record))
+                    data[i] = record
+            if updated:
+                self._write_packages(data)
+        self._notify(updated)
+        return len(updated)
+    
+    @with_lock(exclusive=True)
+    def assign_packages(self, assignments):
+        """
+        Put unassigned packages on routes, re-reading them under the write lock.
+        
+        Only route_id is changed, so edits saved by others since the
+        packages were shown are kept.
+        
+        Args:
+            assignments (dict): Route ID -> package IDs to put on it
+        
+        Returns:
+            dict: Route ID -> IDs of the packages assigned; unknown
+                packages and ones already on a route are skipped
+        """
+        assigned = {}
+        changed = []
+        for route_id, package_ids in assignments.items():
+            packages = [pkg for pkg in self.get_packages_by_ids(dict.fromkeys(package_ids)) if not pkg.route_id]
+            for package in packages:
+                package.route_id = route_id
+            assigned[route_id] = [pkg.package_id for pkg in packages]
+            changed.extend(packages)
+        if changed:
+            self.update_packages(changed)
+        return assigned
+    
+    @with_lock()
     def get_packages_by_status(self, status):
         """
         Get all packages with a specific status.
@@ -164,9 +446,12 @@ class PackageDatabase:
         
         TODO: Filter packages by status
         """
+        if self.indexed:
+            return self._packages_for(self._load_index().ids_with_status(status))
         packages = self.get_all_packages()
         return [pkg for pkg in packages if pkg.status == status]
     
+    @with_lock()
     def get_packages_by_route(self, route_id):
         """
         Get all packages assigned to a specific route.
@@ -179,9 +464,12 @@ class PackageDatabase:
         
         TODO: Filter packages by route ID
         """
+        if self.indexed:
+            return self._packages_for(self._load_index().ids_on_route(route_id))
         packages = self.get_all_packages()
         return [pkg for pkg in packages if pkg.route_id == route_id]
     
+    @with_lock()
     def get_unassigned_packages(self):
         """
         Get all packages not assigned to any route.
@@ -191,5 +479,94 @@ class PackageDatabase:
         
         TODO: Filter packages without route assignment
         """
+        if self.indexed:
+            return self._packages_for(self._load_index().unassigned_ids())
         packages = self.get_all_packages()
-        return [pkg for pkg in packages if pkg.route_id is None]
\ No newline at end of file
+        return [pkg for pkg in packages if pkg.route_id is None]
+    
+    @with_lock()
+    def get_packages_delivered_between(self, start_date, end_date):
+        """
+        Get delivered packages for a date range, grouped by delivery day.
+        
+        Args:
+            start_date (str): First day (YYYY-MM-DD), inclusive
+            end_date (str): Last day (YYYY-MM-DD), inclusive
+        
+        Returns:
+            dict: Day -> list of Package objects, for days with deliveries,
+                in date order
+        """
+        if self.indexed:
+            by_day = self._load_index().ids_delivered_between(start_date, end_date)
+            return {day: self._packages_for(ids) for day, ids in by_day.items()}
+        by_day = {}
+        for pkg in self._read_packages():
+            if pkg['status'] == "Delivered" and pkg['delivered_at']:
+                day = pkg['delivered_at'][:10]
+                if start_date <= day <= end_date:
+                    by_day.setdefault(day, []).append(Package.from_dict(pkg))
+        return dict(sorted(by_day.items()))
+    
+    def iter_packages(self, status=None):
+        """
+        Iterate over packages, building each Package object on demand.
+        
+        The records are read once when this is called; later writes do
+        not affect a running iteration.
+        
+        Args:
+            status: Only yield packages with this status, or with any of
+                a tuple of statuses, if given
+        
+        Returns:
+            Iterator of Package objects
+        """
+        with lock_context(self._lock):
+            records = self._select_records(status)
+        return (Package.from_dict(r) for r in records)
+    
+    @with_lock()
+    def package_rows(self, status=None, fields=None):
+        """
+        Read the package records as plain tuples in one consistent read.
+        
+        Tuples pickle much smaller than dicts or Package objects, so this
+        is what run_parallel sends to its worker processes.
+        
+        Args:
+            status: Only include packages with this status, or with any of
+                a tuple of statuses, if given
+            fields (tuple): Fields to include, in order (default: all of
+                PACKAGE_COLUMNS)
+        
+        Returns:
+            list: Tuples of field values
+        """
+        fields = fields or PACKAGE_COLUMNS
+        return [tuple(map(r.get, fields)) for r in self._select_records(status)]
+    
+    def _select_records(self, status):
+        """Get the stored records with a status, or all of them; the caller holds the lock."""
+        statuses = (status,) if isinstance(status, str) else status
+        if self.indexed:
+            index = self._load_index()
+            if statuses is None:
+                return index.records()
+            return [index.get(pid) for s in statuses for pid in index.ids_with_status(s)]
+        records = self._read_packages()
+        if statuses is None:
+            return records
+        return [r for r in records if r['status'] in statuses]
+    
+    @with_lock()
+    def count_packages(self):
+        """
+        Count the packages in the database.
+        
+        Returns:
+            int: Number of packages
+        """
+        if self.indexed:
+            return len(self._load_index())
+        return len(self._read_packages())
@@ -7,24 +7,70 @@ TODO: Implement all route database operations (CRUD).
 
 import json
 import os
+from database_sqlite import SQLiteRouteDatabase
+from indexes import RouteIndex
 from models import Route
+from sequence import SequenceAllocator
+from storage import (DEFAULT_COMPACT_THRESHOLD, STORAGE_ENGINES, ChangeNotifier, FileLock,
+                     JournalStore, file_signature, lock_context, with_lock, write_json_atomic)
 
 
-class RouteDatabase:
+class RouteDatabase(ChangeNotifier):
     """Handles route data storage and retrieval using JSON file."""
     
-    def __init__(self, data_dir="data"):
+    def __new__(cls, data_dir="data", indexed=False, storage="json",
+                compact_threshold=DEFAULT_COMPACT_THRESHOLD, locking=False):
+        """
+        Create the database, handing "sqlite" storage to SQLiteRouteDatabase.
+        
+        indexed, compact_threshold and locking do not apply to SQLite and
+        are ignored for it: lookups use the table's primary key, and
+        SQLite locks the database file itself.
+        """
+        if storage == "sqlite":
+            return SQLiteRouteDatabase(data_dir)
+        return super().__new__(cls)
+    
+    def __init__(self, data_dir="data", indexed=False, storage="json",
+                 compact_threshold=DEFAULT_COMPACT_THRESHOLD, locking=False):
         """
         Initialize route database.
         
         Args:
             data_dir (str): Directory for data files
+            indexed (bool): Load the file once and serve lookups from an
+                in-memory index instead of re-reading it on every call
+            storage (str): "json" rewrites routes.json on every change,
+                "journal" appends each change to a journal (always indexed),
+                "sqlite" stores data in SQLite (see database_sqlite) and
+                ignores indexed, compact_threshold and locking
+            compact_threshold (int): Journal size in bytes that triggers
+                compaction into routes.json
+            locking (bool): Take fcntl file locks so several processes can
+                share the data directory safely
         
         TODO: Set up database file path and initialize
         """
+        if storage not in STORAGE_ENGINES:
+            raise ValueError(f"Unknown storage engine: {storage}")
         self.data_dir = data_dir
         self.routes_file = os.path.join(data_dir, "routes.json")
+        self.lock_file = self.routes_file + ".lock"
+        self.storage = storage
+        self.indexed = indexed or storage == "journal"
+        self._index = None
+        self._index_signature = None
+        # (file signature, parsed records)
+        self._cache = None
+        self._sequence = None
+        self._lock = None
+        if locking:
+            self._lock = FileLock(self.lock_file)
         self._initialize()
+        self._journal = None
+        if storage == "journal":
+            self._journal = JournalStore(self.routes_file, 'route_id', compact_threshold,
+                                         self.lock_file if locking else None)
     
     def _initialize(self):
         """
@@ -32,11 +78,10 @@ class RouteDatabase:
         
         TODO: Create directory and empty routes.json file
         """
-        if not os.path.exists(self.data_dir):
-            os.makedirs(self.data_dir)
-        if not os.path.exists(self.routes_file):
-            with open(self.routes_file, 'w') as f:
-                json.dump([], f)
+        os.makedirs(self.data_dir, exist_ok=True)
+        with lock_context(self._lock, exclusive=True):
+            if not os.path.exists(self.routes_file):
+                write_json_atomic(self.routes_file, [])
     
     def _read_routes(self):
         """
@@ -47,8 +92,11 @@ class RouteDatabase:
         
         TODO: Read and parse JSON file
         """
-        with open(self.routes_file, 'r') as f:
-            return json.load(f)
+        signature = file_signature(self.routes_file)
+        if self._cache is None or self._cache[0] != signature:
+            with open(self.routes_file, 'r') as f:
+                self._cache = (signature, json.load(f))
+        return list(self._cache[1])
     
     def _write_routes(self, routes_data):
         """
@@ -59,9 +107,50 @@ class RouteDatabase:
         
         TODO: Write data to JSON file with proper formatting
         """
-        with open(self.routes_file, 'w') as f:
-            json.dump(routes_data, f, indent=2)
+        write_json_atomic(self.routes_file, routes_data)
+        self._cache = (file_signature(self.routes_file), list(routes_data))
+    
+    def _external_version(self):
+        # Every write replaces the data file or grows the journal
+        return self._storage_signature()
+    
+    def _storage_signature(self):
+        """Get the stat signature of the files the index is loaded from."""
+        if self._journal:
+            return self._journal.signature()
+        return file_signature(self.routes_file)
+    
+    def _load_index(self):
+        """
+        Get the in-memory route index, reloading it if the data file was
+        changed by another process.
+        
+        Returns:
+            RouteIndex: Index of all route records
+        """
+        signature = self._storage_signature()
+        if self._index is None or signature != self._index_signature:
+            if self._journal:
+                self._index = RouteIndex(self._journal.load())
+            else:
+                self._index = RouteIndex(self._read_routes())
+            self._index_signature = signature
+        return self._index
     
+    def _commit(self, changes):
+        """
+        Persist changes already applied to the index.
+        
+        Args:
+            changes (list): ("put", record) or ("delete", route_id) tuples
+        """
+        if self._journal:
+            self._journal.append(changes, self._index.records)
+        else:
+            self._write_routes(self._index.records())
+        self._index_signature = self._storage_signature()
+    
+    @with_lock()
     def get_all_routes(self):
         """
         Get all routes from database.
@@ -71,9 +160,11 @@ class RouteDatabase:
         
         TODO: Read JSON and convert to Route objects
         """
-        data = self._read_routes()
-        return [Route.from_dict(route) for route in data]
+        if self.indexed:
+            return [Route.from_dict(route) for route in self._load_index().records()]
+        return [Route.from_dict(route) for route in self._read_routes()]
     
+    @with_lock()
     def get_route_by_id(self, route_id):
         """
         Get a specific route by ID.
@@ -86,12 +177,15 @@ class RouteDatabase:
         
         TODO: Search for route by ID
         """
-        routes = self.get_all_routes()
-        for route in routes:
-            if route.route_id == route_id:
-                return route
+        if self.indexed:
+            record = self._load_index().get(route_id)
+            return Route.from_dict(record) if record else None
+        for route in self._read_routes():
+            if route['route_id'] == route_id:
+                return Route.from_dict(route)
         return None
     
+    @with_lock(exclusive=True)
     def add_route(self, route):
         """
         Add a new route to database.
@@ -104,14 +198,26 @@ class RouteDatabase:
         
         TODO: Add route to JSON file (check for duplicates)
         """
+        if self.indexed:
+            index = self._load_index()
+            if route.route_id in index:
+                return False
+            record = route.to_dict()
+            index.put(record)
+            self._commit([("put", record)])
+            self._notify([(None, record)])
+            return True
         data = self._read_routes()
         for r in data:
             if r['route_id'] == route.route_id:
                 return False
-        data.append(route.to_dict())
+        record = route.to_dict()
+        data.append(record)
         self._write_routes(data)
+        self._notify([(None, record)])
         return True
     
+    @with_lock(exclusive=True)
     def update_route(self, route):
         """
         Update an existing route.
@@ -124,14 +230,25 @@ class RouteDatabase:
         
         TODO: Update route in JSON file
         """
+        if self.indexed:
+            index = self._load_index()
+            if route.route_id not in index:
+                return False
+            record = route.to_dict()
+            old = index.put(record)
+            self._commit([("put", record)])
+            self._notify([(old, record)])
+            return True
         data = self._read_routes()
         for i, r in enumerate(data):
             if r['route_id'] == route.route_id:
-                data[i] = route.to_dict()
+                old, data[i] = data[i], route.to_dict()
                 self._write_routes(data)
+                self._notify([(old, data[i])])
                 return True
         return False
     
+    @with_lock(exclusive=True)
     def delete_route(self, route_id):
         """
         Delete a route by ID.
@@ -144,14 +261,121 @@ class RouteDatabase:
         
         TODO: Remove route from JSON file
         """
+        if self.indexed:
+            index = self._load_index()
+            old = index.remove(route_id)
+            if old is None:
+                return False
+            self._commit([("delete", route_id)])
+            self._notify([(old, None)])
+            return True
         data = self._read_routes()
         for i, r in enumerate(data):
             if r['route_id'] == route_id:
-                data.pop(i)
+                old = data.pop(i)
                 self._write_routes(data)
+                self._notify([(old, None)])
                 return True
         return False
     
+    def next_route_id(self):
+        """
+        Allocate a new unique route ID.
+        
+        Returns:
+            str: New ID (e.g., "RT0001")
+        """
+        if self._sequence is None:
+            self._sequence = SequenceAllocator(self.data_dir, "RT", seed=self._existing_ids)
+        return self._sequence.next_id()
+    
+    def _existing_ids(self):
+        """List the IDs in the database, used to seed a new sequence."""
+        with lock_context(self._lock):
+            if self.indexed:
+                return [r['route_id'] for r in self._load_index().records()]
+            return [r['route_id'] for r in self._read_routes()]
+    
+    @with_lock(exclusive=True)
+    def update_routes(self, routes):
+        """
+        Update many existing routes with a single write.
+        
+        Args:
+            routes: Route objects with updated data
+        
+        Returns:
+            int: Number of routes updated (unknown IDs are skipped)
+        """
+        updated = []
+        if self.indexed:
+            index = self._load_index()
+            for route in routes:
+                if route.route_id in index:
+                    record = route.to_dict()
+                    updated.append((index.put(record), record))
+            if updated:
+                self._commit([("put", record) for _old, record in updated])
+        else:
+            data = self._read_routes()
+            positions = {r['route_id']: i for i, r in enumerate(data)}
+            for route in routes:
+                i = positions.get(route.route_id)
+                if i is not None:
+                    record = route.to_dict()
+                    updated.append((data[i], record))
+                    data[i] = record
+            if updated:
+                self._write_routes(data)
+        self._notify(updated)
+        return len(updated)
+    
+    @with_lock(exclusive=True)
+    def add_packages_to_routes(self, assignments):
+        """
+        Append package IDs to routes, re-reading them under the write lock.
+        
+        Only package_ids is changed, so edits saved by others since the
+        routes were shown are kept.
+        
+        Args:
+            assignments (dict): Route ID -> package IDs to add
+        
+        Returns:
+            int: Number of routes updated (unknown IDs are skipped)
+        """
+        routes = [route for route in self.get_all_routes() if assignments.get(route.route_id)]
+        for route in routes:
+            for package_id in assignments[route.route_id]:
+                route.add_package(package_id)
+        return self.update_routes(routes) if routes else 0
+    
+    @with_lock(exclusive=True)
+    def reorder_route(self, route_id, package_ids, estimated_fuel=None):
+        """
+        Save a new stop order, re-reading the route under the write lock.
+        
+        Packages added to the route since the order was computed are kept
+        after it, and ones removed are left out (see
+        Route.reorder_packages). The fuel estimate is only saved if the
+        stops are still the same.
+        
+        Args:
+            route_id: Route ID
+            package_ids: Package IDs in the new stop order
+            estimated_fuel (float): Estimated litres for the new order
+        
+        Returns:
+            bool: True if successful, False if the route was not found
+        """
+        route = self.get_route_by_id(route_id)
+        if route is None:
+            return False
+        if route.reorder_packages(package_ids) and estimated_fuel is not None:
+            route.estimated_fuel = estimated_fuel
+        return self.update_route(route)
+    
+    @with_lock()
     def get_routes_by_date(self, date):
         """
         Get all routes for a specific date.
@@ -167,6 +391,7 @@ class RouteDatabase:
         routes = self.get_all_routes()
         return [route for route in routes if route.date == date]
     
+    @with_lock()
     def get_routes_by_driver(self, driver_name):
         """
         Get all routes assigned to a specific driver.
@@ -0,0 +1,767 @@
+"""
+FreshRoute Logistics - SQLite Database Operations
+
+SQLite-backed versions of PackageDatabase and RouteDatabase with the same
+public methods. Both tables live in one database file in the data
+directory. The first time the file is created, existing packages.json and
+routes.json data is migrated into it.
+"""
+
+import json
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from models import Package, Route
+from sequence import SequenceAllocator
+from storage import ChangeNotifier, file_signature
+
+
+DATABASE_FILENAME = "freshroute.db"
+
+PACKAGE_COLUMNS = (
+    'package_id', 'sender', 'recipient_name', 'recipient_address',
+    'recipient_phone', 'weight', 'category', 'status', 'route_id',
+    'created_at', 'updated_at', 'delivered_at', 'proof_of_delivery',
+    'latitude', 'longitude',
+)
+
+ROUTE_COLUMNS = (
+    'route_id', 'route_name', 'driver_name', 'driver_phone', 'date',
+    'package_ids', 'status', 'created_at', 'estimated_fuel',
+)
+
+# Maximum number of IDs bound into a single IN (...) query
+QUERY_BATCH_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS packages (
+    package_id TEXT PRIMARY KEY,
+    sender TEXT,
+    recipient_name TEXT,
+    recipient_address TEXT,
+    recipient_phone TEXT,
+    weight REAL,
+    category TEXT,
+    status TEXT,
+    route_id TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    delivered_at TEXT,
+    proof_of_delivery TEXT,
+    latitude REAL,
+    longitude REAL
+);
+CREATE INDEX IF NOT EXISTS idx_packages_status ON packages (status);
+CREATE INDEX IF NOT EXISTS idx_packages_route_id ON packages (route_id);
+CREATE INDEX IF NOT EXISTS idx_packages_delivered_at ON packages (delivered_at);
+
+CREATE TABLE IF NOT EXISTS routes (
+    route_id TEXT PRIMARY KEY,
+    route_name TEXT,
+    driver_name TEXT,
+    driver_phone TEXT,
+    date TEXT,
+    package_ids TEXT,
+    status TEXT,
+    created_at TEXT,
+    estimated_fuel REAL
+);
+CREATE INDEX IF NOT EXISTS idx_routes_date ON routes (date);
+CREATE INDEX IF NOT EXISTS idx_routes_driver_name ON routes (driver_name);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def connect(data_dir):
+    """
+    Open the SQLite database, creating the schema and migrating JSON data.
+    
+    Args:
+        data_dir (str): Directory for data files
+    
+    Returns:
+        sqlite3.Connection: Open connection
+    """
+    if not os.path.exists(data_dir):
+        os.makedirs(data_dir)
+    conn = sqlite3.connect(os.path.join(data_dir, DATABASE_FILENAME))
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    add_missing_columns(conn)
+    migrate_json_to_sqlite(conn, data_dir)
+    return conn
+
+
+# Columns added after the first release, with their SQL types
+ADDED_COLUMNS = {
+    "packages": (("latitude", "REAL"), ("longitude", "REAL")),
+}
+
+
+def add_missing_columns(conn):
+    """
+    Add columns introduced since a database file was created.
+    
+    Args:
+        conn (sqlite3.Connection): Open connection with the schema created
+    """
+    with conn:
+        for table, columns in ADDED_COLUMNS.items():
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            for column, sql_type in columns:
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {sql_type}")
+
+
+def migrate_json_to_sqlite(conn, data_dir):
+    """
+    Copy packages.json and routes.json into SQLite, once per database.
+    
+    Args:
+        conn (sqlite3.Connection): Open connection with the schema created
+        data_dir (str): Directory holding the JSON files
+    
+    Returns:
+        bool: True if a migration ran, False if it had already been done
+    """
+    with conn:
+        done = conn.execute("SELECT value FROM meta WHERE key = 'json_migrated'").fetchone()
+        if done:
+            return False
+        for filename, table, columns in (("packages.json", "packages", PACKAGE_COLUMNS),
+                                         ("routes.json", "routes", ROUTE_COLUMNS)):
+            path = os.path.join(data_dir, filename)
+            if not os.path.exists(path):
+                continue
+            with open(path, 'r') as f:
+                records = json.load(f)
+            if table == "packages":
+                rows = [_package_row(Package.from_dict(r).to_dict()) for r in records]
+            else:
+                rows = [_route_row(Route.from_dict(r).to_dict()) for r in records]
+            conn.executemany(_insert_sql(table, columns, "OR IGNORE"), rows)
+        conn.execute("INSERT INTO meta (key, value) VALUES ('json_migrated', '1')")
+    return True
+
+
+def _insert_sql(table, columns, conflict=""):
+    placeholders = ", ".join("?" for _ in columns)
+    return f"INSERT {conflict} INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+
+
+def _update_sql(table, columns):
+    assignments = ", ".join(f"{c} = ?" for c in columns[1:])
+    return f"UPDATE {table} SET {assignments} WHERE {columns[0]} = ?"
+
+
+def _package_row(record):
+    return tuple(record.get(c) for c in PACKAGE_COLUMNS)
+
+
+def _route_row(record):
+    row = [record.get(c) for c in ROUTE_COLUMNS]
+    row[ROUTE_COLUMNS.index('package_ids')] = json.dumps(record.get('package_ids', []))
+    return tuple(row)
+
+
+def _rotate_key_last(row):
+    """Move the key column to the end to match the UPDATE parameter order."""
+    return row[1:] + row[:1]
+
+
+def _records_by_key(records, key, ids):
+    """
+    Look up records by key with batched IN queries.
+    
+    Args:
+        records: A database's _records(where, params) method
+        key (str): Key column
+        ids: Keys to look up
+    
+    Returns:
+        dict: Key -> record for the keys that exist
+    """
+    ids = list(ids)
+    found = {}
+    for start in range(0, len(ids), QUERY_BATCH_SIZE):
+        batch = ids[start:start + QUERY_BATCH_SIZE]
+        placeholders = ", ".join("?" for _ in batch)
+        for record in records(f"WHERE {key} IN ({placeholders})", batch):
+            found[record[key]] = record
+    return found
+
+
+class SQLitePackageDatabase(ChangeNotifier):
+    """Handles package data storage and retrieval using SQLite."""
+    
+    def __init__(self, data_dir="data"):
+        """
+        Initialize package database.
+        
+        Args:
+            data_dir (str): Directory for data files
+        """
+        self.data_dir = data_dir
+        self.storage = "sqlite"
+        self._conn = connect(data_dir)
+        self._sequence = None
+    
+    def close(self):
+        """Close the database connection."""
+        self._conn.close()
+    
+    def _external_version(self):
+        # data_version changes when other connections commit and
+        # total_changes when this one modifies rows
+        return (self._conn.execute("PRAGMA data_version").fetchone()[0], self._conn.total_changes)
+    
+    def storage_signature(self):
+        """
+        Get a fingerprint of the stored data that changes on every write,
+        including writes made by other processes.
+        
+        The database file is shared with the routes, so route writes
+        change it too.
+        
+        Returns:
+            tuple: Stat signatures of the database file and its WAL file
+        """
+        path = os.path.join(self.data_dir, DATABASE_FILENAME)
+        return (file_signature(path), file_signature(path + "-wal"))
+    
+    def _records(self, where="", params=()):
+        sql = f"SELECT {', '.join(PACKAGE_COLUMNS)} FROM packages {where} ORDER BY rowid"
+        return [dict(zip(PACKAGE_COLUMNS, row)) for row in self._conn.execute(sql, params)]
+    
+    def _query(self, where="", params=()):
+        return [Package.from_dict(record) for record in self._records(where, params)]
+    
+    def _old_records(self, package_ids):
+        """Fetch stored records about to change, only if someone is listening."""
+        if not self._listeners:
+            return {}
+        return _records_by_key(self._records, 'package_id', package_ids)
+    
+    def next_package_id(self):
+        """
+        Allocate a new unique package ID.
+        
+        Returns:
+            str: New ID (e.g., "PKG0001")
+        """
+        if self._sequence is None:
+            self._sequence = SequenceAllocator(self.data_dir, "PKG", seed=self._existing_ids)
+        return self._sequence.next_id()
+    
+    def _existing_ids(self):
+        """List the IDs in the database, used to seed a new sequence."""
+        return [row[0] for row in self._conn.execute("SELECT package_id FROM packages")]
+    
+    def get_all_packages(self):
+        """
+        Get all packages from database.
+        
+        Returns:
+            List of Package objects
+        """
+        return self._query()
+    
+    def get_package_by_id(self, package_id):
+        """
+        Get a specific package by ID.
+        
+        Args:
+            package_id: Package ID to search for
+        
+        Returns:
+            Package object if found, None otherwise
+        """
+        packages = self._query("WHERE package_id = ?", (package_id,))
+        return packages[0] if packages else None
+    
+    def add_package(self, package):
+        """
+        Add a new package to database.
+        
+        Args:
+            package: Package object to add
+        
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        record = package.to_dict()
+        with self._conn:
+            cursor = self._conn.execute(_insert_sql("packages", PACKAGE_COLUMNS, "OR IGNORE"),
+                                        _package_row(record))
+        if cursor.rowcount != 1:
+            return False
+        self._notify([(None, record)])
+        return True
+    
+    def update_package(self, package):
+        """
+        Update an existing package.
+        
+        Args:
+            package: Package object with updated data
+        
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        record = package.to_dict()
+        old = self._old_records([package.package_id]).get(package.package_id)
+        with self._conn:
+            cursor = self._conn.execute(_update_sql("packages", PACKAGE_COLUMNS),
+                                        _rotate_key_last(_package_row(record)))
+        if cursor.rowcount != 1:
+            return False
+        self._notify([(old, record)])
+        return True
+    
+    def delete_package(self, package_id):
+        """
+        Delete a package by ID.
+        
+        Args:
+            package_id: Package ID to delete
+        
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        old = self._old_records([package_id]).get(package_id)
+        with self._conn:
+            cursor = self._conn.execute("DELETE FROM packages WHERE package_id = ?", (package_id,))
+        if cursor.rowcount != 1:
+            return False
+        self._notify([(old, None)])
+        return True
+    
+    def get_packages_by_ids(self, package_ids):
+        """
+        Get several packages with batched queries.
+        
+        Args:
+            package_ids: Package IDs to look up
+        
+        Returns:
+            List of Package objects in the order requested; unknown IDs
+            are skipped
+        """
+        package_ids = list(package_ids)
+        by_id = _records_by_key(self._records, 'package_id', package_ids)
+        return [Package.from_dict(by_id[pid]) for pid in package_ids if pid in by_id]
+    
+    def add_packages(self, packages):
+        """
+        Add many packages in one transaction.
+        
+        Args:
+            packages: Package objects to add
+        
+        Returns:
+            int: Number of packages added (duplicates are skipped)
+        """
+        records = [p.to_dict() for p in packages]
+        existing = self._old_records(r['package_id'] for r in records)
+        with self._conn:
+            cursor = self._conn.executemany(_insert_sql("packages", PACKAGE_COLUMNS, "OR IGNORE"),
+                                            [_package_row(r) for r in records])
+        if self._listeners:
+            added = {}
+            for record in records:
+                if record['package_id'] not in existing:
+                    added.setdefault(record['package_id'], record)
+            self._notify([(None, record) for record in added.values()])
+        return cursor.rowcount
+    
+    def update_packages(self, packages):
+        """
+        Update many existing packages in one transaction.
+        
+        Args:
+            packages: Package objects with updated data
+        
+        Returns:
+            int: Number of packages updated (unknown IDs are skipped)
+        """
+        records = [item.to_dict() for item in packages]
+        old = self._old_records(r['package_id'] for r in records)
+        with self._conn:
+            cursor = self._conn.executemany(_update_sql("packages", PACKAGE_COLUMNS),
+                                            [_rotate_key_last(_package_row(r)) for r in records])
+        changes = []
+        for record in records:
+            if record['package_id'] in old:
+                changes.append((old[record['package_id']], record))
+                old[record['package_id']] = record
+        self._notify(changes)
+        return cursor.rowcount
+    
+    def assign_packages(self, assignments):
+        """
+        Put unassigned packages on routes in one write transaction.
+        
+        Args:
+            assignments (dict): Route ID -> package IDs to put on it
+        
+        Returns:
+            dict: Route ID -> IDs of the packages assigned; unknown
+                packages and ones already on a route are skipped
+        """
+        assigned = {}
+        changes = []
+        with self._conn:
+            # Take the write lock before reading so no writer slips in between
+            self._conn.execute("BEGIN IMMEDIATE")
+            for route_id, package_ids in assignments.items():
+                package_ids = list(dict.fromkeys(package_ids))
+                by_id = _records_by_key(self._records, 'package_id', package_ids)
+                old = [by_id[pid] for pid in package_ids if pid in by_id and not by_id[pid]['route_id']]
+                self._conn.executemany("UPDATE packages SET route_id = ? WHERE package_id = ?",
+                                       [(route_id, record['package_id']) for record in old])
+                assigned[route_id] = [record['package_id'] for record in old]
+                changes.extend((record, dict(record, route_id=route_id)) for record in old)
+        self._notify(changes)
+        return assigned
+    
+    def get_packages_by_status(self, status):
+        """
+        Get all packages with a specific status.
+        
+        Args:
+            status: Status to filter by
+        
+        Returns:
+            List of matching packages
+        """
+        return self._query("WHERE status = ?", (status,))
+    
+    def get_packages_by_route(self, route_id):
+        """
+        Get all packages assigned to a specific route.
+        
+        Args:
+            route_id: Route ID to filter by
+        
+        Returns:
+            List of matching packages
+        """
+        return self._query("WHERE route_id = ?", (route_id,))
+    
+    def get_unassigned_packages(self):
+        """
+        Get all packages not assigned to any route.
+        
+        Returns:
+            List[Package]: List of unassigned packages
+        """
+        return self._query("WHERE route_id IS NULL")
+    
+    def get_packages_delivered_between(self, start_date, end_date):
+        """
+        Get delivered packages for a date range, grouped by delivery day.
+        
+        Args:
+            start_date (str): First day (YYYY-MM-DD), inclusive
+            end_date (str): Last day (YYYY-MM-DD), inclusive
+        
+        Returns:
+            dict: Day -> list of Package objects, for days with deliveries,
+                in date order
+        """
+        # delivered_at is an ISO timestamp, so a range on the text column
+        # (up to the start of the following day) uses its index
+        next_day = (datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+        by_day = {}
+        for record in self._records("WHERE delivered_at >= ? AND delivered_at < ? AND status = ?",
+                                    (start_date, next_day, "Delivered")):
+            by_day.setdefault(record['delivered_at'][:10], []).append(Package.from_dict(record))
+        return dict(sorted(by_day.items()))
+    
+    def iter_packages(self, status=None):
+        """
+        Iterate over packages, fetching rows from the cursor on demand.
+        
+        Args:
+            status: Only yield packages with this status, or with any of
+                a tuple of statuses, if given
+        
+        Returns:
+            Iterator of Package objects
+        """
+        rows = self._conn.execute(*self._rows_sql(status, PACKAGE_COLUMNS))
+        return (Package.from_dict(dict(zip(PACKAGE_COLUMNS, row))) for row in rows)
+    
+    def package_rows(self, status=None, fields=None):
+        """
+        Read the package records as plain tuples in one consistent read.
+        
+        Args:
+            status: Only include packages with this status, or with any of
+                a tuple of statuses, if given
+            fields (tuple): Fields to include, in order (default: all of
+                PACKAGE_COLUMNS)
+        
+        Returns:
+            list: Tuples of field values
+        """
+        fields = fields or PACKAGE_COLUMNS
+        unknown = set(fields) - set(PACKAGE_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown package fields: {', '.join(sorted(unknown))}")
+        return self._conn.execute(*self._rows_sql(status, fields)).fetchall()
+    
+    def _rows_sql(self, status, columns):
+        where, params = "", ()
+        if status is not None:
+            params = (status,) if isinstance(status, str) else tuple(status)
+            where = f"WHERE status IN ({', '.join('?' for _ in params)})"
+        return f"SELECT {', '.join(columns)} FROM packages {where} ORDER BY rowid", params
+    
+    def count_packages(self):
+        """
+        Count the packages in the database.
+        
+        Returns:
+            int: Number of packages
+        """
+        return self._conn.execute("SELECT COUNT(*) FROM packages").fetchone()[0]
+
+
+class SQLiteRouteDatabase(ChangeNotifier):
+    """Handles route data storage and retrieval using SQLite."""
+    
+    def __init__(self, data_dir="data"):
+        """
+        Initialize route database.
+        
+        Args:
+            data_dir (str): Directory for data files
+        """
+        self.data_dir = data_dir
+        self.storage = "sqlite"
+        self._conn = connect(data_dir)
+        self._sequence = None
+    
+    def close(self):
+        """Close the database connection."""
+        self._conn.close()
+    
+    def _external_version(self):
+        # data_version changes when other connections commit and
+        # total_changes when this one modifies rows
+        return (self._conn.execute("PRAGMA data_version").fetchone()[0], self._conn.total_changes)
+    
+    def _records(self, where="", params=()):
+        sql = f"SELECT {', '.join(ROUTE_COLUMNS)} FROM routes {where} ORDER BY rowid"
+        records = []
+        for row in self._conn.execute(sql, params):
+            record = dict(zip(ROUTE_COLUMNS, row))
+            record['package_ids'] = json.loads(record['package_ids'] or "[]")
+            records.append(record)
+        return records
+    
+    def _query(self, where="", params=()):
+        return [Route.from_dict(record) for record in self._records(where, params)]
+    
+    def _old_records(self, route_ids):
+        """Fetch stored records about to change, only if someone is listening."""
+        if not self._listeners:
+            return {}
+        return _records_by_key(self._records, 'route_id', route_ids)
+    
+    def next_route_id(self):
+        """
+        Allocate a new unique route ID.
+        
+        Returns:
+            str: New ID (e.g., "RT0001")
+        """
+        if self._sequence is None:
+            self._sequence = SequenceAllocator(self.data_dir, "RT", seed=self._existing_ids)
+        return self._sequence.next_id()
+    
+    def _existing_ids(self):
+        """List the IDs in the database, used to seed a new sequence."""
+        return [row[0] for row in self._conn.execute("SELECT route_id FROM routes")]
+    
+    def get_all_routes(self):
+        """
+        Get all routes from database.
+        
+        Returns:
+            List[Route]: List of Route objects
+        """
+        return self._query()
+    
+    def get_route_by_id(self, route_id):
+        """
+        Get a specific route by ID.
+        
+        Args:
+            route_id: Route ID to search for
+        
+        Returns:
+            Route object if found, None otherwise
+        """
+        routes = self._query("WHERE route_id = ?", (route_id,))
+        return routes[0] if routes else None
+    
+    def add_route(self, route):
+        """
+        Add a new route to database.
+        
+        Args:
+            route: Route object to add
+        
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        record = route.to_dict()
+        with self._conn:
+            cursor = self._conn.execute(_insert_sql("routes", ROUTE_COLUMNS, "OR IGNORE"),
+                                        _route_row(record))
+        if cursor.rowcount != 1:
+            return False
+        self._notify([(None, record)])
+        return True
+    
+    def update_route(self, route):
+        """
+        Update an existing route.
+        
+        Args:
+            route: Route object with updated data
+        
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        record = route.to_dict()
+        old = self._old_records([route.route_id]).get(route.route_id)
+        with self._conn:
+            cursor = self._conn.execute(_update_sql("routes", ROUTE_COLUMNS),
+                                        _rotate_key_last(_route_row(record)))
+        if cursor.rowcount != 1:
+            return False
+        self._notify([(old, record)])
+        return True
+    
+    def delete_route(self, route_id):
+        """
+        Delete a route by ID.
+        
+        Args:
+            route_id: Route ID to delete
+        
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        old = self._old_records([route_id]).get(route_id)
+        with self._conn:
+            cursor = self._conn.execute("DELETE FROM routes WHERE route_id = ?", (route_id,))
+        if cursor.rowcount != 1:
+            return False
+        self._notify([(old, None)])
+        return True
+    
+    def update_routes(self, routes):
+        """
+        Update many existing routes in one transaction.
+        
+        Args:
+            routes: Route objects with updated data
+        
+        Returns:
+            int: Number of routes updated (unknown IDs are skipped)
+        """
+        records = [item.to_dict() for item in routes]
+        old = self._old_records(r['route_id'] for r in records)
+        with self._conn:
+            cursor = self._conn.executemany(_update_sql("routes", ROUTE_COLUMNS),
+                                            [_rotate_key_last(_route_row(r)) for r in records])
+        changes = []
+        for record in records:
+            if record['route_id'] in old:
+                changes.append((old[record['route_id']], record))
+                old[record['route_id']] = record
+        self._notify(changes)
+        return cursor.rowcount
+    
+    def add_packages_to_routes(self, assignments):
+        """
+        Append package IDs to routes in one write transaction.
+        
+        Args:
+            assignments (dict): Route ID -> package IDs to add
+        
+        Returns:
+            int: Number of routes updated (unknown IDs are skipped)
+        """
+        changes = []
+        with self._conn:
+            # Take the write lock before reading so no writer slips in between
+            self._conn.execute("BEGIN IMMEDIATE")
+            by_id = _records_by_key(self._records, 'route_id', [rid for rid, ids in assignments.items() if ids])
+            for route_id, old in by_id.items():
+                package_ids = list(old['package_ids'])
+                package_ids.extend(pid for pid in dict.fromkeys(assignments[route_id]) if pid not in package_ids)
+                self._conn.execute("UPDATE routes SET package_ids = ? WHERE route_id = ?",
+                                   (json.dumps(package_ids), route_id))
+                changes.append((old, dict(old, package_ids=package_ids)))
+        self._notify(changes)
+        return len(changes)
+    
+    def reorder_route(self, route_id, package_ids, estimated_fuel=None):
+        """
+        Save a new stop order in one write transaction.
+        
+        Args:
+            route_id: Route ID
+            package_ids: Package IDs in the new stop order; see
+                RouteDatabase.reorder_route
+            estimated_fuel (float): Estimated litres for the new order
+        
+        Returns:
+            bool: True if successful, False if the route was not found
+        """
+        with self._conn:
+            # Take the write lock before reading so no writer slips in between
+            self._conn.execute("BEGIN IMMEDIATE")
+            old = _records_by_key(self._records, 'route_id', [route_id]).get(route_id)
+            if old is None:
+                return False
+            route = Route.from_dict(old)
+            if route.reorder_packages(package_ids) and estimated_fuel is not None:
+                route.estimated_fuel = estimated_fuel
+            record = route.to_dict()
+            self._conn.execute(_update_sql("routes", ROUTE_COLUMNS), _rotate_key_last(_route_row(record)))
+        self._notify([(old, record)])
+        return True
+    
+    def get_routes_by_date(self, date):
+        """
+        Get all routes for a specific date.
+        
+        Args:
+            date: Date to filter by (YYYY-MM-DD)
+        
+        Returns:
+            List of matching routes
+        """
+        return self._query("WHERE date = ?", (date,))
+    
+    def get_routes_by_driver(self, driver_name):
+        """
+        Get all routes assigned to a specific driver.
+        
+        Args:
+            driver_name: Driver name to filter by
+        
+        Returns:
+            List of matching routes
+        """
+        return self._query("WHERE driver_name = ?", (driver_name,))
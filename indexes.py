@@ -0,0 +1,205 @@
+"""
+FreshRoute Logistics - In-Memory Indexes
+
+Keeps package and route records in memory keyed by ID so lookups do not
+have to re-read and re-parse the data file. Secondary indexes map package
+status, route ID and delivery day to the matching package IDs and are
+updated on every write.
+"""
+
+
+class RecordIndex:
+    """Records kept in insertion order and keyed by one of their fields."""
+    
+    key = None
+    
+    def __init__(self, records=()):
+        """
+        Build the index from a sequence of record dictionaries.
+        
+        Args:
+            records: Iterable of record dictionaries in file order
+        """
+        self._records = {}
+        self._reset()
+        for record in records:
+            self.put(record)
+    
+    def __len__(self):
+        return len(self._records)
+    
+    def __contains__(self, record_id):
+        return record_id in self._records
+    
+    def get(self, record_id):
+        """
+        Get the stored record for an ID.
+        
+        Args:
+            record_id: ID to look up
+        
+        Returns:
+            dict: Stored record, or None if not indexed
+        """
+        return self._records.get(record_id)
+    
+    def records(self):
+        """
+        Get all stored records in insertion order.
+        
+        Returns:
+            list: List of record dictionaries
+        """
+        return list(self._records.values())
+    
+    def put(self, record):
+        """
+        Insert or replace a record.
+        
+        Args:
+            record (dict): Record dictionary
+        
+        Returns:
+            dict: The record it replaced, or None for a new ID
+        """
+        record_id = record[self.key]
+        old = self._records.get(record_id)
+        if old is not None:
+            self._unlink(old)
+        self._records[record_id] = record
+        self._link(record)
+        return old
+    
+    def remove(self, record_id):
+        """
+        Remove a record.
+        
+        Args:
+            record_id: ID to remove
+        
+        Returns:
+            dict: The removed record, or None if not indexed
+        """
+        old = self._records.pop(record_id, None)
+        if old is not None:
+            self._unlink(old)
+        return old
+    
+    def _reset(self):
+        """Create empty secondary indexes."""
+    
+    def _link(self, record):
+        """Add a record to the secondary indexes."""
+    
+    def _unlink(self, record):
+        """Remove a record from the secondary indexes."""
+
+
+class PackageIndex(RecordIndex):
+    """Package records keyed by ID, with status and route secondary indexes."""
+    
+    key = 'package_id'
+    
+    def _reset(self):
+        # Dicts with None values are used as insertion-ordered sets
+        self._by_status = {}
+        self._by_route = {}
+        self._unassigned = {}
+        # "YYYY-MM-DD" -> IDs of packages delivered that day
+        self._by_delivery_day = {}
+    
+    def ids_with_status(self, status):
+        """
+        Get the IDs of packages with a given status.
+        
+        Args:
+            status: Status to look up
+        
+        Returns:
+            list: Matching package IDs
+        """
+        return list(self._by_status.get(status, ()))
+    
+    def ids_on_route(self, route_id):
+        """
+        Get the IDs of packages assigned to a route.
+        
+        Args:
+            route_id: Route ID to look up
+        
+        Returns:
+            list: Matching package IDs
+        """
+        return list(self._by_route.get(route_id, ()))
+    
+    def unassigned_ids(self):
+        """
+        Get the IDs of packages not assigned to any route.
+        
+        Returns:
+            list: Matching package IDs
+        """
+        return list(self._unassigned)
+    
+    def ids_delivered_between(self, start_date, end_date):
+        """
+        Get the IDs of packages delivered in a date range, grouped by day.
+        
+        Only the day buckets are compared, not the packages in them.
+        
+        Args:
+            start_date (str): First day (YYYY-MM-DD), inclusive
+            end_date (str): Last day (YYYY-MM-DD), inclusive
+        
+        Returns:
+            dict: Day -> list of package IDs, in date order
+        """
+        days = sorted(day for day in self._by_delivery_day if start_date <= day <= end_date)
+        return {day: list(self._by_delivery_day[day]) for day in days}
+    
+    def _link(self, record):
+        package_id = record['package_id']
+        self._by_status.setdefault(record.get('status'), {})[package_id] = None
+        route_id = record.get('route_id')
+        if route_id is None:
+            self._unassigned[package_id] = None
+        else:
+            self._by_route.setdefault(route_id, {})[package_id] = None
+        day = _delivery_day(record)
+        if day is not None:
+            self._by_delivery_day.setdefault(day, {})[package_id] = None
+    
+    def _unlink(self, record):
+        package_id = record['package_id']
+        _discard(self._by_status, record.get('status'), package_id)
+        route_id = record.get('route_id')
+        if route_id is None:
+            self._unassigned.pop(package_id, None)
+        else:
+            _discard(self._by_route, route_id, package_id)
+        day = _delivery_day(record)
+        if day is not None:
+            _discard(self._by_delivery_day, day, package_id)
+
+
+class RouteIndex(RecordIndex):
+    """Route records keyed by route ID."""
+    
+    key = 'route_id'
+
+
+def _delivery_day(record):
+    """Get the YYYY-MM-DD a delivered package record was delivered on."""
+    delivered_at = record.get('delivered_at')
+    if record.get('status') == "Delivered" and delivered_at:
+        return delivered_at[:10]
+    return None
+
+
+def _discard(index, key, package_id):
+    """Remove an ID from one bucket of a secondary index, dropping empty buckets."""
+    bucket = index.get(key)
+    if bucket is not None:
+        bucket.pop(package_id, None)
+        if not bucket:
+            del index[key]
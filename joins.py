@@ -0,0 +1,26 @@
+"""
+FreshRoute Logistics - Route/Package Joins
+
+Helpers for walking routes together with the packages they reference.
+Packages are fetched with one get_packages_by_ids call for the whole
+batch of routes instead of one get_package_by_id call per stop.
+"""
+
+
+def join_routes_packages(routes, package_db):
+    """
+    Pair each route with its packages using a single package read.
+    
+    Args:
+        routes: Route objects to join
+        package_db (PackageDatabase): Package database instance
+    
+    Yields:
+        tuple: (route, packages) with packages in route stop order; IDs
+            missing from the package database are skipped
+    """
+    routes = list(routes)
+    package_ids = [pkg_id for route in routes for pkg_id in route.package_ids]
+    by_id = {pkg.package_id: pkg for pkg in package_db.get_packages_by_ids(package_ids)}
+    for route in routes:
+        yield route, [by_id[pkg_id] for pkg_id in route.package_ids if pkg_id in by_id]
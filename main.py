@@ -5,19 +5,44 @@ Assigned to: ALLEN
 Main application flow integrating all system modules.
 """
 
+import os
 from database_packages import PackageDatabase
 from database_routes import RouteDatabase
+from spatial import SpatialIndex
+from summary import SummaryCounters
 import package_manager
 import route_manager
 import tracking
 import reports
 import utils
 
+# Storage engine for both databases: "json", "journal" or "sqlite"
+STORAGE = "json"
+
+# Serve lookups from an in-memory index instead of re-reading the JSON file
+# on every call ("journal" is always indexed; "sqlite" ignores it)
+INDEXED = True
+
+# File locking lets several dispatchers share the data directory (POSIX only;
+# "sqlite" ignores it and locks its own file)
+LOCKING = os.name == "posix"
+
 
 def main():
-    package_db = PackageDatabase()
-    route_db = RouteDatabase()
+    package_db = PackageDatabase(storage=STORAGE, indexed=INDEXED, locking=LOCKING)
+    route_db = RouteDatabase(storage=STORAGE, indexed=INDEXED, locking=LOCKING)
+    summary = SummaryCounters(locking=LOCKING)
+    summary.attach(package_db, route_db)
+    spatial_index = SpatialIndex(locking=LOCKING)
+    spatial_index.attach(package_db)
 
+    try:
+        main_menu(package_db, route_db, summary, spatial_index)
+    finally:
+        spatial_index.close()
+
+
+def main_menu(package_db, route_db, summary, spatial_index):
     while True:
         utils.clear_screen()
         utils.print_header("FreshRoute Logistics System")
@@ -32,7 +57,7 @@ def main():
         choice = input("\nEnter your choice: ")
 
         if choice == "1":
-            package_manager.package_management_menu(package_db)
+            package_manager.package_management_menu(package_db, spatial_index)
 
         elif choice == "2":
             route_manager.route_management_menu(route_db, package_db)
@@ -41,7 +66,7 @@ def main():
             tracking.tracking_menu(package_db, route_db)
 
         elif choice == "4":
-            show_reports_menu(package_db, route_db)
+            show_reports_menu(package_db, route_db, summary)
 
         elif choice == "5":
             print("Exiting system...")
@@ -52,7 +77,7 @@ def main():
             utils.pause()
 
 
-def show_reports_menu(package_db, route_db):
+def show_reports_menu(package_db, route_db, summary=None):
     while True:
         utils.clear_screen()
         utils.print_header("Reports Menu")
@@ -63,6 +88,7 @@ def show_reports_menu(package_db, route_db):
         print("4. Fuel Usage Estimates")
         print("5. Problematic Addresses Report")
         print("6. Summary Statistics")
+        print("7. Run All Reports")
         print("0. Back to Main Menu")
 
         choice = input("\nEnter your choice: ")
@@ -77,13 +103,16 @@ def show_reports_menu(package_db, route_db):
             reports.report_delayed_deliveries(package_db)
 
         elif choice == "4":
-            reports.report_fuel_usage_estimates(route_db)
+            reports.report_fuel_usage_estimates(route_db, package_db)
 
         elif choice == "5":
             reports.report_problematic_addresses(package_db)
 
         elif choice == "6":
-            reports.generate_summary_statistics(package_db, route_db)
+            reports.generate_summary_statistics(package_db, route_db, summary)
+
+        elif choice == "7":
+            reports.report_all(package_db, route_db)
 
         elif choice == "0":
             break
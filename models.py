@@ -3,9 +3,17 @@ from datetime import datetime
 
 class Package:
     
+    __slots__ = (
+        'package_id', 'sender', 'recipient_name', 'recipient_address',
+        'recipient_phone', 'weight', 'category', 'status', 'route_id',
+        'created_at', 'updated_at', 'delivered_at', 'proof_of_delivery',
+        'latitude', 'longitude',
+    )
+    
     def __init__(self, package_id, sender, recipient_name,
                  recipient_address, recipient_phone, weight,
-                 category, status="Pending", route_id=None):
+                 category, status="Pending", route_id=None,
+                 latitude=None, longitude=None):
         self.package_id = package_id
         self.sender = sender
         self.recipient_name = recipient_name
@@ -15,10 +23,14 @@ class Package:
         self.category = category
         self.status = status
         self.route_id = route_id
-        self.created_at = datetime.now().isoformat()
-        self.updated_at = datetime.now().isoformat()
+        now = datetime.now().isoformat()
+        self.created_at = now
+        self.updated_at = now
         self.delivered_at = None
         self.proof_of_delivery = None
+        # Stop coordinate for distance-based routing, if the address is geocoded
+        self.latitude = latitude
+        self.longitude = longitude
     
     def to_dict(self):
         """
@@ -40,7 +52,9 @@ class Package:
             'created_at': self.created_at,
             'updated_at': self.updated_at,
             'delivered_at': self.delivered_at,
-            'proof_of_delivery': self.proof_of_delivery
+            'proof_of_delivery': self.proof_of_delivery,
+            'latitude': self.latitude,
+            'longitude': self.longitude
         }
     
     @staticmethod
@@ -54,21 +68,28 @@ class Package:
         Returns:
             Package: Package object
         """
-        pkg = Package(
-            data['package_id'],
-            data['sender'],
-            data['recipient_name'],
-            data['recipient_address'],
-            data['recipient_phone'],
-            data['weight'],
-            data['category'],
-            data.get('status', 'Pending'),
-            data.get('route_id')
-        )
-        pkg.created_at = data.get('created_at', pkg.created_at)
-        pkg.updated_at = data.get('updated_at', pkg.updated_at)
+        # Bypass __init__: stored records already carry their timestamps
+        pkg = Package.__new__(Package)
+        pkg.package_id = data['package_id']
+        pkg.sender = data['sender']
+        pkg.recipient_name = data['recipient_name']
+        pkg.recipient_address = data['recipient_address']
+        pkg.recipient_phone = data['recipient_phone']
+        pkg.weight = data['weight']
+        pkg.category = data['category']
+        pkg.status = data.get('status', 'Pending')
+        pkg.route_id = data.get('route_id')
+        if 'created_at' in data and 'updated_at' in data:
+            pkg.created_at = data['created_at']
+            pkg.updated_at = data['updated_at']
+        else:
+            now = datetime.now().isoformat()
+            pkg.created_at = data.get('created_at', now)
+            pkg.updated_at = data.get('updated_at', now)
         pkg.delivered_at = data.get('delivered_at')
         pkg.proof_of_delivery = data.get('proof_of_delivery')
+        pkg.latitude = data.get('latitude')
+        pkg.longitude = data.get('longitude')
         return pkg
     
     def update_status(self, new_status):
@@ -81,7 +102,7 @@ class Package:
         self.status = new_status
         self.updated_at = datetime.now().isoformat()
         if new_status == "Delivered":
-            self.delivered_at = datetime.now().isoformat()
+            self.delivered_at = self.updated_at
 
 
 class Route:
@@ -89,6 +110,11 @@ class Route:
     Represents a delivery route.
     """
     
+    __slots__ = (
+        'route_id', 'route_name', 'driver_name', 'driver_phone', 'date',
+        'package_ids', 'status', 'created_at', 'estimated_fuel',
+    )
+    
     def __init__(self, route_id, route_name, driver_name,
                  driver_phone, date):
         """
@@ -119,7 +145,7 @@ class Route:
             'driver_name': self.driver_name,
             'driver_phone': self.driver_phone,
             'date': self.date,
-            'package_ids': self.package_ids,
+            'package_ids': list(self.package_ids),
             'status': self.status,
             'created_at': self.created_at,
             'estimated_fuel': self.estimated_fuel
@@ -135,16 +161,18 @@ class Route:
         Returns:
             Route: Route object
         """
-        route = Route(
-            data['route_id'],
-            data['route_name'],
-            data['driver_name'],
-            data['driver_phone'],
-            data['date']
-        )
-        route.package_ids = data.get('package_ids', [])
+        route = Route.__new__(Route)
+        route.route_id = data['route_id']
+        route.route_name = data['route_name']
+        route.driver_name = data['driver_name']
+        route.driver_phone = data['driver_phone']
+        route.date = data['date']
+        route.package_ids = list(data.get('package_ids', []))
         route.status = data.get('status', 'Active')
-        route.created_at = data.get('created_at', route.created_at)
+        if 'created_at' in data:
+            route.created_at = data['created_at']
+        else:
+            route.created_at = datetime.now().isoformat()
         route.estimated_fuel = data.get('estimated_fuel', 0.0)
         return route
     
@@ -166,4 +194,25 @@ class Route:
             package_id: Package ID to remove
         """
         if package_id in self.package_ids:
-            self.package_ids.remove(package_id)
\ No newline at end of file
+            self.package_ids.remove(package_id)
+    
+    def reorder_packages(self, order):
+        """
+        Put this route's packages in a new stop order.
+        
+        Packages missing from order keep their relative order after the
+        reordered ones; IDs in order that are not on the route are skipped.
+        
+        Args:
+            order: Package IDs in the new stop order
+        
+        Returns:
+            bool: True if order held exactly the route's packages
+        """
+        on_route = set(self.package_ids)
+        wanted = list(dict.fromkeys(order))
+        ordered = [pid for pid in wanted if pid in on_route]
+        placed = set(ordered)
+        rest = [pid for pid in self.package_ids if pid not in placed]
+        self.package_ids = ordered + rest
+        return not rest and len(ordered) == len(wanted)
\ No newline at end of file
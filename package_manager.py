@@ -7,6 +7,10 @@ from models import Package
 import utils
 
 
+# Most packages listed by the nearby packages lookup
+NEARBY_LIMIT = 20
+
+
 def register_package(db):
     """
     Register a new package in the system.
@@ -23,8 +27,7 @@ def register_package(db):
     """
     utils.print_header("Register New Package")
     
-    packages = db.get_all_packages()
-    package_id = utils.generate_id("PKG", [p.package_id for p in packages])
+    package_id = db.next_package_id()
     
     sender = utils.get_input("Sender name")
     recipient_name = utils.get_input("Recipient name")
@@ -35,8 +38,14 @@ def register_package(db):
     print("\\nCategories: Electronics, Documents, Food, Clothing, Other")
     category = utils.get_input("Package category", "Other")
     
+    latitude = utils.get_number_input("Latitude (Enter to skip)", -90, 90)
+    longitude = utils.get_number_input("Longitude (Enter to skip)", -180, 180) if latitude is not None else None
+    if longitude is None:
+        latitude = None
+    
     package = Package(package_id, sender, recipient_name, recipient_address, 
-                     recipient_phone, weight, category)
+                     recipient_phone, weight, category,
+                     latitude=latitude, longitude=longitude)
     
     if db.add_package(package):
         utils.print_success(f"Package {package_id} registered successfully!")
@@ -142,6 +151,10 @@ def edit_package(db):
     package.recipient_address = utils.get_input("Recipient address", package.recipient_address)
     package.recipient_phone = utils.get_input("Recipient phone", package.recipient_phone)
     package.category = utils.get_input("Category", package.category)
+    latitude = utils.get_number_input(f"Latitude [{package.latitude}]", -90, 90)
+    longitude = utils.get_number_input(f"Longitude [{package.longitude}]", -180, 180)
+    if latitude is not None and longitude is not None:
+        package.latitude, package.longitude = latitude, longitude
     
     if db.update_package(package):
         utils.print_success("Package updated successfully!")
@@ -218,12 +231,57 @@ def view_unassigned_packages(db):
     utils.pause()
 
 
-def package_management_menu(db):
+def find_nearby_packages(db, spatial_index):
+    """
+    List the packages closest to a package's stop.
+    
+    Args:
+        db (PackageDatabase): Package database instance
+        spatial_index (SpatialIndex): Index of package locations
+    """
+    utils.print_header("Nearby Packages")
+    
+    package_id = utils.get_input("Enter package ID")
+    location = spatial_index.location(package_id)
+    
+    if location is None:
+        utils.print_error("Package not found or has no coordinates")
+        utils.pause()
+        return
+    
+    radius = utils.get_number_input("Search radius in km (Enter for 1)", 0.01, 100) or 1.0
+    nearby = [(pkg_id, km) for pkg_id, km in spatial_index.within_radius(*location, radius)
+              if pkg_id != package_id][:NEARBY_LIMIT]
+    
+    if not nearby:
+        print(f"\nNo other packages within {radius} km.")
+    else:
+        packages = {pkg.package_id: pkg for pkg in db.get_packages_by_ids([pkg_id for pkg_id, _km in nearby])}
+        widths = [12, 20, 20, 15, 10]
+        utils.print_table_row(["ID", "Recipient", "Address", "Status", "Distance"], widths)
+        print("-" * 80)
+        for pkg_id, km in nearby:
+            pkg = packages.get(pkg_id)
+            if pkg:
+                utils.print_table_row([
+                    pkg.package_id,
+                    utils.truncate_string(pkg.recipient_name, 18),
+                    utils.truncate_string(pkg.recipient_address, 18),
+                    pkg.status,
+                    f"{km:.2f} km"
+                ], widths)
+    
+    utils.pause()
+
+
+def package_management_menu(db, spatial_index=None):
     """
     Display package management menu and handle user choices.
     
     Args:
         db (PackageDatabase): Package database instance
+        spatial_index (SpatialIndex): Index of package locations, if
+            nearby-package lookups are available
     
     TODO: Create menu loop with all package operations
     """
@@ -236,6 +294,8 @@ def package_management_menu(db):
         print("4. Edit Package")
         print("5. Delete Package")
         print("6. View Unassigned Packages")
+        if spatial_index is not None:
+            print("7. Find Nearby Packages")
         print("0. Back to Main Menu")
         
         choice = input("\nEnter choice: ")
@@ -252,5 +312,7 @@ def package_management_menu(db):
             delete_package(db)
         elif choice == '6':
             view_unassigned_packages(db)
+        elif choice == '7' and spatial_index is not None:
+            find_nearby_packages(db, spatial_index)
         elif choice == '0':
             break
\ No newline at end of file
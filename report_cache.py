@@ -0,0 +1,69 @@
+"""
+FreshRoute Logistics - Report Result Cache
+
+Memoizes report results by report name, parameters and the data version
+of each database the report reads. Any write bumps a data version, so a
+cached result is only reused while the data it was computed from is
+unchanged. A data version only means something for the instance that
+reported it, so each entry also holds weak references to its databases
+and is only reused for those same objects. The least recently used
+results are evicted first.
+"""
+
+import weakref
+from collections import OrderedDict
+
+
+# Number of report results kept by the default cache
+DEFAULT_CACHE_SIZE = 32
+
+
+class ReportCache:
+    """LRU cache of report results keyed by database data versions."""
+    
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        """
+        Initialize the cache.
+        
+        Args:
+            maxsize (int): Results kept before the least recently used one
+                is dropped
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+    
+    def get(self, report, params, databases, compute):
+        """
+        Get a report result, computing it only if the data has changed.
+        
+        Args:
+            report (str): Report name
+            params (tuple): Hashable report parameters
+            databases: Databases the report reads
+            compute: Callable producing the result on a miss
+        
+        Returns:
+            The cached or newly computed result. It is shared with the
+            cache, so callers must not modify it.
+        """
+        databases = tuple(databases)
+        key = (report, params) + tuple((id(db), db.data_version) for db in databases)
+        entry = self._results.get(key)
+        # An id can be reused once its database is garbage collected
+        if entry is not None and all(ref() is db for ref, db in zip(entry[0], databases)):
+            self.hits += 1
+            self._results.move_to_end(key)
+            return entry[1]
+        self.misses += 1
+        result = compute()
+        self._results[key] = (tuple(weakref.ref(db) for db in databases), result)
+        self._results.move_to_end(key)
+        if len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
+        return result
+    
+    def clear(self):
+        """Drop every cached result."""
+        self._results.clear()
@@ -1,55 +1,150 @@
+import argparse
 import csv
+import gzip
+import itertools
+import json
+import os
+import sys
 from datetime import datetime
+from aggregates import (DelayedDeliveries, DeliveredPerDay, DeliveryAging, DriverPerformance, FuelUsage,
+                        ProblematicAddresses, SummaryStatistics, run_combined, run_parallel, run_serial)
 from database_packages import PackageDatabase
 from database_routes import RouteDatabase
+from joins import join_routes_packages
+from models import Package, Route
+from report_cache import ReportCache
+from routing import DEFAULT_VEHICLE, ROUTE_MATRICES, estimate_fuel
+from summary import build_summary
 import utils
 
 
+# Rows handed to the CSV writer at a time, and the output buffer size
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_BUFFER_SIZE = 1024 * 1024
+
+# Worker processes for the scanning reports; above 1 they are computed in
+# a process pool (see aggregates.run_parallel)
+REPORT_WORKERS = 1
+
+# Below this many packages a scan is faster than starting a process pool,
+# so the reports stay in this process whatever the worker count
+PARALLEL_MIN_PACKAGES = 50000
+
+# Oldest undelivered packages listed by the delayed deliveries report, and
+# the SLA thresholds (hours since creation) its age histogram is split at
+DELAYED_TOP_K = 20
+SLA_BUCKET_HOURS = (24, 48, 72)
+
+# Report results reused until a database they read is written to
+REPORT_CACHE = ReportCache()
+
+
+def compute_delivered_per_day(package_db, start_date, end_date):
+    """
+    Get delivered packages per day over a date range.
+    
+    Args:
+        package_db (PackageDatabase): Package database instance
+        start_date (str): First day (YYYY-MM-DD)
+        end_date (str): Last day (YYYY-MM-DD); the two are swapped if
+            given in reverse order
+    
+    Returns:
+        dict: Day -> list of Package objects, in date order
+    """
+    if end_date < start_date:
+        start_date, end_date = end_date, start_date
+    return package_db.get_packages_delivered_between(start_date, end_date)
+
+
 def report_packages_delivered_per_day(package_db):
     """
-    Generate report of packages delivered on a specific day.
+    Generate report of packages delivered per day over a date range.
     
     Args:
         package_db (PackageDatabase): Package database instance
     
     TODO:
-    1. Get date from user
-    2. Filter delivered packages for that date
-    3. Display summary and list
+    1. Get date range from user
+    2. Look up delivered packages per day in that range
+    3. Display daily counts and package lists
     4. Option to export to CSV
     """
     utils.print_header("Packages Delivered Per Day")
     
-    date = utils.get_date_input("Enter date")
-    packages = package_db.get_packages_by_status("Delivered")
-    
-    delivered_on_date = [p for p in packages if p.delivered_at and p.delivered_at.startswith(date)]
-    
-    print(f"\nPackages delivered on {date}:")
-    if not delivered_on_date:
-        print("No packages delivered on this date.")
+    start_date = utils.get_date_input("Enter start date")
+    end_date = utils.get_date_input("Enter end date")
+    if end_date < start_date:
+        start_date, end_date = end_date, start_date
+    by_day = REPORT_CACHE.get("delivered_per_day", (start_date, end_date), (package_db,),
+                              lambda: compute_delivered_per_day(package_db, start_date, end_date))
+    
+    period = start_date if start_date == end_date else f"{start_date} to {end_date}"
+    print(f"\nPackages delivered on {period}:")
+    if not by_day:
+        print("No packages delivered in this period.")
     else:
-        widths = [12, 20, 20]
-        utils.print_table_row(["ID", "Recipient", "Address"], widths)
-        print("-" * 55)
+        widths = [12, 10]
+        utils.print_table_row(["Date", "Delivered"], widths)
+        print("-" * 24)
+        for day, packages in by_day.items():
+            utils.print_table_row([day, len(packages)], widths)
         
-        for pkg in delivered_on_date:
-            utils.print_table_row([
-                pkg.package_id,
-                utils.truncate_string(pkg.recipient_name, 18),
-                utils.truncate_string(pkg.recipient_address, 18)
-            ], widths)
+        widths = [12, 20, 20]
+        for day, packages in by_day.items():
+            print(f"\n{day}:")
+            utils.print_table_row(["ID", "Recipient", "Address"], widths)
+            print("-" * 55)
+            for pkg in packages:
+                utils.print_table_row([
+                    pkg.package_id,
+                    utils.truncate_string(pkg.recipient_name, 18),
+                    utils.truncate_string(pkg.recipient_address, 18)
+                ], widths)
         
-        print(f"\nTotal delivered: {len(delivered_on_date)} packages")
+        total = sum(len(packages) for packages in by_day.values())
+        print(f"\nTotal delivered: {total} packages")
         
         if utils.confirm_action("Export to CSV?"):
-            filename = f"delivered_packages_{date}.csv"
-            data = [{"ID": p.package_id, "Recipient": p.recipient_name, "Address": p.recipient_address} for p in delivered_on_date]
-            export_to_csv(data, filename, ["ID", "Recipient", "Address"])
+            filename = f"delivered_packages_{start_date}.csv"
+            if end_date != start_date:
+                filename = f"delivered_packages_{start_date}_to_{end_date}.csv"
+            data = ({"Date": day, "ID": p.package_id, "Recipient": p.recipient_name, "Address": p.recipient_address}
+                    for day, packages in by_day.items() for p in packages)
+            export_to_csv(data, filename, ["Date", "ID", "Recipient", "Address"],
+                          compress=utils.confirm_action("Compress with gzip?"))
     
     utils.pause()
 
 
+def _use_pool(package_db, workers):
+    """Decide whether a scanning report is worth spreading over workers."""
+    return workers > 1 and package_db.count_packages() >= PARALLEL_MIN_PACKAGES
+
+
+def compute_driver_performance(route_db, package_db, workers=1):
+    """
+    Count assigned and delivered packages per driver.
+    
+    Args:
+        route_db (RouteDatabase): Route database instance
+        package_db (PackageDatabase): Package database instance
+        workers (int): Worker processes; 1, or a database smaller than
+            PARALLEL_MIN_PACKAGES, computes in this process
+    
+    Returns:
+        dict: Driver name -> {"assigned": int, "delivered": int}
+    """
+    if _use_pool(package_db, workers):
+        return run_parallel(DriverPerformance(route_db.get_all_routes()), package_db, workers)
+    driver_stats = {}
+    for route, packages in join_routes_packages(route_db.get_all_routes(), package_db):
+        stats = driver_stats.setdefault(route.driver_name, {"assigned": 0, "delivered": 0})
+        stats["assigned"] += len(packages)
+        stats["delivered"] += sum(1 for pkg in packages if pkg.status == "Delivered")
+    return driver_stats
+
+
 def report_driver_performance(route_db, package_db):
     """
     Generate driver performance report.
@@ -70,20 +165,8 @@ def report_driver_performance(route_db, package_db):
     """
     utils.print_header("Driver Performance Report")
     
-    routes = route_db.get_all_routes()
-    driver_stats = {}
-    
-    for route in routes:
-        driver = route.driver_name
-        if driver not in driver_stats:
-            driver_stats[driver] = {"assigned": 0, "delivered": 0}
-        
-        for pkg_id in route.package_ids:
-            pkg = package_db.get_package_by_id(pkg_id)
-            if pkg:
-                driver_stats[driver]["assigned"] += 1
-                if pkg.status == "Delivered":
-                    driver_stats[driver]["delivered"] += 1
+    driver_stats = REPORT_CACHE.get("driver_performance", (), (package_db, route_db),
+                                    lambda: compute_driver_performance(route_db, package_db, REPORT_WORKERS))
     
     print("\nDriver Performance:")
     if not driver_stats:
@@ -103,12 +186,50 @@ def report_driver_performance(route_db, package_db):
             ], widths)
         
         if utils.confirm_action("Export to CSV?"):
-            data = [{"Driver": d, "Assigned": s["assigned"], "Delivered": s["delivered"], "Rate": f"{(s['delivered']/s['assigned']*100) if s['assigned'] > 0 else 0:.1f}%"} for d, s in driver_stats.items()]
-            export_to_csv(data, f"driver_performance_{utils.get_today_date()}.csv", ["Driver", "Assigned", "Delivered", "Rate"])
+            data = ({"Driver": d, "Assigned": s["assigned"], "Delivered": s["delivered"], "Rate": f"{(s['delivered']/s['assigned']*100) if s['assigned'] > 0 else 0:.1f}%"} for d, s in driver_stats.items())
+            export_to_csv(data, f"driver_performance_{utils.get_today_date()}.csv", ["Driver", "Assigned", "Delivered", "Rate"],
+                          compress=utils.confirm_action("Compress with gzip?"))
     
     utils.pause()
 
 
+def compute_delayed_deliveries(package_db):
+    """
+    Get packages that have not been delivered yet.
+    
+    Args:
+        package_db (PackageDatabase): Package database instance
+    
+    Returns:
+        list: Pending packages followed by packages out for delivery
+    """
+    pending = package_db.get_packages_by_status("Pending")
+    out_for_delivery = package_db.get_packages_by_status("Out for Delivery")
+    return pending + out_for_delivery
+
+
+def compute_delivery_aging(package_db, top_k=DELAYED_TOP_K, bucket_hours=SLA_BUCKET_HOURS, now=None):
+    """
+    Measure how long undelivered packages have been waiting.
+    
+    Reads Pending and Out for Delivery packages in one pass, parsing each
+    created_at once, and keeps only the top_k oldest.
+    
+    Args:
+        package_db (PackageDatabase): Package database instance
+        top_k (int): Number of oldest packages to return
+        bucket_hours: Ascending SLA thresholds in hours
+        now (datetime): Time ages are measured from (default now)
+    
+    Returns:
+        dict: "total" undelivered count, "buckets" mapping an age label
+            to a count, and "oldest" as (package, age in hours) pairs,
+            oldest first
+    """
+    aggregate = DeliveryAging(top_k, bucket_hours, now)
+    return run_serial(aggregate, package_db.iter_packages(DeliveryAging.STATUSES))
+
+
 def report_delayed_deliveries(package_db):
     """
     Generate report of delayed or pending deliveries.
@@ -124,41 +245,74 @@ def report_delayed_deliveries(package_db):
     """
     utils.print_header("Delayed Deliveries Report")
     
-    pending = package_db.get_packages_by_status("Pending")
-    out_for_delivery = package_db.get_packages_by_status("Out for Delivery")
-    delayed = pending + out_for_delivery
+    # Ages move with the clock, so a cached result is reused within the same minute only
+    now = datetime.now().replace(second=0, microsecond=0)
+    aging = REPORT_CACHE.get("delivery_aging", (DELAYED_TOP_K, SLA_BUCKET_HOURS, now), (package_db,),
+                             lambda: compute_delivery_aging(package_db, DELAYED_TOP_K, SLA_BUCKET_HOURS, now))
     
     print("\nDelayed/Pending Deliveries:")
-    if not delayed:
+    if not aging["total"]:
         print("No delayed deliveries.")
     else:
-        widths = [12, 20, 15, 20]
-        utils.print_table_row(["ID", "Recipient", "Status", "Created"], widths)
-        print("-" * 70)
+        widths = [12, 10]
+        utils.print_table_row(["Age", "Packages"], widths)
+        print("-" * 24)
+        for label, count in aging["buckets"].items():
+            utils.print_table_row([label, count], widths)
         
-        for pkg in delayed:
+        print(f"\nOldest {len(aging['oldest'])} of {aging['total']}:")
+        widths = [12, 20, 18, 20, 10]
+        utils.print_table_row(["ID", "Recipient", "Status", "Created", "Age (h)"], widths)
+        print("-" * 82)
+        
+        for pkg, age in aging["oldest"]:
             utils.print_table_row([
                 pkg.package_id,
                 utils.truncate_string(pkg.recipient_name, 18),
                 pkg.status,
-                utils.format_date(pkg.created_at)
+                utils.format_date(pkg.created_at),
+                f"{age:.1f}"
             ], widths)
         
-        print(f"\nTotal delayed: {len(delayed)} packages")
+        print(f"\nTotal delayed: {aging['total']} packages")
         
         if utils.confirm_action("Export to CSV?"):
-            data = [{"ID": p.package_id, "Recipient": p.recipient_name, "Status": p.status, "Created": p.created_at} for p in delayed]
-            export_to_csv(data, f"delayed_deliveries_{utils.get_today_date()}.csv", ["ID", "Recipient", "Status", "Created"])
+            headers, rows = report_rows("delivery_aging", aging)
+            export_to_csv(rows, f"delayed_deliveries_{utils.get_today_date()}.csv", headers,
+                          compress=utils.confirm_action("Compress with gzip?"))
     
     utils.pause()
 
 
-def report_fuel_usage_estimates(route_db):
+def compute_fuel_usage(routes, package_db, vehicle=DEFAULT_VEHICLE):
+    """
+    Estimate fuel for each route from the distance driven between its stops.
+    
+    Args:
+        routes: Route objects
+        package_db (PackageDatabase): Package database holding the stops
+        vehicle (str): Vehicle fuel profile (see routing.VEHICLE_PROFILES)
+    
+    Returns:
+        list: (route, liters, kilometres) in route order
+    """
+    usage = []
+    for route, packages in join_routes_packages(routes, package_db):
+        liters, distance = estimate_fuel(ROUTE_MATRICES.get(route, packages), vehicle)
+        usage.append((route, liters, distance))
+    return usage
+
+
+def report_fuel_usage_estimates(route_db, package_db):
     """
     Generate fuel usage estimate report by route.
     
+    Viewing the report changes nothing; estimates that differ from the
+    routes' estimated_fuel are only saved if the user asks.
+    
     Args:
         route_db (RouteDatabase): Route database instance
+        package_db (PackageDatabase): Package database instance
     
     TODO:
     1. Get all routes
@@ -174,32 +328,62 @@ def report_fuel_usage_estimates(route_db):
     if not routes:
         print("No routes found.")
     else:
-        widths = [10, 20, 12, 12]
-        utils.print_table_row(["Route ID", "Name", "Packages", "Fuel (L)"], widths)
-        print("-" * 57)
+        widths = [10, 20, 10, 12, 12]
+        utils.print_table_row(["Route ID", "Name", "Packages", "Distance", "Fuel (L)"], widths)
+        print("-" * 68)
         
+        usage = compute_fuel_usage(routes, package_db)
         total_fuel = 0
-        for route in routes:
-            fuel = len(route.package_ids) * 2.5
-            route.estimated_fuel = fuel
+        changed = []
+        for route, fuel, distance in usage:
+            if route.estimated_fuel != round(fuel, 2):
+                changed.append((route, round(fuel, 2)))
             total_fuel += fuel
             
             utils.print_table_row([
                 route.route_id,
                 utils.truncate_string(route.route_name, 18),
                 len(route.package_ids),
+                f"{distance:.1f} km",
                 f"{fuel:.2f}"
             ], widths)
         
         print(f"\nTotal estimated fuel: {total_fuel:.2f} liters")
         
+        if changed and utils.confirm_action(f"Save the new estimates to {len(changed)} routes?"):
+            for route, fuel in changed:
+                route.estimated_fuel = fuel
+            route_db.update_routes([route for route, _fuel in changed])
+            utils.print_success(f"Estimated fuel updated on {len(changed)} routes")
+        
         if utils.confirm_action("Export to CSV?"):
-            data = [{"RouteID": r.route_id, "Name": r.route_name, "Packages": len(r.package_ids), "Fuel": f"{len(r.package_ids)*2.5:.2f}"} for r in routes]
-            export_to_csv(data, f"fuel_usage_{utils.get_today_date()}.csv", ["RouteID", "Name", "Packages", "Fuel"])
+            headers, rows = report_rows("fuel_usage", usage)
+            export_to_csv(rows, f"fuel_usage_{utils.get_today_date()}.csv", headers)
     
     utils.pause()
 
 
+def compute_problematic_addresses(package_db, workers=1):
+    """
+    Count undelivered packages per address, keeping repeated addresses.
+    
+    Near-duplicate spellings of an address are counted together (see
+    addresses.cluster_addresses).
+    
+    Args:
+        package_db (PackageDatabase): Package database instance
+        workers (int): Worker processes; 1, or a database smaller than
+            PARALLEL_MIN_PACKAGES, computes in this process
+    
+    Returns:
+        dict: Address -> number of undelivered packages, for addresses
+            with more than one, most packages first
+    """
+    if _use_pool(package_db, workers):
+        return run_parallel(ProblematicAddresses(), package_db, workers)
+    return run_serial(ProblematicAddresses(), package_db.iter_packages())
+
+
 def report_problematic_addresses(package_db):
     """
     Generate report of addresses with repeated delivery issues.
@@ -215,17 +399,8 @@ def report_problematic_addresses(package_db):
     """
     utils.print_header("Problematic Addresses Report")
     
-    packages = package_db.get_all_packages()
-    address_issues = {}
-    
-    for pkg in packages:
-        if pkg.status != "Delivered":
-            addr = pkg.recipient_address
-            if addr not in address_issues:
-                address_issues[addr] = 0
-            address_issues[addr] += 1
-    
-    problematic = {addr: count for addr, count in address_issues.items() if count > 1}
+    problematic = REPORT_CACHE.get("problematic_addresses", (), (package_db,),
+                                   lambda: compute_problematic_addresses(package_db, REPORT_WORKERS))
     
     print("\nAddresses with Multiple Pending Deliveries:")
     if not problematic:
@@ -246,14 +421,21 @@ def report_problematic_addresses(package_db):
     utils.pause()
 
 
-def export_to_csv(data, filename, headers):
+def export_to_csv(data, filename, headers, compress=False):
     """
     Export report data to CSV file.
     
     Args:
-        data: List of dictionaries containing report data
+        data: Iterable of dictionaries containing report data; generators
+            are consumed in chunks of EXPORT_CHUNK_SIZE rows, so the whole
+            report never has to be held in memory
         filename: Output filename
         headers: CSV column headers
+        compress (bool): Write gzip-compressed output (".gz" is appended
+            to the filename if missing)
+    
+    Returns:
+        int: Number of rows written, or None if the export failed
     
     TODO:
     1. Create CSV file
@@ -261,23 +443,74 @@ def export_to_csv(data, filename, headers):
     3. Write data rows
     4. Save file
     """
+    if compress and not filename.endswith(".gz"):
+        filename += ".gz"
     try:
-        with open(filename, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=headers)
-            writer.writeheader()
-            writer.writerows(data)
+        if compress:
+            f = gzip.open(filename, 'wt', newline='')
+        else:
+            f = open(filename, 'w', newline='', buffering=EXPORT_BUFFER_SIZE)
+        with f:
+            written = write_csv(data, f, headers)
         utils.print_success(f"Report exported to {filename}")
+        return written
     except Exception as e:
         utils.print_error(f"Failed to export: {str(e)}")
+        return None
+
+
+def write_csv(data, f, headers):
+    """
+    Write rows to an open text file as CSV, EXPORT_CHUNK_SIZE rows at a time.
+    
+    Args:
+        data: Iterable of dictionaries
+        f: File opened for writing with newline=''
+        headers: CSV column headers
+    
+    Returns:
+        int: Number of rows written
+    """
+    writer = csv.DictWriter(f, fieldnames=headers)
+    writer.writeheader()
+    rows = iter(data)
+    written = 0
+    while True:
+        chunk = list(itertools.islice(rows, EXPORT_CHUNK_SIZE))
+        if not chunk:
+            break
+        writer.writerows(chunk)
+        written += len(chunk)
+    return written
 
 
-def generate_summary_statistics(package_db, route_db):
+def compute_summary_statistics(package_db, route_db, workers=1):
+    """
+    Count the figures shown by the summary report.
+    
+    Args:
+        package_db (PackageDatabase): Package database instance
+        route_db (RouteDatabase): Route database instance
+        workers (int): Worker processes; 1, or a database smaller than
+            PARALLEL_MIN_PACKAGES, computes in this process
+    
+    Returns:
+        dict: Summary record in the summary.json format
+    """
+    if _use_pool(package_db, workers):
+        return run_parallel(SummaryStatistics(route_db.get_all_routes()), package_db, workers)
+    return build_summary(package_db, route_db)
+
+
+def generate_summary_statistics(package_db, route_db, summary=None):
     """
     Generate overall system statistics.
     
     Args:
         package_db (PackageDatabase): Package database instance
         route_db (RouteDatabase): Route database instance
+        summary (SummaryCounters): Maintained counters to read instead of
+            scanning both databases
     
     TODO: Show overall stats:
     - Total packages
@@ -287,15 +520,19 @@ def generate_summary_statistics(package_db, route_db):
     """
     utils.print_header("System Summary Statistics")
     
-    packages = package_db.get_all_packages()
-    routes = route_db.get_all_routes()
+    if summary:
+        stats = summary.get(package_db, route_db)
+    else:
+        stats = REPORT_CACHE.get("summary_statistics", (), (package_db, route_db),
+                                 lambda: compute_summary_statistics(package_db, route_db, REPORT_WORKERS))
     
-    total_packages = len(packages)
-    total_routes = len(routes)
-    delivered = len([p for p in packages if p.status == "Delivered"])
+    total_packages = stats["total_packages"]
+    total_routes = stats["total_routes"]
+    by_status = stats["packages_by_status"]
+    delivered = by_status.get("Delivered", 0)
     completion_rate = (delivered / total_packages * 100) if total_packages > 0 else 0
     
-    total_assigned = sum([len(r.package_ids) for r in routes])
+    total_assigned = stats["assigned_packages"]
     avg_packages = (total_assigned / total_routes) if total_routes > 0 else 0
     
     print(f"\nTotal Packages: {total_packages}")
@@ -303,19 +540,144 @@ def generate_summary_statistics(package_db, route_db):
     print(f"Delivered Packages: {delivered}")
     print(f"Delivery Completion Rate: {completion_rate:.1f}%")
     print(f"Average Packages per Route: {avg_packages:.1f}")
-    print(f"Pending Packages: {len([p for p in packages if p.status == 'Pending'])}")
-    print(f"Out for Delivery: {len([p for p in packages if p.status == 'Out for Delivery'])}")
+    print(f"Pending Packages: {by_status.get('Pending', 0)}")
+    print(f"Out for Delivery: {by_status.get('Out for Delivery', 0)}")
     
     utils.pause()
 
 
-def reports_menu(package_db, route_db):
+def compute_all_reports(package_db, route_db, start_date, end_date):
+    """
+    Compute every report with one pass over packages and routes.
+    
+    Args:
+        package_db (PackageDatabase): Package database instance
+        route_db (RouteDatabase): Route database instance
+        start_date (str): First day of the delivered-per-day report
+        end_date (str): Last day of the delivered-per-day report
+    
+    Returns:
+        dict: Report name -> result, each the same as the report's own
+            compute function
+    """
+    routes = route_db.get_all_routes()
+    return run_combined({
+        "delivered_per_day": DeliveredPerDay(start_date, end_date),
+        "driver_performance": DriverPerformance(routes),
+        "delayed_deliveries": DelayedDeliveries(),
+        "problematic_addresses": ProblematicAddresses(),
+        "summary_statistics": SummaryStatistics(routes),
+        "fuel_usage": FuelUsage(routes),
+    }, package_db.iter_packages())
+
+
+def export_all_reports(results, out_dir, compress=False):
+    """
+    Write every report from compute_all_reports to CSV files.
+    
+    Args:
+        results (dict): Output of compute_all_reports
+        out_dir (str): Directory for the CSV files
+        compress (bool): Write gzip-compressed files
+    
+    Returns:
+        list: Paths of the files written
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for report, result in results.items():
+        headers, rows = report_rows(report, result)
+        path = os.path.join(out_dir, f"{report}.csv")
+        export_to_csv(rows, path, headers, compress=compress)
+        paths.append(path + ".gz" if compress else path)
+    return paths
+
+
+def report_rows(report, result):
+    """
+    Lay out a report result as CSV rows.
+    
+    Args:
+        report (str): Report name (one of REPORTS)
+        result: The report's compute result
+    
+    Returns:
+        tuple: (headers, iterator of row dictionaries)
+    """
+    if report == "delivered_per_day":
+        return ["Date", "ID", "Recipient", "Address"], (
+            {"Date": day, "ID": p.package_id, "Recipient": p.recipient_name, "Address": p.recipient_address}
+            for day, packages in result.items() for p in packages)
+    if report == "driver_performance":
+        return ["Driver", "Assigned", "Delivered", "Rate"], (
+            {"Driver": d, "Assigned": s["assigned"], "Delivered": s["delivered"],
+             "Rate": f"{(s['delivered'] / s['assigned'] * 100) if s['assigned'] > 0 else 0:.1f}%"}
+            for d, s in result.items())
+    if report == "delayed_deliveries":
+        return ["ID", "Recipient", "Status", "Created"], (
+            {"ID": p.package_id, "Recipient": p.recipient_name, "Status": p.status, "Created": p.created_at}
+            for p in result)
+    if report == "delivery_aging":
+        return ["ID", "Recipient", "Status", "Created", "AgeHours"], (
+            {"ID": p.package_id, "Recipient": p.recipient_name, "Status": p.status, "Created": p.created_at,
+             "AgeHours": f"{age:.1f}"}
+            for p, age in result["oldest"])
+    if report == "fuel_usage":
+        return ["RouteID", "Name", "Packages", "DistanceKm", "Fuel"], (
+            {"RouteID": r.route_id, "Name": r.route_name, "Packages": len(r.package_ids),
+             "DistanceKm": f"{distance:.2f}", "Fuel": f"{fuel:.2f}"}
+            for r, fuel, distance in result)
+    if report == "problematic_addresses":
+        return ["Address", "Issues"], (
+            {"Address": addr, "Issues": count}
+            for addr, count in sorted(result.items(), key=lambda x: x[1], reverse=True))
+    if report == "summary_statistics":
+        total = result["total_packages"]
+        delivered = result["packages_by_status"].get("Delivered", 0)
+        metrics = (
+            ("Total Packages", total),
+            ("Total Routes", result["total_routes"]),
+            ("Delivered Packages", delivered),
+            ("Delivery Completion Rate", f"{(delivered / total * 100) if total > 0 else 0:.1f}%"),
+            ("Average Packages per Route",
+             f"{(result['assigned_packages'] / result['total_routes']) if result['total_routes'] > 0 else 0:.1f}"),
+            ("Pending Packages", result["packages_by_status"].get("Pending", 0)),
+            ("Out for Delivery", result["packages_by_status"].get("Out for Delivery", 0)),
+        )
+        return ["Metric", "Value"], ({"Metric": metric, "Value": value} for metric, value in metrics)
+    raise ValueError(f"Unknown report: {report}")
+
+
+def report_all(package_db, route_db):
+    """
+    Run every report in one pass over the data and export them all.
+    
+    Args:
+        package_db (PackageDatabase): Package database instance
+        route_db (RouteDatabase): Route database instance
+    """
+    utils.print_header("Run All Reports")
+    
+    start_date = utils.get_date_input("Enter start date")
+    end_date = utils.get_date_input("Enter end date")
+    if end_date < start_date:
+        start_date, end_date = end_date, start_date
+    out_dir = utils.get_input("Output directory", f"reports_{utils.get_today_date()}")
+    
+    results = compute_all_reports(package_db, route_db, start_date, end_date)
+    export_all_reports(results, out_dir, compress=utils.confirm_action("Compress with gzip?"))
+    
+    utils.pause()
+
+
+def reports_menu(package_db, route_db, summary=None):
     """
     Display reports menu and handle user choices.
     
     Args:
         package_db (PackageDatabase): Package database instance
         route_db (RouteDatabase): Route database instance
+        summary (SummaryCounters): Maintained summary counters, if any
     
     TODO: Create menu loop with all reporting options
     """
@@ -328,6 +690,7 @@ def reports_menu(package_db, route_db):
         print("4. Fuel Usage Estimates")
         print("5. Problematic Addresses")
         print("6. System Summary Statistics")
+        print("7. Run All Reports")
         print("0. Back to Main Menu")
         
         choice = input("\nEnter choice: ")
@@ -339,10 +702,143 @@ def reports_menu(package_db, route_db):
         elif choice == '3':
             report_delayed_deliveries(package_db)
         elif choice == '4':
-            report_fuel_usage_estimates(route_db)
+            report_fuel_usage_estimates(route_db, package_db)
         elif choice == '5':
             report_problematic_addresses(package_db)
         elif choice == '6':
-            generate_summary_statistics(package_db, route_db)
+            generate_summary_statistics(package_db, route_db, summary)
+        elif choice == '7':
+            report_all(package_db, route_db)
         elif choice == '0':
             break
+
+
+# Reports available to compute_report and the command line
+REPORTS = (
+    "delivered_per_day", "driver_performance", "delayed_deliveries", "delivery_aging",
+    "fuel_usage", "problematic_addresses", "summary_statistics",
+)
+
+
+def compute_report(report, package_db, route_db, start_date=None, end_date=None, workers=1):
+    """
+    Compute one report, or all of them, without any terminal I/O.
+    
+    Args:
+        report (str): One of REPORTS, or "all"
+        package_db (PackageDatabase): Package database instance
+        route_db (RouteDatabase): Route database instance
+        start_date (str): First day for delivered_per_day (default today)
+        end_date (str): Last day for delivered_per_day (default start_date)
+        workers (int): Worker processes for the scanning reports
+    
+    Returns:
+        The report's compute result; for "all", a dict of report name ->
+        result
+    """
+    start_date = start_date or utils.get_today_date()
+    end_date = end_date or start_date
+    if report == "all":
+        return compute_all_reports(package_db, route_db, min(start_date, end_date), max(start_date, end_date))
+    if report == "delivered_per_day":
+        return compute_delivered_per_day(package_db, start_date, end_date)
+    if report == "driver_performance":
+        return compute_driver_performance(route_db, package_db, workers)
+    if report == "delayed_deliveries":
+        return compute_delayed_deliveries(package_db)
+    if report == "delivery_aging":
+        return compute_delivery_aging(package_db)
+    if report == "fuel_usage":
+        return compute_fuel_usage(route_db.get_all_routes(), package_db)
+    if report == "problematic_addresses":
+        return compute_problematic_addresses(package_db, workers)
+    if report == "summary_statistics":
+        return compute_summary_statistics(package_db, route_db, workers)
+    raise ValueError(f"Unknown report: {report}")
+
+
+def to_json_data(report, result):
+    """
+    Convert a report result to plain JSON-serializable data.
+    
+    Args:
+        report (str): Report name (one of REPORTS, or "all")
+        result: The report's compute result
+    
+    Returns:
+        The same structure with models replaced by their dictionaries
+    """
+    if report == "all":
+        return {name: to_json_data(name, value) for name, value in result.items()}
+    if report == "delivery_aging":
+        oldest = [dict(pkg.to_dict(), age_hours=round(age, 2)) for pkg, age in result["oldest"]]
+        return {"total": result["total"], "buckets": result["buckets"], "oldest": oldest}
+    if report == "fuel_usage":
+        return [{"route_id": route.route_id, "route_name": route.route_name,
+                 "packages": len(route.package_ids), "distance_km": round(distance, 3),
+                 "estimated_fuel": round(fuel, 3)} for route, fuel, distance in result]
+    return _plain(result)
+
+
+def _plain(value):
+    if isinstance(value, (Package, Route)):
+        return value.to_dict()
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    return value
+
+
+def main(argv=None):
+    """
+    Run reports from the command line, e.g. for cron jobs:
+        
+        python -m reports --report driver_performance --format json --out perf.json
+        python -m reports --report all --format csv --out reports_dir
+    """
+    parser = argparse.ArgumentParser(description="Run FreshRoute Logistics reports without prompts")
+    parser.add_argument("--report", required=True, choices=REPORTS + ("all",))
+    parser.add_argument("--format", default="json", choices=["json", "csv"])
+    parser.add_argument("--out", help='output file ("all" with csv: a directory); default stdout')
+    parser.add_argument("--start", help="first day for delivered_per_day (YYYY-MM-DD), default today")
+    parser.add_argument("--end", help="last day for delivered_per_day (YYYY-MM-DD), default --start")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--storage", default="json", choices=["json", "journal", "sqlite"])
+    parser.add_argument("--workers", type=int, default=REPORT_WORKERS)
+    parser.add_argument("--gzip", action="store_true", help="compress CSV output written to files")
+    parser.add_argument("--lock", action=argparse.BooleanOptionalAction, default=os.name == "posix",
+                        help="take the file locks the running app uses (default on POSIX)")
+    args = parser.parse_args(argv)
+    
+    # run_parallel reads through package_db, so its workers need no locks
+    package_db = PackageDatabase(args.data_dir, storage=args.storage, locking=args.lock)
+    route_db = RouteDatabase(args.data_dir, storage=args.storage, locking=args.lock)
+    result = compute_report(args.report, package_db, route_db, args.start, args.end, args.workers)
+    
+    if args.format == "csv" and args.report == "all":
+        if not args.out:
+            parser.error("--report all --format csv needs --out DIRECTORY")
+        export_all_reports(result, args.out, compress=args.gzip)
+        return
+    
+    out = sys.stdout
+    if args.out and args.format == "csv" and args.gzip:
+        out = gzip.open(args.out if args.out.endswith(".gz") else args.out + ".gz", 'wt', newline='')
+    elif args.out:
+        out = open(args.out, 'w', newline='')
+    try:
+        if args.format == "json":
+            json.dump({"report": args.report, "generated_at": datetime.now().isoformat(),
+                       "result": to_json_data(args.report, result)}, out, indent=2)
+            out.write("\n")
+        else:
+            headers, rows = report_rows(args.report, result)
+            write_csv(rows, out, headers)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -7,7 +7,10 @@ TODO: Implement all route management functions.
 
 from database_packages import PackageDatabase
 from database_routes import RouteDatabase
+from joins import join_routes_packages
 from models import Route
+import assignment
+import routing
 import utils
 
 
@@ -27,8 +30,7 @@ def create_route(route_db):
     """
     utils.print_header("Create New Route")
     
-    routes = route_db.get_all_routes()
-    route_id = utils.generate_id("RT", [r.route_id for r in routes])
+    route_id = route_db.next_route_id()
     
     route_name = utils.get_input("Route name")
     driver_name = utils.get_input("Driver name")
@@ -112,10 +114,9 @@ def view_route_details(route_db, package_db):
     print(f"\nPackages ({len(route.package_ids)}):")
     
     if route.package_ids:
-        for pkg_id in route.package_ids:
-            pkg = package_db.get_package_by_id(pkg_id)
-            if pkg:
-                print(f"  - {pkg_id}: {pkg.recipient_name} ({pkg.status})")
+        for _route, packages in join_routes_packages([route], package_db):
+            for pkg in packages:
+                print(f"  - {pkg.package_id}: {pkg.recipient_name} ({pkg.status})")
     else:
         print("  No packages assigned")
     
@@ -158,21 +159,28 @@ def assign_packages_to_route(route_db, package_db):
     for pkg in packages:
         print(f"  {pkg.package_id}: {pkg.recipient_name} - {pkg.recipient_address}")
     
+    unassigned = {pkg.package_id for pkg in packages}
+    selected = []
     package_id = utils.get_input("\nEnter package ID to assign (or 'done')")
     
     while package_id != 'done':
-        pkg = package_db.get_package_by_id(package_id)
-        if pkg and pkg.route_id is None:
-            pkg.route_id = route_id
-            route.add_package(package_id)
-            package_db.update_package(pkg)
-            route_db.update_route(route)
-            utils.print_success(f"Package {package_id} assigned to route {route_id}")
+        if package_id in unassigned:
+            unassigned.discard(package_id)
+            selected.append(package_id)
+            utils.print_success(f"Package {package_id} selected for route {route_id}")
         else:
             utils.print_error("Invalid package ID or already assigned")
         
         package_id = utils.get_input("\nEnter another package ID (or 'done')")
     
+    if selected:
+        # Re-read under the write locks so edits saved meanwhile are kept
+        assigned = package_db.assign_packages({route_id: selected})[route_id]
+        route_db.add_packages_to_routes({route_id: assigned})
+        utils.print_success(f"{len(assigned)} packages assigned to route {route_id}")
+        if len(assigned) < len(selected):
+            utils.print_warning(f"{len(selected) - len(assigned)} packages were assigned elsewhere meanwhile")
+    
     utils.pause()
 
 
@@ -274,11 +282,10 @@ def delete_route(route_db, package_db):
     print(f"Packages: {len(route.package_ids)}")
     
     if utils.confirm_action("Are you sure you want to delete this route?"):
-        for pkg_id in route.package_ids:
-            pkg = package_db.get_package_by_id(pkg_id)
-            if pkg:
-                pkg.route_id = None
-                package_db.update_package(pkg)
+        packages = package_db.get_packages_by_ids(route.package_ids)
+        for pkg in packages:
+            pkg.route_id = None
+        package_db.update_packages(packages)
         
         if route_db.delete_route(route_id):
             utils.print_success("Route deleted successfully!")
@@ -288,6 +295,140 @@ def delete_route(route_db, package_db):
     utils.pause()
 
 
+def optimize_route_stops(route_db, package_db):
+    """
+    Reorder a route's stops to shorten the distance driven.
+    
+    Args:
+        route_db (RouteDatabase): Route database instance
+        package_db (PackageDatabase): Package database instance
+    """
+    utils.print_header("Optimize Stop Order")
+    
+    route_id = utils.get_input("Enter route ID")
+    route = route_db.get_route_by_id(route_id)
+    
+    if not route:
+        utils.print_error("Route not found")
+        utils.pause()
+        return
+    
+    if len(route.package_ids) < 2:
+        print("\nRoute has fewer than two stops; nothing to reorder.")
+        utils.pause()
+        return
+    
+    _route, packages = next(join_routes_packages([route], package_db))
+    result = routing.optimize_route(route, packages)
+    
+    print(f"\nCurrent distance:   {result['distance_before']:.2f} km")
+    print(f"Optimized distance: {result['distance_after']:.2f} km")
+    print(f"Distance saved:     {result['distance_saved']:.2f} km")
+    if result["unlocated_stops"]:
+        print(f"{result['unlocated_stops']} stops have no coordinates and are kept at the end of the route.")
+    
+    if result["distance_saved"] <= 0:
+        print("\nThe current stop order is already the shortest found.")
+    elif utils.confirm_action("Save the new stop order?"):
+        # Re-read under the lock: stops added while the prompt was open are kept
+        if route_db.reorder_route(route_id, result["package_ids"], round(result["estimated_fuel"], 2)):
+            utils.print_success(f"Stop order of route {route_id} updated")
+        else:
+            utils.print_error("Failed to update route")
+    
+    utils.pause()
+
+
+def auto_assign_packages(route_db, package_db):
+    """
+    Assign all unassigned packages to a day's routes by weight capacity.
+    
+    Args:
+        route_db (RouteDatabase): Route database instance
+        package_db (PackageDatabase): Package database instance
+    """
+    utils.print_header("Auto-Assign Packages")
+    
+    date = utils.get_date_input("Enter route date")
+    plan = assignment.auto_assign(package_db, route_db, date, commit=False)
+    
+    if not plan["capacities"]:
+        utils.print_error(f"No active routes on {date}")
+        utils.pause()
+        return
+    
+    widths = [10, 12, 14]
+    utils.print_table_row(["Route ID", "New Stops", "Load (kg)"], widths)
+    print("-" * 38)
+    for route_id, capacity in plan["capacities"].items():
+        utils.print_table_row([
+            route_id,
+            len(plan["assigned"].get(route_id, ())),
+            f"{plan['loads'][route_id]:.1f}/{capacity:.0f}"
+        ], widths)
+    
+    assigned = sum(len(ids) for ids in plan["assigned"].values())
+    print(f"\n{assigned} packages can be assigned; {len(plan['unassigned'])} do not fit.")
+    
+    if assigned and utils.confirm_action("Assign these packages?"):
+        saved = assignment.commit_assignment(package_db, route_db, plan["assigned"])
+        count = sum(len(ids) for ids in saved.values())
+        utils.print_success(f"{count} packages assigned to {len(saved)} routes")
+        if count < assigned:
+            utils.print_warning(f"{assigned - count} packages were assigned elsewhere meanwhile")
+    
+    utils.pause()
+
+
+def propose_routes(route_db, package_db):
+    """
+    Draft routes for a day from the unassigned packages' locations.
+    
+    Args:
+        route_db (RouteDatabase): Route database instance
+        package_db (PackageDatabase): Package database instance
+    """
+    utils.print_header("Propose Routes")
+    
+    date = utils.get_date_input("Enter route date")
+    driver_count = utils.get_number_input("Number of drivers", 1, 500)
+    if driver_count is None:
+        return
+    
+    packages = package_db.get_unassigned_packages()
+    drafts, unlocated = assignment.propose_routes(packages, date, int(driver_count))
+    
+    if not drafts:
+        print("\nNo unassigned packages with coordinates to route.")
+        utils.pause()
+        return
+    
+    weights = {pkg.package_id: assignment.package_weight(pkg) for pkg in packages}
+    widths = [10, 24, 10, 12]
+    utils.print_table_row(["Draft", "Name", "Stops", "Weight (kg)"], widths)
+    print("-" * 58)
+    for route in drafts:
+        utils.print_table_row([
+            route.route_id,
+            route.route_name,
+            len(route.package_ids),
+            f"{sum(weights[pkg_id] for pkg_id in route.package_ids):.1f}"
+        ], widths)
+    if unlocated:
+        print(f"\n{len(unlocated)} packages have no coordinates and were left out.")
+    
+    if utils.confirm_action("Create these routes?"):
+        drafted = sum(len(route.package_ids) for route in drafts)
+        created, count = assignment.save_proposed_routes(route_db, package_db, drafts)
+        if created < len(drafts):
+            utils.print_error(f"{len(drafts) - created} routes could not be saved")
+        if count < drafted:
+            utils.print_warning(f"{drafted - count} packages were assigned elsewhere meanwhile and were left out")
+        utils.print_success(f"{created} routes created with {count} packages; assign their drivers next")
+    
+    utils.pause()
+
+
 def route_management_menu(route_db, package_db):
     """
     Display route management menu and handle user choices.
@@ -308,6 +449,9 @@ def route_management_menu(route_db, package_db):
         print("5. Assign Driver to Route")
         print("6. Edit Route")
         print("7. Delete Route")
+        print("8. Optimize Stop Order")
+        print("9. Auto-Assign Packages")
+        print("10. Propose Routes")
         print("0. Back to Main Menu")
         
         choice = input("\nEnter choice: ")
@@ -326,5 +470,11 @@ def route_management_menu(route_db, package_db):
             edit_route(route_db)
         elif choice == '7':
             delete_route(route_db, package_db)
+        elif choice == '8':
+            optimize_route_stops(route_db, package_db)
+        elif choice == '9':
+            auto_assign_packages(route_db, package_db)
+        elif choice == '10':
+            propose_routes(route_db, package_db)
         elif choice == '0':
             break
\ No newline at end of file
@@ -0,0 +1,416 @@
+"""
+FreshRoute Logistics - Route Geometry
+
+Distances between a route's stops and the fuel a vehicle burns driving
+them. Each route's stop-to-stop distance matrix is built once (with NumPy
+when it is installed) and cached until the route's stops change.
+
+Stops are packages with a latitude and longitude. Every route starts and
+ends at the depot (DEPOT_LOCATION).
+
+optimize_route reorders a route's stops to shorten the drive: a nearest
+neighbour tour is improved with 2-opt (reversing a run of stops) and
+Or-opt (moving a run of up to three stops elsewhere) until no move helps
+or the time budget runs out.
+"""
+
+import collections
+import math
+import time
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; matrices are then built in pure Python
+    np = None
+
+
+# Depot every route leaves from and returns to (latitude, longitude)
+DEPOT_LOCATION = (14.5995, 120.9842)
+
+EARTH_RADIUS_KM = 6371.0
+
+# Fuel burned per kilometre driven and per stop made, and the load a
+# route can carry, by vehicle type
+VEHICLE_PROFILES = {
+    "motorcycle": {"liters_per_km": 0.03, "liters_per_stop": 0.01, "capacity_kg": 40},
+    "van": {"liters_per_km": 0.11, "liters_per_stop": 0.05, "capacity_kg": 800},
+    "truck": {"liters_per_km": 0.25, "liters_per_stop": 0.12, "capacity_kg": 3000},
+}
+DEFAULT_VEHICLE = "van"
+
+# Fuel charged for a stop whose package has no coordinates
+UNLOCATED_STOP_LITERS = 2.5
+
+# Distance matrices kept by the default cache
+DEFAULT_MATRIX_CACHE_SIZE = 4096
+
+# Seconds the stop-order optimizer may spend improving one route
+OPTIMIZE_TIME_BUDGET = 1.0
+
+# Smallest improvement in kilometres worth making a move for
+IMPROVEMENT_EPSILON = 1e-9
+
+
+def package_location(package):
+    """
+    Get a package's stop coordinate.
+    
+    Args:
+        package (Package): Package to locate
+    
+    Returns:
+        tuple: (latitude, longitude), or None if the package has none
+    """
+    if package.latitude is None or package.longitude is None:
+        return None
+    return (package.latitude, package.longitude)
+
+
+def haversine_km(a, b):
+    """
+    Great-circle distance between two points.
+    
+    Args:
+        a (tuple): (latitude, longitude) in degrees
+        b (tuple): (latitude, longitude) in degrees
+    
+    Returns:
+        float: Distance in kilometres
+    """
+    lat1, lon1, lat2, lon2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(h)))
+
+
+def distance_matrix(points):
+    """
+    Distances between every pair of points.
+    
+    Args:
+        points: Sequence of (latitude, longitude) tuples
+    
+    Returns:
+        Square matrix of kilometres, indexed matrix[i][j]: a NumPy array
+        when NumPy is installed, otherwise a list of lists
+    """
+    if np is None:
+        return _distance_matrix_python(points)
+    coords = np.radians(np.asarray(points, dtype=float).reshape(-1, 2))
+    lat = coords[:, 0]
+    lon = coords[:, 1]
+    h = (np.sin((lat[:, None] - lat[None, :]) / 2) ** 2
+         + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin((lon[:, None] - lon[None, :]) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+
+def _distance_matrix_python(points):
+    """distance_matrix without NumPy; fills both halves from one haversine."""
+    lats = [math.radians(lat) for lat, _lon in points]
+    lons = [math.radians(lon) for _lat, lon in points]
+    cos_lats = [math.cos(lat) for lat in lats]
+    n = len(points)
+    matrix = [[0.0] * n for _ in range(n)]
+    sin, asin, sqrt = math.sin, math.asin, math.sqrt
+    for i in range(n):
+        lat_i, lon_i, cos_i, row = lats[i], lons[i], cos_lats[i], matrix[i]
+        for j in range(i + 1, n):
+            h = sin((lats[j] - lat_i) / 2) ** 2 + cos_i * cos_lats[j] * sin((lons[j] - lon_i) / 2) ** 2
+            row[j] = matrix[j][i] = 2 * EARTH_RADIUS_KM * asin(min(1.0, sqrt(h)))
+    return matrix
+
+
+def path_length(matrix, order):
+    """
+    Length of a path visiting matrix indexes in order.
+    
+    Args:
+        matrix: Output of distance_matrix
+        order: Sequence of indexes into the matrix
+    
+    Returns:
+        float: Total distance in kilometres
+    """
+    if len(order) < 2:
+        return 0.0
+    if np is not None and isinstance(matrix, np.ndarray):
+        order = np.asarray(order)
+        return float(matrix[order[:-1], order[1:]].sum())
+    return sum(matrix[a][b] for a, b in zip(order, order[1:]))
+
+
+class RouteMatrix:
+    """A route's located stops and the distance matrix between them."""
+    
+    __slots__ = ('package_ids', 'unlocated', 'matrix')
+    
+    def __init__(self, package_ids, unlocated, matrix):
+        """
+        Initialize the matrix.
+        
+        Args:
+            package_ids (list): Located stops in route order; stop i is
+                row i + 1 of the matrix, row 0 is the depot
+            unlocated (list): Stops whose packages have no coordinates
+            matrix: Output of distance_matrix for the depot and stops
+        """
+        self.package_ids = package_ids
+        self.unlocated = unlocated
+        self.matrix = matrix
+    
+    def tour_length(self, order=None):
+        """
+        Length of the depot -> stops -> depot tour.
+        
+        Args:
+            order: Matrix rows of the stops in visiting order (default
+                route order, 1..n)
+        
+        Returns:
+            float: Distance in kilometres
+        """
+        if order is None:
+            order = range(1, len(self.package_ids) + 1)
+        return path_length(self.matrix, [0, *order, 0])
+
+
+class DistanceMatrixCache:
+    """LRU cache of route distance matrices keyed by route ID."""
+    
+    def __init__(self, maxsize=DEFAULT_MATRIX_CACHE_SIZE, depot=DEPOT_LOCATION):
+        """
+        Initialize the cache.
+        
+        Args:
+            maxsize (int): Routes kept before the least recently used one
+                is dropped
+            depot (tuple): (latitude, longitude) routes start and end at
+        """
+        self.maxsize = maxsize
+        self.depot = depot
+        self.hits = 0
+        self.misses = 0
+        self._matrices = collections.OrderedDict()
+    
+    def get(self, route, packages):
+        """
+        Get a route's distance matrix, building it only if the stops changed.
+        
+        Args:
+            route (Route): Route whose stops are measured
+            packages: The route's Package objects (see joins.join_routes_packages)
+        
+        Returns:
+            RouteMatrix: Shared with the cache, so callers must not modify it
+        """
+        by_id = {pkg.package_id: pkg for pkg in packages}
+        stops = []
+        for pkg_id in route.package_ids:
+            pkg = by_id.get(pkg_id)
+            stops.append((pkg_id, package_location(pkg) if pkg else None))
+        # A matching signature means the same stops in the same order at
+        # the same coordinates, so the old matrix is still right
+        signature = tuple(stops)
+        cached = self._matrices.get(route.route_id)
+        if cached is not None and cached[0] == signature:
+            self.hits += 1
+            self._matrices.move_to_end(route.route_id)
+            return cached[1]
+        self.misses += 1
+        located = [(pkg_id, location) for pkg_id, location in stops if location]
+        route_matrix = RouteMatrix(
+            [pkg_id for pkg_id, _location in located],
+            [pkg_id for pkg_id, location in stops if not location],
+            distance_matrix([self.depot] + [location for _pkg_id, location in located]),
+        )
+        self._matrices[route.route_id] = (signature, route_matrix)
+        self._matrices.move_to_end(route.route_id)
+        if len(self._matrices) > self.maxsize:
+            self._matrices.popitem(last=False)
+        return route_matrix
+    
+    def clear(self):
+        """Drop every cached matrix."""
+        self._matrices.clear()
+
+
+def estimate_fuel(route_matrix, vehicle=DEFAULT_VEHICLE, order=None):
+    """
+    Estimate the fuel for driving a route.
+    
+    Args:
+        route_matrix (RouteMatrix): The route's cached distance matrix
+        vehicle (str): Key of VEHICLE_PROFILES
+        order (list): Matrix rows in driving order (default: the route's
+            current stop order)
+    
+    Returns:
+        tuple: (liters, kilometres); stops without coordinates are charged
+            UNLOCATED_STOP_LITERS each and add no distance
+    """
+    profile = VEHICLE_PROFILES[vehicle]
+    distance = route_matrix.tour_length(order)
+    liters = (distance * profile["liters_per_km"]
+              + len(route_matrix.package_ids) * profile["liters_per_stop"]
+              + len(route_matrix.unlocated) * UNLOCATED_STOP_LITERS)
+    return liters, distance
+
+
+# Matrices shared by the reports and the route optimizer
+ROUTE_MATRICES = DistanceMatrixCache()
+
+
+def optimize_route(route, packages, time_budget=OPTIMIZE_TIME_BUDGET, cache=ROUTE_MATRICES,
+                   vehicle=DEFAULT_VEHICLE):
+    """
+    Reorder a route's stops to shorten the depot -> stops -> depot drive.
+    
+    The route itself is not changed; assign the returned package_ids to
+    route.package_ids to apply the new order.
+    
+    Args:
+        route (Route): Route to optimize
+        packages: The route's Package objects (see joins.join_routes_packages)
+        time_budget (float): Seconds the local search may run
+        cache (DistanceMatrixCache): Cache for the route's distance matrix
+        vehicle (str): Vehicle fuel profile for the new estimate
+    
+    Returns:
+        dict: package_ids in the new order (stops without coordinates go
+            last, in their old order), distance_before, distance_after and
+            distance_saved in kilometres, unlocated_stops, and
+            estimated_fuel in liters for the new order
+    """
+    route_matrix = cache.get(route, packages)
+    before = route_matrix.tour_length()
+    order = order_stops(route_matrix.matrix, len(route_matrix.package_ids), time_budget)
+    after = route_matrix.tour_length(order)
+    if after >= before:
+        # The search never loses to the route as given
+        order, after = list(range(1, len(route_matrix.package_ids) + 1)), before
+    package_ids = [route_matrix.package_ids[row - 1] for row in order] + route_matrix.unlocated
+    return {
+        "package_ids": package_ids,
+        "distance_before": before,
+        "distance_after": after,
+        "distance_saved": before - after,
+        "unlocated_stops": len(route_matrix.unlocated),
+        "estimated_fuel": estimate_fuel(route_matrix, vehicle, order)[0],
+    }
+
+
+def order_stops(matrix, stop_count, time_budget=OPTIMIZE_TIME_BUDGET):
+    """
+    Find a short order for visiting stops from and back to the depot.
+    
+    Args:
+        matrix: Output of distance_matrix with the depot as row 0 and the
+            stops as rows 1..stop_count
+        stop_count (int): Number of stops
+        time_budget (float): Seconds the local search may run
+    
+    Returns:
+        list: Stop rows (1..stop_count) in visiting order
+    """
+    deadline = time.perf_counter() + time_budget
+    tour = [0] + _nearest_neighbour(matrix, stop_count) + [0]
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = _two_opt(matrix, tour, deadline)
+        improved = _or_opt(matrix, tour, deadline) or improved
+    return tour[1:-1]
+
+
+def _is_array(matrix):
+    return np is not None and isinstance(matrix, np.ndarray)
+
+
+def _nearest_neighbour(matrix, stop_count):
+    """Visit the closest unvisited stop next, starting from the depot."""
+    order = []
+    current = 0
+    if _is_array(matrix):
+        visited = np.zeros(stop_count + 1, dtype=bool)
+        visited[0] = True
+        for _ in range(stop_count):
+            current = int(np.where(visited, np.inf, matrix[current]).argmin())
+            visited[current] = True
+            order.append(current)
+        return order
+    remaining = set(range(1, stop_count + 1))
+    while remaining:
+        row = matrix[current]
+        current = min(remaining, key=lambda stop: (row[stop], stop))
+        remaining.remove(current)
+        order.append(current)
+    return order
+
+
+def _two_opt(matrix, tour, deadline):
+    """
+    Apply the best 2-opt move for each tour position in turn.
+    
+    Reversing tour[i..j] replaces edges (i-1, i) and (j, j+1) with
+    (i-1, j) and (i, j+1); the gain of every j is evaluated at once.
+    
+    Returns:
+        bool: True if the tour was shortened
+    """
+    n = len(tour) - 2
+    improved = False
+    for i in range(1, n):
+        if time.perf_counter() >= deadline:
+            break
+        a, b = tour[i - 1], tour[i]
+        if _is_array(matrix):
+            t = np.asarray(tour)
+            tj, tj1 = t[i + 1:n + 1], t[i + 2:n + 2]
+            delta = matrix[a, tj] + matrix[b, tj1] - matrix[a, b] - matrix[tj, tj1]
+            k = int(delta.argmin())
+            best = delta[k]
+        else:
+            best, k = min((matrix[a][tour[j]] + matrix[b][tour[j + 1]] - matrix[a][b]
+                           - matrix[tour[j]][tour[j + 1]], j - i - 1) for j in range(i + 1, n + 1))
+        if best < -IMPROVEMENT_EPSILON:
+            j = i + 1 + k
+            tour[i:j + 1] = tour[i:j + 1][::-1]
+            improved = True
+    return improved
+
+
+def _or_opt(matrix, tour, deadline):
+    """
+    Move runs of one to three stops to the cheapest other place in the tour.
+    
+    Returns:
+        bool: True if the tour was shortened
+    """
+    n = len(tour) - 2
+    improved = False
+    for length in (1, 2, 3):
+        if length >= n:
+            break
+        i = 1
+        while i + length - 1 <= n:
+            if time.perf_counter() >= deadline:
+                return improved
+            first, last = tour[i], tour[i + length - 1]
+            prev, nxt = tour[i - 1], tour[i + length]
+            removal_gain = matrix[prev][first] + matrix[last][nxt] - matrix[prev][nxt]
+            rest = tour[:i] + tour[i + length:]
+            # Inserting between rest[p] and rest[p + 1]; p == i - 1 puts
+            # the run back where it was
+            if _is_array(matrix):
+                r = np.asarray(rest)
+                cost = matrix[r[:-1], first] + matrix[last, r[1:]] - matrix[r[:-1], r[1:]]
+                cost[i - 1] = np.inf
+                p = int(cost.argmin())
+                best = cost[p]
+            else:
+                best, p = min((matrix[rest[p]][first] + matrix[last][rest[p + 1]] - matrix[rest[p]][rest[p + 1]], p)
+                              for p in range(len(rest) - 1) if p != i - 1)
+            if best - removal_gain < -IMPROVEMENT_EPSILON:
+                tour[:] = rest[:p + 1] + tour[i:i + length] + rest[p + 1:]
+                improved = True
+            else:
+                i += 1
+    return improved
@@ -0,0 +1,88 @@
+"""
+FreshRoute Logistics - ID Sequences
+
+Persistent counters for package and route IDs. Each prefix has its own
+counter file in the data directory, updated under an exclusive file lock,
+so registering a package is O(1) and two dispatchers can never be given
+the same ID. A process may reserve a block of numbers at once and hand
+them out locally; numbers left in a block when it exits are skipped.
+"""
+
+import json
+import os
+from storage import FileLock, fcntl, lock_context, write_json_atomic
+
+
+class SequenceAllocator:
+    """Hands out IDs such as PKG0001 from a persistent counter."""
+    
+    def __init__(self, data_dir, prefix, seed=None, block_size=1):
+        """
+        Initialize the allocator.
+        
+        Args:
+            data_dir (str): Directory for the counter file
+            prefix (str): ID prefix, e.g. "PKG" or "RT"
+            seed: Callable returning existing IDs; only used to start the
+                counter when its file does not exist yet
+            block_size (int): Numbers reserved per trip to the counter file
+        """
+        self.prefix = prefix
+        self.counter_file = os.path.join(data_dir, f"{prefix}.seq")
+        self.seed = seed
+        self.block_size = block_size
+        self._lock = FileLock(self.counter_file + ".lock") if fcntl else None
+        self._next = 0
+        self._end = 0
+    
+    def next_id(self):
+        """
+        Get the next unused ID.
+        
+        Returns:
+            str: New unique ID (e.g., "PKG0001")
+        """
+        if self._next >= self._end:
+            self._reserve_block()
+        number = self._next
+        self._next += 1
+        return f"{self.prefix}{number:04d}"
+    
+    def _reserve_block(self):
+        """Advance the shared counter by one block and keep the numbers."""
+        with lock_context(self._lock, exclusive=True):
+            last = self._read_counter()
+            if last is None:
+                last = highest_id_number(self.prefix, self.seed() if self.seed else [])
+            write_json_atomic(self.counter_file, {"last": last + self.block_size})
+        self._next = last + 1
+        self._end = last + 1 + self.block_size
+    
+    def _read_counter(self):
+        """Read the last reserved number, or None if there is no counter yet."""
+        try:
+            with open(self.counter_file, 'r') as f:
+                return json.load(f)["last"]
+        except FileNotFoundError:
+            return None
+
+
+def highest_id_number(prefix, existing_ids):
+    """
+    Find the highest number used by IDs with a prefix.
+    
+    Args:
+        prefix (str): ID prefix
+        existing_ids: Iterable of existing IDs
+    
+    Returns:
+        int: Highest number found, or 0 if none
+    """
+    highest = 0
+    for existing_id in existing_ids:
+        if existing_id.startswith(prefix):
+            try:
+                highest = max(highest, int(existing_id[len(prefix):]))
+            except ValueError:
+                pass
+    return highest
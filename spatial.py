@@ -0,0 +1,375 @@
+"""
+FreshRoute Logistics - Spatial Index
+
+A uniform grid over package locations for radius and nearest-neighbour
+lookups, kept up to date by PackageDatabase change listeners. Points are
+bucketed into cells of CELL_DEGREES; a query only looks at the cells
+around the query point instead of scanning every package.
+
+The index is persisted as data/spatial_index.json plus a journal of
+changes (see storage.JournalStore), so it survives restarts without
+reading the package database again. The package storage signature seen
+at the last update is kept next to it; attach() rebuilds the index when
+the packages were changed without it, e.g. by a process that did not
+have it attached. Changes that move no package only record the new
+signature on close(). To rebuild it by hand:
+    
+    python spatial.py --data-dir data --storage json
+"""
+
+import argparse
+import heapq
+import json
+import math
+import os
+from database_packages import PackageDatabase
+from routing import EARTH_RADIUS_KM, haversine_km
+from storage import FileLock, JournalStore, lock_context, write_json_atomic
+
+
+SPATIAL_INDEX_FILENAME = "spatial_index.json"
+SPATIAL_SOURCE_FILENAME = "spatial_index.source.json"
+
+# Grid cell size in degrees of latitude and longitude (about 550 m)
+CELL_DEGREES = 0.005
+
+# Kilometres per degree of latitude
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+# Slack on the flat-earth distance used to skip points before computing
+# the exact haversine distance; covers its error at city scale
+PREFILTER_MARGIN = 1.1
+
+
+def _location(record):
+    """Get (latitude, longitude) from a package record, or None."""
+    if record is None or record.get('latitude') is None or record.get('longitude') is None:
+        return None
+    return (record['latitude'], record['longitude'])
+
+
+class SpatialIndex:
+    """Persisted grid index of package locations keyed by package ID."""
+    
+    def __init__(self, data_dir="data", cell_degrees=CELL_DEGREES, locking=False):
+        """
+        Initialize the index.
+        
+        Args:
+            data_dir (str): Directory holding spatial_index.json
+            cell_degrees (float): Grid cell size in degrees
+            locking (bool): Take an fcntl lock while reading or updating
+                the persisted index
+        """
+        self.index_file = os.path.join(data_dir, SPATIAL_INDEX_FILENAME)
+        self.source_file = os.path.join(data_dir, SPATIAL_SOURCE_FILENAME)
+        self.cell_degrees = cell_degrees
+        lock_file = self.index_file + ".lock" if locking else None
+        self._lock = FileLock(lock_file) if locking else None
+        self._journal = JournalStore(self.index_file, 'package_id', lock_file=lock_file)
+        self._positions = {}
+        self._cells = {}
+        self._bounds = None
+        self._token = None
+        self._package_db = None
+        self._pending_source = None
+    
+    def attach(self, package_db):
+        """
+        Keep the index updated on every change to the package database.
+        
+        Builds the index first if it has not been persisted yet, or if the
+        packages have changed since the index was last updated.
+        
+        Args:
+            package_db (PackageDatabase): Package database instance
+        """
+        if self._stored_source() != repr(package_db.storage_signature()):
+            self.rebuild(package_db)
+        self._package_db = package_db
+        package_db.add_listener(self.on_package_changes)
+    
+    def rebuild(self, package_db):
+        """
+        Index every located package from scratch and save the index.
+        
+        Args:
+            package_db (PackageDatabase): Package database instance
+        
+        Returns:
+            int: Number of packages indexed
+        """
+        # Read before taking our lock: writers hold their database lock
+        # while they update the index, so the opposite order could deadlock.
+        # The signature is taken first, so a write during the read leaves
+        # the index marked out of date.
+        source = package_db.storage_signature()
+        records = []
+        for pkg in package_db.iter_packages():
+            if pkg.latitude is not None and pkg.longitude is not None:
+                records.append({'package_id': pkg.package_id, 'latitude': pkg.latitude,
+                                'longitude': pkg.longitude})
+        with lock_context(self._lock, exclusive=True):
+            self._journal.wait()
+            write_json_atomic(self.index_file, records)
+            for path in (self._journal.journal_file, self._journal.compacting_file):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._load(records)
+            self._write_source(repr(source))
+        return len(records)
+    
+    def on_package_changes(self, changes):
+        """Apply (old, new) package record pairs from a PackageDatabase."""
+        entries = []
+        for old, new in changes:
+            location = _location(new)
+            if location is not None:
+                if location != _location(old):
+                    entries.append(("put", {'package_id': new['package_id'],
+                                            'latitude': location[0], 'longitude': location[1]}))
+            elif _location(old) is not None:
+                entries.append(("delete", old['package_id']))
+        with lock_context(self._lock, exclusive=True):
+            if not os.path.exists(self.index_file):
+                # Nothing to adjust; the next attach() builds from scratch
+                return
+            if entries:
+                self._refresh()
+                # Apply first: a compaction started by the append snapshots
+                # the positions in memory
+                for op, value in entries:
+                    if op == "put":
+                        self._put(value['package_id'], (value['latitude'], value['longitude']))
+                    else:
+                        self._remove(value)
+                self._journal.append(entries, self._snapshot)
+                self._token = self._signature()
+            if self._package_db is not None:
+                # The index now matches the packages as just written
+                source = repr(self._package_db.storage_signature())
+                if entries:
+                    self._write_source(source)
+                else:
+                    # No location changed; close() records it instead of
+                    # rewriting the file on every status update
+                    self._pending_source = source
+    
+    def close(self):
+        """
+        Record the package storage signature left pending by changes that
+        moved no package, so the next attach() can skip the rebuild.
+        
+        Nothing is recorded if the packages were written again since, as
+        that write may not have been indexed.
+        """
+        if self._pending_source is None:
+            return
+        with lock_context(self._lock, exclusive=True):
+            if repr(self._package_db.storage_signature()) == self._pending_source:
+                self._write_source(self._pending_source)
+        self._pending_source = None
+    
+    def location(self, package_id):
+        """
+        Get the indexed location of a package.
+        
+        Args:
+            package_id (str): Package ID
+        
+        Returns:
+            tuple: (latitude, longitude), or None if it is not indexed
+        """
+        self._refresh()
+        return self._positions.get(package_id)
+    
+    def within_radius(self, latitude, longitude, radius_km):
+        """
+        Find the packages within a distance of a point.
+        
+        Args:
+            latitude (float): Latitude of the point
+            longitude (float): Longitude of the point
+            radius_km (float): Search radius in kilometres
+        
+        Returns:
+            list: (package_id, kilometres) pairs, nearest first
+        """
+        self._refresh()
+        point = (latitude, longitude)
+        lat_cells = radius_km / KM_PER_DEGREE / self.cell_degrees
+        lon_cells = lat_cells / max(math.cos(math.radians(min(89.0, abs(latitude) + lat_cells * self.cell_degrees))),
+                                    1e-6)
+        row, col = self._cell(point)
+        lon_scale = math.cos(math.radians(latitude))
+        limit = (radius_km * PREFILTER_MARGIN / KM_PER_DEGREE) ** 2
+        found = []
+        for r in range(row - math.ceil(lat_cells), row + math.ceil(lat_cells) + 1):
+            for c in range(col - math.ceil(lon_cells), col + math.ceil(lon_cells) + 1):
+                for pkg_id, location in self._cells.get((r, c), {}).items():
+                    # Cheap flat-earth check first; haversine only for candidates
+                    dlat = location[0] - latitude
+                    dlon = (location[1] - longitude) * lon_scale
+                    if dlat * dlat + dlon * dlon > limit:
+                        continue
+                    distance = haversine_km(point, location)
+                    if distance <= radius_km:
+                        found.append((distance, pkg_id))
+        found.sort()
+        return [(pkg_id, distance) for distance, pkg_id in found]
+    
+    def nearest(self, latitude, longitude, k=1):
+        """
+        Find the k packages closest to a point.
+        
+        Rings of cells are searched outwards from the point's cell until
+        no unsearched cell can hold anything closer than the k-th match.
+        
+        Args:
+            latitude (float): Latitude of the point
+            longitude (float): Longitude of the point
+            k (int): Number of packages to return
+        
+        Returns:
+            list: Up to k (package_id, kilometres) pairs, nearest first
+        """
+        self._refresh()
+        if k <= 0 or not self._positions:
+            return []
+        point = (latitude, longitude)
+        row, col = self._cell(point)
+        min_row, max_row, min_col, max_col = self._grid_bounds()
+        last_ring = max(row - min_row, max_row - row, col - min_col, max_col - col)
+        lon_scale = math.cos(math.radians(latitude))
+        limit = math.inf
+        best = []  # max-heap of (-distance, package_id), size k
+        ring = 0
+        while ring <= last_ring:
+            for cell in self._ring(row, col, ring):
+                for pkg_id, location in self._cells.get(cell, {}).items():
+                    if limit < math.inf:
+                        dlat = location[0] - latitude
+                        dlon = (location[1] - longitude) * lon_scale
+                        if dlat * dlat + dlon * dlon > limit:
+                            continue
+                    entry = (-haversine_km(point, location), pkg_id)
+                    if len(best) < k:
+                        heapq.heappush(best, entry)
+                    elif entry > best[0]:
+                        heapq.heapreplace(best, entry)
+                    else:
+                        continue
+                    if len(best) == k:
+                        limit = (-best[0][0] * PREFILTER_MARGIN / KM_PER_DEGREE) ** 2
+            # Everything outside the searched rings is at least this far away
+            covered = ring * self.cell_degrees * KM_PER_DEGREE * math.cos(
+                math.radians(min(89.0, abs(latitude) + (ring + 1) * self.cell_degrees)))
+            if len(best) == k and -best[0][0] <= covered:
+                break
+            ring += 1
+        return [(pkg_id, -neg) for neg, pkg_id in sorted(best, reverse=True)]
+    
+    def __len__(self):
+        self._refresh()
+        return len(self._positions)
+    
+    def _cell(self, location):
+        return (math.floor(location[0] / self.cell_degrees), math.floor(location[1] / self.cell_degrees))
+    
+    @staticmethod
+    def _ring(row, col, ring):
+        """Yield the cells at Chebyshev distance ring from (row, col)."""
+        if ring == 0:
+            yield (row, col)
+            return
+        for c in range(col - ring, col + ring + 1):
+            yield (row - ring, c)
+            yield (row + ring, c)
+        for r in range(row - ring + 1, row + ring):
+            yield (r, col - ring)
+            yield (r, col + ring)
+    
+    def _grid_bounds(self):
+        if self._bounds is None:
+            rows = [cell[0] for cell in self._cells]
+            cols = [cell[1] for cell in self._cells]
+            self._bounds = (min(rows), max(rows), min(cols), max(cols))
+        return self._bounds
+    
+    def _put(self, package_id, location):
+        self._remove(package_id)
+        self._positions[package_id] = location
+        self._cells.setdefault(self._cell(location), {})[package_id] = location
+        self._bounds = None
+    
+    def _remove(self, package_id):
+        location = self._positions.pop(package_id, None)
+        if location is None:
+            return
+        cell = self._cell(location)
+        members = self._cells[cell]
+        del members[package_id]
+        if not members:
+            del self._cells[cell]
+        self._bounds = None
+    
+    def _load(self, records):
+        self._positions = {}
+        self._cells = {}
+        self._bounds = None
+        for record in records:
+            self._put(record['package_id'], (record['latitude'], record['longitude']))
+        self._token = self._signature()
+    
+    def _snapshot(self):
+        return [{'package_id': pkg_id, 'latitude': lat, 'longitude': lon}
+                for pkg_id, (lat, lon) in self._positions.items()]
+    
+    def _stored_source(self):
+        """Get the package storage signature the index was last updated at, or None."""
+        with lock_context(self._lock):
+            if not os.path.exists(self.index_file):
+                return None
+            try:
+                with open(self.source_file, 'r') as f:
+                    return json.load(f).get("source")
+            except (FileNotFoundError, ValueError):
+                return None
+    
+    def _write_source(self, source):
+        """Record the package storage signature the index is current at."""
+        write_json_atomic(self.source_file, {"source": source})
+        self._pending_source = None
+    
+    def _signature(self):
+        return self._journal.signature()
+    
+    def _refresh(self):
+        """Reload from disk if another writer has changed the persisted index."""
+        token = self._signature()
+        if token == self._token:
+            return
+        with lock_context(self._lock):
+            if os.path.exists(self.index_file):
+                self._load(self._journal.load())
+            else:
+                self._load([])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild the FreshRoute spatial index")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--storage", default="json", choices=["json", "journal", "sqlite"])
+    parser.add_argument("--lock", action=argparse.BooleanOptionalAction, default=os.name == "posix",
+                        help="take the file locks the running app uses (default on POSIX)")
+    args = parser.parse_args(argv)
+    
+    package_db = PackageDatabase(args.data_dir, storage=args.storage, locking=args.lock)
+    count = SpatialIndex(args.data_dir, locking=args.lock).rebuild(package_db)
+    print(f"Rebuilt {os.path.join(args.data_dir, SPATIAL_INDEX_FILENAME)}: {count} packages")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+"""
+FreshRoute Logistics - Storage Engines
+
+The default storage keeps each table as one JSON array that is rewritten
+on every change. The journal engine instead appends one JSON line per
+mutation and folds the journal back into the JSON snapshot in the
+background once it grows past a size threshold. The "sqlite" engine is
+implemented separately in database_sqlite.
+
+Several processes may share one data directory. Writes always go to a
+temporary file that is moved into place, and databases opened with
+locking=True take fcntl locks on a sidecar .lock file: shared for reads,
+exclusive for read-modify-write.
+"""
+
+import contextlib
+import functools
+import json
+import os
+import stat
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows has no fcntl; locking=True is unavailable there
+    fcntl = None
+
+
+STORAGE_ENGINES = ("json", "journal", "sqlite")
+
+# Journal size in bytes after which it is compacted into the snapshot
+DEFAULT_COMPACT_THRESHOLD = 8 * 1024 * 1024
+
+# Process umask, read once at import since reading it means setting it
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def file_signature(path):
+    """
+    Get a cheap fingerprint of a file's current contents.
+    
+    Args:
+        path (str): File to stat
+    
+    Returns:
+        tuple: (inode, mtime in ns, size), or None if the file is missing
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class FileLock:
+    """Advisory fcntl lock on a lock file, reentrant within one instance."""
+    
+    def __init__(self, path):
+        """
+        Initialize the lock.
+        
+        Args:
+            path (str): Lock file, created on first use
+        """
+        if fcntl is None:
+            raise RuntimeError("File locking requires fcntl, which this platform lacks")
+        self.path = path
+        self._depth = 0
+        self._exclusive = False
+    
+    @contextlib.contextmanager
+    def acquire(self, exclusive=False):
+        """
+        Hold the lock for the duration of a with block.
+        
+        Args:
+            exclusive (bool): Exclusive (write) lock instead of shared (read)
+        """
+        if self._depth:
+            if exclusive and not self._exclusive:
+                raise RuntimeError("Cannot upgrade a shared lock to exclusive")
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+            return
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self._depth = 1
+            self._exclusive = exclusive
+            yield
+        finally:
+            self._depth = 0
+            # Closing the descriptor releases the lock
+            os.close(fd)
+
+
+def lock_context(lock, exclusive=False):
+    """
+    Get a context manager for an optional lock.
+    
+    Args:
+        lock (FileLock): Lock to take, or None for no locking
+        exclusive (bool): Exclusive instead of shared lock
+    
+    Returns:
+        Context manager holding the lock, or doing nothing
+    """
+    if lock is None:
+        return contextlib.nullcontext()
+    return lock.acquire(exclusive)
+
+
+def with_lock(exclusive=False):
+    """
+    Decorate a database method to run under the instance's `_lock`.
+    
+    Args:
+        exclusive (bool): Exclusive instead of shared lock
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with lock_context(self._lock, exclusive):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class ChangeNotifier:
+    """
+    Base for databases that tell listeners about committed changes and
+    expose a data version.
+    
+    Subclasses implement _external_version() to return a token that
+    changes whenever the stored data does, including writes made by
+    other processes.
+    """
+    
+    _listeners = ()
+    _data_version = 0
+    _version_token = None
+    
+    @property
+    def data_version(self):
+        """
+        Get a number that increases every time the data changes.
+        
+        Returns:
+            int: Data version; equal values mean nothing has been written
+                in between
+        """
+        token = self._external_version()
+        if token != self._version_token:
+            self._version_token = token
+            self._data_version += 1
+        return self._data_version
+    
+    def _external_version(self):
+        """Get a token that changes whenever the stored data changes."""
+        raise NotImplementedError
+    
+    def add_listener(self, listener):
+        """
+        Register a callable to run after every committed mutation.
+        
+        Args:
+            listener: Called with a list of (old record, new record) pairs;
+                old is None for inserts and new is None for deletes
+        """
+        self._listeners = self._listeners + (listener,)
+    
+    def _notify(self, changes):
+        """Bump the data version and pass committed (old, new) record pairs to every listener."""
+        if changes:
+            self._data_version += 1
+            for listener in self._listeners:
+                listener(changes)
+
+
+def write_json_atomic(path, data, indent=2):
+    """
+    Write JSON to a temporary file and move it over the target.
+    
+    An existing file keeps its permissions; a new one gets the same
+    permissions open() would give it under the process umask.
+    
+    Args:
+        path (str): Destination file
+        data: JSON-serializable data
+        indent (int): Indentation passed to json.dump
+    """
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            # mkstemp creates the file 0600 and os.replace keeps that mode;
+            # give it the mode a plain open() would have
+            if hasattr(os, "fchmod"):
+                os.fchmod(f.fileno(), mode)
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+class JournalStore:
+    """Append-only JSON-lines journal on top of a JSON array snapshot."""
+    
+    def __init__(self, snapshot_file, key, compact_threshold=DEFAULT_COMPACT_THRESHOLD,
+                 lock_file=None):
+        """
+        Initialize the journal for a snapshot file.
+        
+        Args:
+            snapshot_file (str): JSON array file holding the last snapshot
+            key (str): Record field that identifies a record
+            compact_threshold (int): Journal size in bytes that triggers
+                a background compaction
+            lock_file (str): Lock file shared with other processes. Callers
+                of load() and append() must already hold it; the background
+                compaction takes it exclusively while it runs.
+        """
+        self.snapshot_file = snapshot_file
+        self.journal_file = os.path.splitext(snapshot_file)[0] + ".journal"
+        self.compacting_file = self.journal_file + ".compacting"
+        self.key = key
+        self.compact_threshold = compact_threshold
+        self.lock_file = lock_file
+        self._lock = threading.Lock()
+        self._compactor = None
+    
+    def signature(self):
+        """
+        Get the stat signatures of the snapshot and the journal files.
+        
+        A compaction removes the journal again, so the journal alone can
+        look unchanged across another process's writes; the rewritten
+        snapshot still shows them.
+        
+        Returns:
+            tuple: Signatures of the snapshot, the compacting journal and
+                the journal (None for a missing file)
+        """
+        return (file_signature(self.snapshot_file), file_signature(self.compacting_file),
+                file_signature(self.journal_file))
+    
+    def load(self):
+        """
+        Rebuild the current records by replaying the journal over the snapshot.
+        
+        Returns:
+            list: List of record dictionaries
+        """
+        if self.lock_file is None:
+            # Without a file lock the compactor could swap files mid-read.
+            # With one, the caller's lock keeps it out until we are done.
+            self.wait()
+        records = self._replay_all()
+        if self.lock_file is None and os.path.exists(self.compacting_file):
+            # A compaction was interrupted; the replay above already
+            # covers its journal segment, so finish it now.
+            self._write_snapshot(list(records.values()), (self.compacting_file,))
+        return list(records.values())
+    
+    def append(self, changes, snapshot):
+        """
+        Append mutations to the journal.
+        
+        Args:
+            changes (list): ("put", record) or ("delete", key) tuples
+            snapshot: Callable returning the current list of records, used
+                if this append pushes the journal past the threshold
+        """
+        lines = []
+        for op, value in changes:
+            if op == "put":
+                lines.append(json.dumps({"op": "put", "record": value}))
+            else:
+                lines.append(json.dumps({"op": "delete", "key": value}))
+        if not lines:
+            return
+        with self._lock:
+            with open(self.journal_file, 'a') as f:
+                f.write("\n".join(lines) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+            if size >= self.compact_threshold and not self._compacting():
+                self._start_compaction(snapshot)
+    
+    def wait(self):
+        """Block until a running background compaction has finished."""
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+    
+    def _compacting(self):
+        return self._compactor is not None and self._compactor.is_alive()
+    
+    def _start_compaction(self, snapshot):
+        """Start folding the journal into the snapshot on a worker thread."""
+        if self.lock_file:
+            # Other processes may be appending too, so the worker rebuilds
+            # the state from disk once it holds the exclusive lock.
+            target, args = self._compact_locked, ()
+        else:
+            # Rotate the journal aside so appends can continue while the
+            # in-memory state is written out.
+            os.replace(self.journal_file, self.compacting_file)
+            target, args = self._write_snapshot, (snapshot(), (self.compacting_file,))
+        self._compactor = threading.Thread(target=target, args=args, name="journal-compactor")
+        self._compactor.start()
+    
+    def _compact_locked(self):
+        """Compact under the shared lock file, rebuilding state from disk."""
+        with FileLock(self.lock_file).acquire(exclusive=True):
+            journal = file_signature(self.journal_file)
+            if journal is None or journal[2] < self.compact_threshold:
+                # Another process compacted while we waited for the lock
+                return
+            records = self._replay_all()
+            self._write_snapshot(list(records.values()), (self.compacting_file, self.journal_file))
+    
+    def _write_snapshot(self, records, covered_files):
+        """Persist a snapshot, then drop the journal files it covers."""
+        write_json_atomic(self.snapshot_file, records)
+        for path in covered_files:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    
+    def _replay_all(self):
+        """Read the snapshot and replay every journal segment over it."""
+        records = {}
+        with open(self.snapshot_file, 'r') as f:
+            for record in json.load(f):
+                records[record[self.key]] = record
+        # Replaying is idempotent, so a segment left behind by an
+        # interrupted compaction can safely be applied again
+        for path in (self.compacting_file, self.journal_file):
+            self._replay(path, records)
+        return records
+    
+    def _replay(self, path, records):
+        """Apply the entries of one journal file to a records dict."""
+        if not os.path.exists(path):
+            return
+        with open(path, 'r+') as f:
+            end_of_last_entry = 0
+            for line in iter(f.readline, ''):
+                try:
+                    entry = json.loads(line) if line.endswith("\n") else None
+                except ValueError:
+                    entry = None
+                if entry is None:
+                    # A torn final line from a crash mid-append; cut it off
+                    # so later appends start on a clean line.
+                    f.truncate(end_of_last_entry)
+                    break
+                end_of_last_entry = f.tell()
+                if entry["op"] == "put":
+                    record = entry["record"]
+                    records[record[self.key]] = record
+                else:
+                    records.pop(entry["key"], None)
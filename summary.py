@@ -0,0 +1,189 @@
+"""
+FreshRoute Logistics - Summary Counters
+
+A small aggregate record (data/summary.json) kept up to date by database
+change listeners, so the summary dashboard can be shown without loading
+every package and route. If the record is missing or has drifted, rebuild
+it from the databases:
+    
+    python summary.py --data-dir data --storage json
+"""
+
+import argparse
+import json
+import os
+from database_packages import PackageDatabase
+from database_routes import RouteDatabase
+from storage import FileLock, lock_context, write_json_atomic
+
+
+SUMMARY_FILENAME = "summary.json"
+
+
+def build_summary(package_db, route_db):
+    """
+    Count the summary figures with one pass over each database.
+    
+    Args:
+        package_db (PackageDatabase): Package database instance
+        route_db (RouteDatabase): Route database instance
+    
+    Returns:
+        dict: Summary record in the summary.json format
+    """
+    summary = _empty_summary()
+    for pkg in package_db.get_all_packages():
+        _count_package(summary, pkg.to_dict(), 1)
+    for route in route_db.get_all_routes():
+        _count_route(summary, route.to_dict(), 1)
+    return summary
+
+
+def _empty_summary():
+    return {
+        "total_packages": 0,
+        "packages_by_status": {},
+        "delivered_per_day": {},
+        "total_routes": 0,
+        "assigned_packages": 0,
+    }
+
+
+def _bump(counts, key, delta):
+    """Add delta to a counter dict, dropping keys that fall to zero."""
+    value = counts.get(key, 0) + delta
+    if value:
+        counts[key] = value
+    else:
+        counts.pop(key, None)
+
+
+def _count_package(summary, record, sign):
+    """Add (sign=1) or remove (sign=-1) one package record from the totals."""
+    if record is None:
+        return
+    summary["total_packages"] += sign
+    _bump(summary["packages_by_status"], record['status'], sign)
+    if record['status'] == "Delivered" and record.get('delivered_at'):
+        _bump(summary["delivered_per_day"], record['delivered_at'][:10], sign)
+
+
+def _count_route(summary, record, sign):
+    """Add (sign=1) or remove (sign=-1) one route record from the totals."""
+    if record is None:
+        return
+    summary["total_routes"] += sign
+    summary["assigned_packages"] += sign * len(record.get('package_ids') or ())
+
+
+class SummaryCounters:
+    """Persisted summary record updated from database change events."""
+    
+    def __init__(self, data_dir="data", locking=False):
+        """
+        Initialize the counters.
+        
+        Args:
+            data_dir (str): Directory holding summary.json
+            locking (bool): Take an fcntl lock while updating the record
+        """
+        self.summary_file = os.path.join(data_dir, SUMMARY_FILENAME)
+        self._lock = FileLock(self.summary_file + ".lock") if locking else None
+    
+    def attach(self, package_db, route_db):
+        """
+        Keep the record updated on every change to the databases.
+        
+        Args:
+            package_db (PackageDatabase): Package database instance
+            route_db (RouteDatabase): Route database instance
+        """
+        package_db.add_listener(self.on_package_changes)
+        route_db.add_listener(self.on_route_changes)
+    
+    def read(self):
+        """
+        Read the summary record.
+        
+        Returns:
+            dict: Summary record, or None if it has not been built yet
+        """
+        try:
+            with open(self.summary_file, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+    
+    def get(self, package_db, route_db):
+        """
+        Read the summary record, building it first if it does not exist.
+        
+        Args:
+            package_db (PackageDatabase): Package database instance
+            route_db (RouteDatabase): Route database instance
+        
+        Returns:
+            dict: Summary record
+        """
+        summary = self.read()
+        if summary is None:
+            summary = self.rebuild(package_db, route_db)
+        return summary
+    
+    def rebuild(self, package_db, route_db):
+        """
+        Recount the record from the databases and save it.
+        
+        Args:
+            package_db (PackageDatabase): Package database instance
+            route_db (RouteDatabase): Route database instance
+        
+        Returns:
+            dict: The rebuilt summary record
+        """
+        # Take the database locks before ours, in the order writers take
+        # them, and hold them until the record is saved: a write between
+        # the count and the save would otherwise be lost from the record.
+        with lock_context(getattr(package_db, "_lock", None)), lock_context(getattr(route_db, "_lock", None)):
+            summary = build_summary(package_db, route_db)
+            with lock_context(self._lock, exclusive=True):
+                write_json_atomic(self.summary_file, summary)
+        return summary
+    
+    def on_package_changes(self, changes):
+        """Apply (old, new) package record pairs from a PackageDatabase."""
+        self._update(changes, _count_package)
+    
+    def on_route_changes(self, changes):
+        """Apply (old, new) route record pairs from a RouteDatabase."""
+        self._update(changes, _count_route)
+    
+    def _update(self, changes, count):
+        with lock_context(self._lock, exclusive=True):
+            summary = self.read()
+            if summary is None:
+                # Nothing to adjust; the next get() counts from scratch
+                return
+            for old, new in changes:
+                count(summary, old, -1)
+                count(summary, new, 1)
+            write_json_atomic(self.summary_file, summary)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild the FreshRoute summary counters")
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--storage", default="json", choices=["json", "journal", "sqlite"])
+    parser.add_argument("--lock", action=argparse.BooleanOptionalAction, default=os.name == "posix",
+                        help="take the file locks the running app uses (default on POSIX)")
+    args = parser.parse_args(argv)
+    
+    package_db = PackageDatabase(args.data_dir, storage=args.storage, locking=args.lock)
+    route_db = RouteDatabase(args.data_dir, storage=args.storage, locking=args.lock)
+    summary = SummaryCounters(args.data_dir, locking=args.lock).rebuild(package_db, route_db)
+    print(f"Rebuilt {os.path.join(args.data_dir, SUMMARY_FILENAME)}: "
+          f"{summary['total_packages']} packages, {summary['total_routes']} routes")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,29 @@
+import gzip
+import json
+import multiprocessing
+import os
+import random
+import tempfile
 import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+import assignment
+import benchmark
+from addresses import normalize_address
+from aggregates import (DelayedDeliveries, DeliveryAging, DriverPerformance, ProblematicAddresses,
+                        SummaryStatistics, run_parallel, run_serial)
+from database_packages import PackageDatabase
+from database_routes import RouteDatabase
+from database_sqlite import PACKAGE_COLUMNS
+from joins import join_routes_packages
 from models import Package, Route
+import reports
+import routing
+import storage
+from report_cache import ReportCache
+from sequence import SequenceAllocator
+from spatial import SpatialIndex
+from summary import SummaryCounters, build_summary
 
 # How to run test: python -m unittest test_system.py -v
 
@@ -42,6 +66,19 @@ class TestPackageModel(unittest.TestCase):
         self.assertIsInstance(pkg_dict, dict)
         self.assertEqual(pkg_dict['package_id'], "PKG003")
         self.assertEqual(pkg_dict['sender'], "Sender Name 3")
+    
+    def test_from_dict_keeps_stored_timestamps(self):
+        """Test 3b: Loading a package keeps its timestamps and has no __dict__."""
+        data = Package("PKG004", "Sender", "Recipient", "Address", "09121231212", 1.0, "Food").to_dict()
+        data['created_at'] = "2025-01-02T03:04:05"
+        
+        package = Package.from_dict(data)
+        
+        self.assertEqual(package.created_at, "2025-01-02T03:04:05")
+        self.assertEqual(package.to_dict(), data)
+        self.assertFalse(hasattr(package, "__dict__"))
+        del data['updated_at']
+        self.assertIsNotNone(Package.from_dict(data).updated_at)
 
 
 class TestRouteModel(unittest.TestCase):
@@ -74,6 +111,947 @@ class TestRouteModel(unittest.TestCase):
         self.assertIn("PKG002", route.package_ids)
 
 
+class TestIndexedPackageDatabase(unittest.TestCase):
+    """Test cases for the in-memory indexed package database."""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = PackageDatabase(self.tmp.name, indexed=True)
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_crud_round_trip(self):
+        """Test 6: Add, update and delete through the index."""
+        package = Package("PKG001", "Sender", "Recipient", "Address", "09121231212", 1.0, "Food")
+        self.assertTrue(self.db.add_package(package))
+        self.assertFalse(self.db.add_package(package))
+        
+        package.update_status("Delivered")
+        self.assertTrue(self.db.update_package(package))
+        self.assertEqual(self.db.get_package_by_id("PKG001").status, "Delivered")
+        
+        self.assertTrue(self.db.delete_package("PKG001"))
+        self.assertIsNone(self.db.get_package_by_id("PKG001"))
+        self.assertFalse(self.db.delete_package("PKG001"))
+    
+    def test_writes_are_persisted(self):
+        """Test 7: A fresh database sees what the indexed one wrote."""
+        self.db.add_package(Package("PKG001", "Sender", "Recipient", "Address", "09121231212", 1.0, "Food"))
+        
+        reloaded = PackageDatabase(self.tmp.name)
+        self.assertEqual(reloaded.get_package_by_id("PKG001").recipient_name, "Recipient")
+    
+    def test_secondary_indexes_follow_writes(self):
+        """Test 8: Status, route and unassigned lookups track updates."""
+        first = Package("PKG001", "Sender", "Recipient", "Address", "09121231212", 1.0, "Food")
+        second = Package("PKG002", "Sender", "Recipient", "Address", "09121231212", 1.0, "Food")
+        self.db.add_package(first)
+        self.db.add_package(second)
+        
+        first.route_id = "RT0001"
+        first.update_status("Out for Delivery")
+        self.db.update_package(first)
+        
+        self.assertEqual([p.package_id for p in self.db.get_packages_by_status("Pending")], ["PKG002"])
+        self.assertEqual([p.package_id for p in self.db.get_packages_by_route("RT0001")], ["PKG001"])
+        self.assertEqual([p.package_id for p in self.db.get_unassigned_packages()], ["PKG002"])
+        
+        self.db.delete_package("PKG001")
+        self.assertEqual(self.db.get_packages_by_route("RT0001"), [])
+        self.assertEqual(self.db.get_packages_by_status("Out for Delivery"), [])
+
+
+class TestJournalStorage(unittest.TestCase):
+    """Test cases for the append-only journal storage engine."""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_journal_replay(self):
+        """Test 9: State is rebuilt from the journal on startup."""
+        db = PackageDatabase(self.tmp.name, storage="journal")
+        for i in range(3):
+            db.add_package(Package(f"PKG{i:04d}", "Sender", "Recipient", "Address", "09121231212", 1.0, "Food"))
+        package = db.get_package_by_id("PKG0001")
+        package.update_status("Delivered")
+        db.update_package(package)
+        db.delete_package("PKG0002")
+        
+        reloaded = PackageDatabase(self.tmp.name, storage="journal")
+        self.assertEqual([p.package_id for p in reloaded.get_all_packages()], ["PKG0000", "PKG0001"])
+        self.assertEqual(reloaded.get_package_by_id("PKG0001").status, "Delivered")
+    
+    def test_compaction_folds_journal_into_snapshot(self):
+        """Test 10: Passing the threshold rewrites routes.json and clears the journal."""
+        db = RouteDatabase(self.tmp.name, storage="journal", compact_threshold=1)
+        db.add_route(Route("RT0001", "North", "Driver", "09111222333", "2025-12-15"))
+        db._journal.wait()
+        
+        self.assertEqual([r.route_id for r in RouteDatabase(self.tmp.name).get_all_routes()], ["RT0001"])
+        self.assertFalse(os.path.exists(db._journal.journal_file))
+        self.assertFalse(os.path.exists(db._journal.compacting_file))
+        
+        db.add_route(Route("RT0002", "South", "Driver", "09111222333", "2025-12-15"))
+        db._journal.wait()
+        reloaded = RouteDatabase(self.tmp.name, storage="journal")
+        self.assertEqual([r.route_id for r in reloaded.get_all_routes()], ["RT0001", "RT0002"])
+    
+    def test_other_instance_sees_compacted_writes(self):
+        """Test 10b: A write compacted away by another instance still invalidates the index."""
+        for locking in (False, True):
+            with self.subTest(locking=locking), tempfile.TemporaryDirectory() as data_dir:
+                a = PackageDatabase(data_dir, storage="journal", compact_threshold=1, locking=locking)
+                b = PackageDatabase(data_dir, storage="journal", compact_threshold=1, locking=locking)
+                self.assertIsNone(b.get_package_by_id("PKG0001"))
+                version = b.data_version
+                
+                a.add_package(Package("PKG0001", "Sender", "Recipient", "Address", "09121231212", 1.0, "Food"))
+                a._journal.wait()
+                self.assertFalse(os.path.exists(a._journal.journal_file))
+                
+                self.assertEqual(b.get_package_by_id("PKG0001").package_id, "PKG0001")
+                self.assertGreater(b.data_version, version)
+
+class TestSQLiteStorage(unittest.TestCase):
+    """Test cases for the SQLite storage backend."""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_sqlite_crud_and_filters(self):
+        """Test 11: The SQLite backend behaves like the JSON one."""
+        package_db = PackageDatabase(self.tmp.name, storage="sqlite")
+        route_db = RouteDatabase(self.tmp.name, storage="sqlite")
+        
+        package = Package("PKG0001", "Sender", "Recipient", "Address", "09121231212", 1.0, "Food")
+        self.assertTrue(package_db.add_package(package))
+        self.assertFalse(package_db.add_package(package))
+        package.route_id = "RT0001"
+        self.assertTrue(package_db.update_package(package))
+        
+        route = Route("RT0001", "North", "Driver", "09111222333", "2025-12-15")
+        route.add_package("PKG0001")
+        self.assertTrue(route_db.add_route(route))
+        
+        self.assertEqual(package_db.get_packages_by_route("RT0001")[0].package_id, "PKG0001")
+        self.assertEqual(package_db.get_unassigned_packages(), [])
+        self.assertEqual(route_db.get_routes_by_date("2025-12-15")[0].package_ids, ["PKG0001"])
+        self.assertTrue(package_db.delete_package("PKG0001"))
+        self.assertIsNone(package_db.get_package_by_id("PKG0001"))
+    
+    def test_migrates_existing_json_once(self):
+        """Test 12: Existing JSON data is copied into SQLite on first open."""
+        PackageDatabase(self.tmp.name).add_package(
+            Package("PKG0001", "Sender", "Recipient", "Address", "09121231212", 1.0, "Food"))
+        RouteDatabase(self.tmp.name).add_route(Route("RT0001", "North", "Driver", "09111222333", "2025-12-15"))
+        
+        package_db = PackageDatabase(self.tmp.name, storage="sqlite")
+        package_db.delete_package("PKG0001")
+        
+        self.assertIsNone(PackageDatabase(self.tmp.name, storage="sqlite").get_package_by_id("PKG0001"))
+        self.assertEqual(RouteDatabase(self.tmp.name, storage="sqlite").get_route_by_id("RT0001").route_name, "North")
+
+
+class TestBulkOperations(unittest.TestCase):
+    """Test cases for the batch add/update methods on every storage engine."""
+    
+    def test_bulk_methods(self):
+        """Test 13: Batch methods skip duplicates and unknown IDs."""
+        for storage in ("json", "journal", "sqlite"):
+            with self.subTest(storage=storage), tempfile.TemporaryDirectory() as tmp:
+                package_db = PackageDatabase(tmp, storage=storage)
+                route_db = RouteDatabase(tmp, storage=storage)
+                packages = [Package(f"PKG{i:04d}", "Sender", "Recipient", "Address", "09121231212", 1.0, "Food")
+                            for i in range(3)]
+                
+                self.assertEqual(package_db.add_packages(packages), 3)
+                self.assertEqual(package_db.add_packages(packages[:1]), 0)
+                
+                for pkg in packages:
+                    pkg.update_status("Out for Delivery")
+                ghost = Package("PKG9999", "Sender", "Recipient", "Address", "09121231212", 1.0, "Food")
+                self.assertEqual(package_db.update_packages(packages[1:] + [ghost]), 2)
+                
+                found = package_db.get_packages_by_ids(["PKG0002", "PKG9999", "PKG0000"])
+                self.assertEqual([(p.package_id, p.status) for p in found],
+                                 [("PKG0002", "Out for Delivery"), ("PKG0000", "Pending")])
+                
+                route = Route("RT0001", "North", "Driver", "09111222333", "2025-12-15")
+                route_db.add_route(route)
+                route.route_name = "North Loop"
+                self.assertEqual(route_db.update_routes([route]), 1)
+                self.assertEqual(route_db.get_route_by_id("RT0001").route_name, "North Loop")
+    
+    def test_assignment_keeps_concurrent_edits(self):
+        """Test 13b: Assigning changes only route fields and skips taken packages."""
+        for storage, indexed in (("json", False), ("json", True), ("journal", False), ("sqlite", False)):
+            with self.subTest(storage=storage, indexed=indexed), tempfile.TemporaryDirectory() as tmp:
+                package_db = PackageDatabase(tmp, storage=storage, indexed=indexed)
+                route_db = RouteDatabase(tmp, storage=storage, indexed=indexed)
+                package_db.add_packages([Package(f"PKG{i:04d}", "Sender", "Recipient", "Address",
+                                                 "09121231212", 1.0, "Food") for i in range(2)])
+                route_db.add_route(Route("RT0001", "North", "Driver", "09111222333", "2025-12-15"))
+                
+                # Someone else edits and assigns after the packages were listed
+                edited = package_db.get_package_by_id("PKG0000")
+                edited.update_status("Out for Delivery")
+                taken = package_db.get_package_by_id("PKG0001")
+                taken.route_id = "RT0002"
+                package_db.update_packages([edited, taken])
+                route = route_db.get_route_by_id("RT0001")
+                route.route_name = "North Loop"
+                route_db.update_route(route)
+                
+                assigned = package_db.assign_packages({"RT0001": ["PKG0000", "PKG0001", "PKG9999"]})
+                self.assertEqual(assigned, {"RT0001": ["PKG0000"]})
+                self.assertEqual(route_db.add_packages_to_routes({"RT0001": assigned["RT0001"], "RT9999": ["X"]}), 1)
+                
+                pkg = package_db.get_package_by_id("PKG0000")
+                self.assertEqual((pkg.route_id, pkg.status), ("RT0001", "Out for Delivery"))
+                self.assertEqual(package_db.get_package_by_id("PKG0001").route_id, "RT0002")
+                route = route_db.get_route_by_id("RT0001")
+                self.assertEqual((route.route_name, route.package_ids), ("North Loop", ["PKG0000"]))
+
+
+class TestReadCache(unittest.TestCase):
+    """Test cases for the stat-validated read cache."""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_repeat_reads_skip_parsing(self):
+        """Test 14: Unchanged files are parsed once."""
+        db = PackageDatabase(self.tmp.name)
+        db.add_package(Package("PKG0001", "Sender", "Recipient", "Address", "09121231212", 1.0, "Food"))
+        
+        with mock.patch("database_packages.json.load") as load:
+            db.get_all_packages()[0].route_id = "RT0001"
+            db.get_package_by_id("PKG0001")
+            db.get_packages_by_status("Pending")
+        load.assert_not_called()
+        
+        # Objects handed out are not shared with later reads
+        self.assertEqual([pkg.package_id for pkg in db.get_unassigned_packages()], ["PKG0001"])
+    
+    def test_changes_from_other_writers_are_seen(self):
+        """Test 15: Cached and indexed readers pick up another writer's changes."""
+        plain = RouteDatabase(self.tmp.name)
+        indexed = RouteDatabase(self.tmp.name, indexed=True)
+        self.assertEqual(plain.get_all_routes(), [])
+        self.assertIsNone(indexed.get_route_by_id("RT0001"))
+        
+        RouteDatabase(self.tmp.name).add_route(Route("RT0001", "North", "Driver", "09111222333", "2025-12-15"))
+        
+        self.assertEqual([r.route_id for r in plain.get_all_routes()], ["RT0001"])
+        self.assertEqual(indexed.get_route_by_id("RT0001").route_name, "North")
+
+
+def _hammer_packages(data_dir, storage, worker, count):
+    """Stress test worker: add packages, then mark each one delivered."""
+    db = PackageDatabase(data_dir, storage=storage, locking=True, compact_threshold=4096)
+    for i in range(count):
+        db.add_package(Package(f"PKG{worker}-{i:03d}", "Sender", "Recipient", "Address",
+                               "09121231212", 1.0, "Food"))
+    for i in range(count):
+        package = db.get_package_by_id(f"PKG{worker}-{i:03d}")
+        package.update_status("Delivered")
+        db.update_package(package)
+    if db._journal:
+        db._journal.wait()
+
+
+class TestMultiProcessStorage(unittest.TestCase):
+    """Stress test for several processes writing to one data directory."""
+    
+    WORKERS = 4
+    PACKAGES_PER_WORKER = 30
+    
+    def test_no_lost_writes(self):
+        """Test 16: Concurrent writers with locking=True lose no records."""
+        for storage in ("json", "journal"):
+            with self.subTest(storage=storage), tempfile.TemporaryDirectory() as tmp:
+                processes = [multiprocessing.Process(target=_hammer_packages,
+                                                     args=(tmp, storage, w, self.PACKAGES_PER_WORKER))
+                             for w in range(self.WORKERS)]
+                for process in processes:
+                    process.start()
+                for process in processes:
+                    process.join()
+                    self.assertEqual(process.exitcode, 0)
+                
+                packages = PackageDatabase(tmp, storage=storage, locking=True).get_all_packages()
+                self.assertEqual(len(packages), self.WORKERS * self.PACKAGES_PER_WORKER)
+                self.assertTrue(all(p.status == "Delivered" for p in packages))
+    
+    @unittest.skipUnless(hasattr(os, "fchmod"), "file modes are POSIX only")
+    def test_writes_keep_file_mode(self):
+        """Test 16b: Atomic rewrites keep the data file readable by other users."""
+        with tempfile.TemporaryDirectory() as tmp:
+            db = PackageDatabase(tmp)
+            self.assertEqual(os.stat(db.packages_file).st_mode & 0o777, 0o666 & ~storage._UMASK)
+            os.chmod(db.packages_file, 0o644)
+            db.add_package(Package("PKG0001", "Sender", "Recipient", "Address", "09121231212", 1.0, "Food"))
+            self.assertEqual(os.stat(db.packages_file).st_mode & 0o777, 0o644)
+
+
+class TestSequenceAllocator(unittest.TestCase):
+    """Test cases for the persistent ID sequences."""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_seeded_from_existing_ids(self):
+        """Test 17: A new sequence continues after the highest existing ID."""
+        db = PackageDatabase(self.tmp.name)
+        db.add_package(Package("PKG0041", "Sender", "Recipient", "Address", "09121231212", 1.0, "Food"))
+        
+        self.assertEqual(db.next_package_id(), "PKG0042")
+        self.assertEqual(PackageDatabase(self.tmp.name).next_package_id(), "PKG0043")
+    
+    def test_blocks_never_overlap(self):
+        """Test 18: Allocators sharing a counter file hand out disjoint IDs."""
+        first = SequenceAllocator(self.tmp.name, "RT", block_size=10)
+        second = SequenceAllocator(self.tmp.name, "RT", block_size=10)
+        
+        ids = [first.next_id(), second.next_id(), first.next_id(), second.next_id()]
+        self.assertEqual(ids, ["RT0001", "RT0011", "RT0002", "RT0012"])
+
+
+class TestBenchmarkDataset(unittest.TestCase):
+    """Test cases for the synthetic benchmark dataset."""
+    
+    def test_dataset_is_consistent(self):
+        """Test 19: Generated packages and routes reference each other."""
+        packages, routes = benchmark.generate_dataset(500, packages_per_route=20, days=5)
+        self.assertEqual(len(packages), 500)
+        by_id = {r['route_id']: r for r in routes}
+        for pkg in packages:
+            if pkg['status'] != "Pending":
+                self.assertIn(pkg['package_id'], by_id[pkg['route_id']]['package_ids'])
+            if pkg['status'] == "Delivered":
+                self.assertIsNotNone(pkg['delivered_at'])
+        self.assertEqual(sum(len(r['package_ids']) for r in routes),
+                         sum(1 for p in packages if p['route_id']))
+
+
+class TestRoutePackageJoin(unittest.TestCase):
+    """Test cases for joining routes with their packages."""
+    
+    def test_join_and_driver_performance(self):
+        """Test 20: Routes are joined with one package read per batch."""
+        with tempfile.TemporaryDirectory() as tmp:
+            package_db = PackageDatabase(tmp)
+            packages = [Package(f"PKG{i:04d}", "S", "R", "Addr", "0912", 1.0, "Other") for i in range(1, 4)]
+            packages[0].status = "Delivered"
+            package_db.add_packages(packages)
+            routes = [Route("RT0001", "A", "Ana", "0911", "2025-11-01"),
+                      Route("RT0002", "B", "Ben", "0911", "2025-11-01")]
+            routes[0].package_ids = ["PKG0001", "PKG0002", "PKG9999"]
+            routes[1].package_ids = ["PKG0003"]
+            route_db = RouteDatabase(tmp)
+            for route in routes:
+                route_db.add_route(route)
+            
+            with mock.patch.object(package_db, "get_package_by_id") as single_lookup:
+                joined = list(join_routes_packages(routes, package_db))
+                stats = reports.compute_driver_performance(route_db, package_db)
+            single_lookup.assert_not_called()
+            self.assertEqual([p.package_id for p in joined[0][1]], ["PKG0001", "PKG0002"])
+            self.assertEqual(stats, {"Ana": {"assigned": 2, "delivered": 1},
+                                     "Ben": {"assigned": 1, "delivered": 0}})
+
+
+class TestSummaryCounters(unittest.TestCase):
+    """Test cases for the maintained summary record."""
+    
+    def test_counters_follow_mutations(self):
+        """Test 21: Counters match a full recount after every kind of write."""
+        for storage in ("json", "journal", "sqlite"):
+            with self.subTest(storage=storage), tempfile.TemporaryDirectory() as tmp:
+                package_db = PackageDatabase(tmp, storage=storage)
+                route_db = RouteDatabase(tmp, storage=storage)
+                counters = SummaryCounters(tmp)
+                counters.attach(package_db, route_db)
+                counters.rebuild(package_db, route_db)
+                
+                packages = [Package(f"PKG{i:04d}", "S", "R", "Addr", "0912", 1.0, "Other") for i in range(1, 5)]
+                package_db.add_packages(packages)
+                package_db.add_package(packages[0])
+                packages[1].update_status("Delivered")
+                packages[2].route_id = "RT0001"
+                package_db.update_packages(packages[1:3])
+                package_db.delete_package("PKG0004")
+                route = Route("RT0001", "A", "Ana", "0911", "2025-11-01")
+                route.package_ids = ["PKG0003"]
+                route_db.add_route(route)
+                route.package_ids.append("PKG0001")
+                route_db.update_route(route)
+                
+                self.assertEqual(counters.read(), build_summary(package_db, route_db))
+                self.assertEqual(counters.read()["packages_by_status"], {"Pending": 2, "Delivered": 1})
+                self.assertEqual(counters.read()["assigned_packages"], 2)
+                if storage == "sqlite":
+                    package_db.close()
+                    route_db.close()
+
+
+class TestStreamingExport(unittest.TestCase):
+    """Test cases for streaming CSV export."""
+    
+    def test_iter_packages_by_status(self):
+        """Test 22: iter_packages and package_rows filter on every storage engine."""
+        for storage in ("json", "journal", "sqlite"):
+            with self.subTest(storage=storage), tempfile.TemporaryDirectory() as tmp:
+                db = PackageDatabase(tmp, storage=storage)
+                packages = [Package(f"PKG{i:04d}", "S", "R", "Addr", "0912", 1.0, "Other") for i in range(1, 4)]
+                packages[1].status = "Delivered"
+                db.add_packages(packages)
+                self.assertEqual([p.package_id for p in db.iter_packages("Delivered")], ["PKG0002"])
+                self.assertEqual(len(list(db.iter_packages())), 3)
+                self.assertEqual(db.count_packages(), 3)
+                rows = db.package_rows(("Pending",))
+                self.assertEqual([row[0] for row in rows], ["PKG0001", "PKG0003"])
+                self.assertEqual(Package.from_dict(dict(zip(PACKAGE_COLUMNS, rows[1]))).to_dict(),
+                                 packages[2].to_dict())
+                self.assertEqual(db.package_rows(fields=("status", "package_id")),
+                                 [("Pending", "PKG0001"), ("Delivered", "PKG0002"), ("Pending", "PKG0003")])
+                if storage == "sqlite":
+                    db.close()
+    
+    def test_export_generator_gzip(self):
+        """Test 23: A generator is exported in chunks to a gzip file."""
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(reports, "EXPORT_CHUNK_SIZE", 7), \
+                mock.patch("builtins.print"):
+            rows = ({"ID": f"PKG{i:04d}", "Recipient": "R"} for i in range(50))
+            written = reports.export_to_csv(rows, os.path.join(tmp, "out.csv"), ["ID", "Recipient"], compress=True)
+            with gzip.open(os.path.join(tmp, "out.csv.gz"), 'rt') as f:
+                lines = f.read().splitlines()
+        self.assertEqual(written, 50)
+        self.assertEqual(lines[0], "ID,Recipient")
+        self.assertEqual(lines[-1], "PKG0049,R")
+
+
+class TestDeliveryDayIndex(unittest.TestCase):
+    """Test cases for delivered-per-day range lookups."""
+    
+    def test_delivered_between(self):
+        """Test 24: Deliveries are grouped by day and follow status updates."""
+        for storage, indexed in (("json", False), ("json", True), ("sqlite", False)):
+            with self.subTest(storage=storage, indexed=indexed), tempfile.TemporaryDirectory() as tmp:
+                db = PackageDatabase(tmp, indexed=indexed, storage=storage)
+                packages = [Package(f"PKG{i:04d}", "S", "R", "Addr", "0912", 1.0, "Other") for i in range(1, 5)]
+                for pkg, day in zip(packages, ("2025-11-01", "2025-11-03", "2025-11-03", "2025-12-01")):
+                    pkg.status = "Delivered"
+                    pkg.delivered_at = f"{day}T10:00:00"
+                db.add_packages(packages)
+                
+                by_day = db.get_packages_delivered_between("2025-11-01", "2025-11-30")
+                self.assertEqual({day: [p.package_id for p in pkgs] for day, pkgs in by_day.items()},
+                                 {"2025-11-01": ["PKG0001"], "2025-11-03": ["PKG0002", "PKG0003"]})
+                
+                packages[1].update_status("Out for Delivery")
+                db.update_package(packages[1])
+                by_day = db.get_packages_delivered_between("2025-11-03", "2025-11-03")
+                self.assertEqual([p.package_id for p in by_day["2025-11-03"]], ["PKG0003"])
+                if storage == "sqlite":
+                    db.close()
+
+
+class TestParallelReports(unittest.TestCase):
+    """Test cases for reports computed in a process pool."""
+    
+    def test_parallel_matches_serial(self):
+        """Test 25: Aggregates over chunks in worker processes equal the serial reports."""
+        with tempfile.TemporaryDirectory() as tmp:
+            benchmark.write_dataset(tmp, *benchmark.generate_dataset(600, packages_per_route=20, days=5))
+            package_db = PackageDatabase(tmp)
+            route_db = RouteDatabase(tmp)
+            routes = route_db.get_all_routes()
+            cases = [
+                (DriverPerformance(routes), reports.compute_driver_performance(route_db, package_db)),
+                (ProblematicAddresses(), reports.compute_problematic_addresses(package_db)),
+                (SummaryStatistics(routes), reports.compute_summary_statistics(package_db, route_db)),
+            ]
+            for aggregate, serial in cases:
+                with self.subTest(report=type(aggregate).__name__):
+                    parallel = run_parallel(aggregate, package_db, workers=3)
+                    self.assertEqual(parallel, serial)
+                    self.assertEqual(list(parallel), list(serial))
+            # Aggregates without a field list get fully built packages
+            delayed = run_parallel(DelayedDeliveries(), package_db, workers=2)
+            self.assertEqual([pkg.to_dict() for pkg in delayed],
+                             [pkg.to_dict() for pkg in run_serial(DelayedDeliveries(), package_db.iter_packages())])
+            with mock.patch.object(reports, "PARALLEL_MIN_PACKAGES", 100):
+                self.assertEqual(reports.compute_problematic_addresses(package_db, workers=2),
+                                 reports.compute_problematic_addresses(package_db))
+
+
+class TestReportCache(unittest.TestCase):
+    """Test cases for data versions and the report result cache."""
+    
+    def test_writes_bump_data_version(self):
+        """Test 26: Own and other instances' writes bump data_version."""
+        for storage in ("json", "journal", "sqlite"):
+            with self.subTest(storage=storage), tempfile.TemporaryDirectory() as tmp:
+                db = PackageDatabase(tmp, storage=storage)
+                other = PackageDatabase(tmp, storage=storage)
+                version = db.data_version
+                self.assertEqual(db.data_version, version)
+                db.add_package(Package("PKG0001", "S", "R", "Addr", "0912", 1.0, "Other"))
+                self.assertGreater(db.data_version, version)
+                version = db.data_version
+                other.add_package(Package("PKG0002", "S", "R", "Addr", "0912", 1.0, "Other"))
+                self.assertGreater(db.data_version, version)
+                if storage == "sqlite":
+                    db.close()
+                    other.close()
+    
+    def test_cache_invalidated_by_write(self):
+        """Test 27: Repeat views hit the cache until the data changes."""
+        with tempfile.TemporaryDirectory() as tmp:
+            db = PackageDatabase(tmp)
+            cache = ReportCache(maxsize=2)
+            compute = mock.Mock(side_effect=lambda: reports.compute_delayed_deliveries(db))
+            cache.get("delayed", (), (db,), compute)
+            cache.get("delayed", (), (db,), compute)
+            self.assertEqual(compute.call_count, 1)
+            db.add_package(Package("PKG0001", "S", "R", "Addr", "0912", 1.0, "Other"))
+            self.assertEqual(len(cache.get("delayed", (), (db,), compute)), 1)
+            self.assertEqual(compute.call_count, 2)
+            
+            # A database that reuses another's id and version is not served its result
+            class Versioned:
+                data_version = 1
+            first, second = Versioned(), Versioned()
+            with mock.patch("report_cache.id", create=True, return_value=1):
+                cache.get("count", (), (first,), lambda: 1)
+                self.assertEqual(cache.get("count", (), (second,), lambda: 2), 2)
+                self.assertEqual(cache.get("count", (), (second,), lambda: 3), 2)
+            cache.get("other", (1,), (db,), compute)
+            cache.get("other", (2,), (db,), compute)
+            cache.get("delayed", (), (db,), compute)
+            self.assertEqual(compute.call_count, 5)
+
+
+class TestAllReports(unittest.TestCase):
+    """Test cases for the one-scan all-reports engine."""
+    
+    def test_all_reports_match_individual_reports(self):
+        """Test 28: One pass gives the same results as each report alone."""
+        with tempfile.TemporaryDirectory() as tmp:
+            benchmark.write_dataset(tmp, *benchmark.generate_dataset(400, packages_per_route=20, days=5))
+            package_db = PackageDatabase(tmp)
+            route_db = RouteDatabase(tmp)
+            with mock.patch.object(package_db, "get_all_packages", wraps=package_db.get_all_packages) as scans, \
+                    mock.patch.object(package_db, "get_packages_by_ids", wraps=package_db.get_packages_by_ids) as reads:
+                results = reports.compute_all_reports(package_db, route_db, "2025-11-02", "2025-11-03")
+            self.assertEqual(scans.call_count, 0)
+            self.assertEqual(reads.call_count, 0)
+            
+            def ids(packages):
+                return [p.package_id for p in packages]
+            delivered = package_db.get_packages_delivered_between("2025-11-02", "2025-11-03")
+            self.assertEqual({d: ids(p) for d, p in results["delivered_per_day"].items()},
+                             {d: ids(p) for d, p in delivered.items()})
+            self.assertEqual(results["driver_performance"], reports.compute_driver_performance(route_db, package_db))
+            self.assertEqual(ids(results["delayed_deliveries"]), ids(reports.compute_delayed_deliveries(package_db)))
+            self.assertEqual(results["problematic_addresses"], reports.compute_problematic_addresses(package_db))
+            self.assertEqual(results["summary_statistics"], reports.compute_summary_statistics(package_db, route_db))
+            self.assertEqual([(route.route_id, liters, km) for route, liters, km in results["fuel_usage"]],
+                             [(route.route_id, liters, km) for route, liters, km
+                              in reports.compute_fuel_usage(route_db.get_all_routes(), package_db)])
+            
+            with mock.patch("builtins.print"):
+                paths = reports.export_all_reports(results, os.path.join(tmp, "out"))
+            self.assertEqual(len(paths), 6)
+            self.assertTrue(all(os.path.exists(path) for path in paths))
+
+
+class TestReportCLI(unittest.TestCase):
+    """Test cases for the non-interactive report command line."""
+    
+    def test_cli_writes_json_and_csv(self):
+        """Test 29: python -m reports runs without prompting."""
+        with tempfile.TemporaryDirectory() as tmp:
+            benchmark.write_dataset(tmp, *benchmark.generate_dataset(300, packages_per_route=20, days=3))
+            json_out = os.path.join(tmp, "perf.json")
+            csv_out = os.path.join(tmp, "addresses.csv")
+            with mock.patch("builtins.input", side_effect=AssertionError("prompted")):
+                reports.main(["--report", "driver_performance", "--format", "json",
+                              "--out", json_out, "--data-dir", tmp])
+                reports.main(["--report", "problematic_addresses", "--format", "csv",
+                              "--out", csv_out, "--data-dir", tmp, "--no-lock"])
+            
+            with open(json_out) as f:
+                document = json.load(f)
+            expected = reports.compute_driver_performance(RouteDatabase(tmp), PackageDatabase(tmp))
+            self.assertEqual(document["result"], expected)
+            with open(csv_out) as f:
+                self.assertEqual(f.readline().strip(), "Address,Issues")
+
+
+class TestDeliveryAging(unittest.TestCase):
+    """Test cases for the SLA aging view of delayed deliveries."""
+    
+    def test_top_k_and_buckets(self):
+        """Test 30: Only the K oldest are kept and ages fall in SLA buckets."""
+        with tempfile.TemporaryDirectory() as tmp:
+            db = PackageDatabase(tmp)
+            now = datetime(2025, 11, 10, 12, 0, 0)
+            packages = []
+            for i, hours in enumerate((5, 30, 50, 80, 100, 2, 47), start=1):
+                pkg = Package(f"PKG{i:04d}", "S", "R", "Addr", "0912", 1.0, "Other")
+                pkg.created_at = (now - timedelta(hours=hours)).isoformat()
+                packages.append(pkg)
+            packages[5].status = "Delivered"
+            packages[6].status = "Out for Delivery"
+            db.add_packages(packages)
+            
+            aging = reports.compute_delivery_aging(db, top_k=3, bucket_hours=(24, 48, 72), now=now)
+            self.assertEqual(aging["total"], 6)
+            self.assertEqual(aging["buckets"], {"< 24h": 1, "24-48h": 2, "48-72h": 1, ">= 72h": 2})
+            self.assertEqual([(p.package_id, round(age)) for p, age in aging["oldest"]],
+                             [("PKG0005", 100), ("PKG0004", 80), ("PKG0003", 50)])
+            
+            parallel = run_parallel(DeliveryAging(3, (24, 48, 72), now), db, workers=2, status=DeliveryAging.STATUSES)
+            self.assertEqual(parallel["buckets"], aging["buckets"])
+            self.assertEqual([p.package_id for p, _age in parallel["oldest"]],
+                             [p.package_id for p, _age in aging["oldest"]])
+            
+            # The screen is cached and the export lists the same oldest packages with ages
+            with mock.patch.object(reports, "compute_delivery_aging", wraps=reports.compute_delivery_aging) as compute, \
+                    mock.patch("utils.confirm_action", return_value=True), mock.patch("utils.pause"), \
+                    mock.patch("builtins.print"), mock.patch.object(reports, "export_to_csv") as export, \
+                    mock.patch("reports.datetime") as clock:
+                clock.now.return_value = now
+                reports.report_delayed_deliveries(db)
+                reports.report_delayed_deliveries(db)
+            self.assertEqual(compute.call_count, 1)
+            rows, headers = list(export.call_args[0][0]), export.call_args[0][2]
+            self.assertEqual(headers, ["ID", "Recipient", "Status", "Created", "AgeHours"])
+            self.assertEqual([row["ID"] for row in rows],
+                             ["PKG0005", "PKG0004", "PKG0003", "PKG0007", "PKG0002", "PKG0001"])
+
+
+class TestAddressClustering(unittest.TestCase):
+    """Test cases for address normalization and fuzzy clustering."""
+    
+    def test_problematic_addresses_cluster_variants(self):
+        """Test 31: Spelling variants of an address are counted together."""
+        self.assertEqual(normalize_address(" 12 Main Street. "), "12 main st")
+        with tempfile.TemporaryDirectory() as tmp:
+            db = PackageDatabase(tmp)
+            addresses = ["12 Main St.", "12 main street", "12 Maain Street", "13 Main St",
+                         "12 Main Ave", "Brgy. Poblacion", "Barangay Poblacion", "7 Rizal Rd"]
+            db.add_packages([Package(f"PKG{i:04d}", "S", "R", addr, "0912", 1.0, "Other")
+                             for i, addr in enumerate(addresses, start=1)])
+            
+            problematic = reports.compute_problematic_addresses(db)
+            self.assertEqual(problematic, {"12 Main St.": 3, "Barangay Poblacion": 2})
+            self.assertEqual(reports.compute_problematic_addresses(db, workers=2), problematic)
+
+
+class TestFuelModel(unittest.TestCase):
+    """Test cases for distance-based fuel estimates."""
+    
+    def test_fuel_from_route_distance(self):
+        """Test 32: Fuel follows the route distance and matrices are cached."""
+        for storage in ("json", "sqlite"):
+            with self.subTest(storage=storage), tempfile.TemporaryDirectory() as tmp:
+                package_db = PackageDatabase(tmp, storage=storage)
+                route_db = RouteDatabase(tmp, storage=storage)
+                depot = routing.DEPOT_LOCATION
+                package_db.add_packages([
+                    Package("PKG0001", "S", "R", "A", "0912", 1.0, "Other",
+                            latitude=depot[0] + 0.1, longitude=depot[1]),
+                    Package("PKG0002", "S", "R", "B", "0912", 1.0, "Other",
+                            latitude=depot[0] + 0.1, longitude=depot[1] + 0.1),
+                    Package("PKG0003", "S", "R", "C", "0912", 1.0, "Other"),
+                ])
+                self.assertEqual(package_db.get_package_by_id("PKG0002").longitude, depot[1] + 0.1)
+                route = Route("RT0001", "North", "Driver", "0911", "2025-11-01")
+                route.package_ids = ["PKG0001", "PKG0002"]
+                route_db.add_route(route)
+                
+                routing.ROUTE_MATRICES.clear()
+                [(_route, liters, distance)] = reports.compute_fuel_usage(route_db.get_all_routes(), package_db)
+                a, b = package_db.get_packages_by_ids(["PKG0001", "PKG0002"])
+                expected = (routing.haversine_km(depot, (a.latitude, a.longitude))
+                            + routing.haversine_km((a.latitude, a.longitude), (b.latitude, b.longitude))
+                            + routing.haversine_km((b.latitude, b.longitude), depot))
+                self.assertAlmostEqual(distance, expected)
+                van = routing.VEHICLE_PROFILES["van"]
+                self.assertAlmostEqual(liters, distance * van["liters_per_km"] + 2 * van["liters_per_stop"])
+                
+                misses = routing.ROUTE_MATRICES.misses
+                reports.compute_fuel_usage(route_db.get_all_routes(), package_db)
+                self.assertEqual(routing.ROUTE_MATRICES.misses, misses)
+                route.package_ids.append("PKG0003")
+                route_db.update_route(route)
+                [(_route, liters, new_distance)] = reports.compute_fuel_usage(route_db.get_all_routes(), package_db)
+                self.assertEqual(routing.ROUTE_MATRICES.misses, misses + 1)
+                self.assertAlmostEqual(new_distance, distance)
+                self.assertAlmostEqual(liters, distance * van["liters_per_km"] + 2 * van["liters_per_stop"]
+                                       + routing.UNLOCATED_STOP_LITERS)
+                
+                # Viewing the report saves nothing unless asked to
+                version = route_db.data_version
+                with mock.patch("utils.confirm_action", return_value=False), mock.patch("utils.pause"), \
+                        mock.patch("builtins.print"):
+                    reports.report_fuel_usage_estimates(route_db, package_db)
+                self.assertEqual(route_db.data_version, version)
+                with mock.patch("utils.confirm_action", return_value=True), mock.patch("utils.pause"), \
+                        mock.patch("builtins.print"), mock.patch("reports.export_to_csv"):
+                    reports.report_fuel_usage_estimates(route_db, package_db)
+                self.assertEqual(route_db.get_route_by_id("RT0001").estimated_fuel, round(liters, 2))
+                if storage == "sqlite":
+                    package_db.close()
+                    route_db.close()
+
+
+class TestRouteOptimizer(unittest.TestCase):
+    """Test cases for the stop-order optimizer."""
+    
+    def test_optimize_route_shortens_tour(self):
+        """Test 33: Stops are reordered into the shortest tour found."""
+        depot = routing.DEPOT_LOCATION
+        # Stops on a line north of the depot, listed out of order
+        offsets = [0.05, 0.01, 0.04, 0.02, 0.03]
+        packages = [Package(f"PKG{i:04d}", "S", "R", "A", "0912", 1.0, "Other",
+                            latitude=depot[0] + offset, longitude=depot[1])
+                    for i, offset in enumerate(offsets, start=1)]
+        packages.append(Package("PKG0006", "S", "R", "B", "0912", 1.0, "Other"))
+        route = Route("RT0001", "North", "Driver", "0911", "2025-11-01")
+        route.package_ids = ["PKG0006"] + [pkg.package_id for pkg in packages[:5]]
+        
+        result = routing.optimize_route(route, packages, cache=routing.DistanceMatrixCache())
+        self.assertEqual(result["package_ids"], ["PKG0002", "PKG0004", "PKG0005", "PKG0003", "PKG0001", "PKG0006"])
+        self.assertAlmostEqual(result["distance_after"],
+                               2 * routing.haversine_km(depot, (depot[0] + 0.05, depot[1])), places=6)
+        self.assertAlmostEqual(result["distance_saved"], result["distance_before"] - result["distance_after"])
+        self.assertGreater(result["distance_saved"], 0)
+        self.assertEqual(result["unlocated_stops"], 1)
+        
+        route.package_ids = result["package_ids"]
+        again = routing.optimize_route(route, packages, cache=routing.DistanceMatrixCache())
+        self.assertEqual(again["package_ids"], route.package_ids)
+        self.assertEqual(again["distance_saved"], 0)
+        self.assertAlmostEqual(again["estimated_fuel"], result["estimated_fuel"])
+    
+    def test_reorder_keeps_stops_added_meanwhile(self):
+        """Test 33b: Saving a stop order keeps stops added after it was computed."""
+        for storage in ("json", "journal", "sqlite"):
+            with self.subTest(storage=storage), tempfile.TemporaryDirectory() as tmp:
+                route_db = RouteDatabase(tmp, storage=storage)
+                route = Route("RT0001", "North", "Driver", "0911", "2025-11-01")
+                route.package_ids = ["PKG0001", "PKG0002", "PKG0003"]
+                route_db.add_route(route)
+                
+                # Another session adds a stop while the new order is shown
+                route_db.add_packages_to_routes({"RT0001": ["PKG0004"]})
+                self.assertTrue(route_db.reorder_route("RT0001", ["PKG0003", "PKG0001", "PKG0002"], 4.2))
+                saved = route_db.get_route_by_id("RT0001")
+                self.assertEqual(saved.package_ids, ["PKG0003", "PKG0001", "PKG0002", "PKG0004"])
+                self.assertEqual(saved.estimated_fuel, 0.0)
+                
+                self.assertTrue(route_db.reorder_route("RT0001", ["PKG0004", "PKG0003", "PKG0002", "PKG0001"], 5.0))
+                saved = route_db.get_route_by_id("RT0001")
+                self.assertEqual((saved.package_ids, saved.estimated_fuel),
+                                 (["PKG0004", "PKG0003", "PKG0002", "PKG0001"], 5.0))
+                self.assertFalse(route_db.reorder_route("RT0009", ["PKG0001"], 1.0))
+                if storage == "sqlite":
+                    route_db.close()
+
+
+class TestAutoAssignment(unittest.TestCase):
+    """Test cases for capacity-aware package assignment."""
+    
+    def test_assign_respects_capacity(self):
+        """Test 34: Packages are spread over routes without exceeding capacity."""
+        with tempfile.TemporaryDirectory() as tmp:
+            package_db = PackageDatabase(tmp)
+            route_db = RouteDatabase(tmp)
+            weights = [30.0, 25.0, 20.0, 10.0, 10.0, 5.0, 60.0]
+            package_db.add_packages([Package(f"PKG{i:04d}", "S", "R", "A", "0912", weight, "Other")
+                                     for i, weight in enumerate(weights, start=1)])
+            for route_id, date in (("RT0001", "2025-11-01"), ("RT0002", "2025-11-01"), ("RT0003", "2025-11-02")):
+                route_db.add_route(Route(route_id, route_id, "Driver", "0911", date))
+            
+            with mock.patch.object(package_db, "update_packages", wraps=package_db.update_packages) as update:
+                result = assignment.auto_assign(package_db, route_db, "2025-11-01",
+                                                capacities={"RT0001": 55.0, "RT0002": 50.0})
+            update.assert_called_once()
+            
+            self.assertEqual(result["unassigned"], ["PKG0007"])
+            self.assertEqual(set(result["assigned"]), {"RT0001", "RT0002"})
+            for route in route_db.get_routes_by_date("2025-11-01"):
+                load = sum(pkg.weight for pkg in package_db.get_packages_by_ids(route.package_ids))
+                self.assertLessEqual(load, result["capacities"][route.route_id])
+                self.assertAlmostEqual(load, result["loads"][route.route_id])
+                for pkg in package_db.get_packages_by_ids(route.package_ids):
+                    self.assertEqual(pkg.route_id, route.route_id)
+            self.assertEqual(route_db.get_route_by_id("RT0003").package_ids, [])
+            self.assertEqual([pkg.package_id for pkg in package_db.get_unassigned_packages()], ["PKG0007"])
+    
+    def test_preview_then_commit(self):
+        """Test 34b: A previewed plan changes nothing until it is committed."""
+        with tempfile.TemporaryDirectory() as tmp:
+            package_db = PackageDatabase(tmp)
+            route_db = RouteDatabase(tmp)
+            package_db.add_packages([Package(f"PKG{i:04d}", "S", "R", "A", "0912", 10.0, "Other")
+                                     for i in range(1, 5)])
+            route_db.add_route(Route("RT0001", "North", "Driver", "0911", "2025-11-01"))
+            route_db.add_route(Route("RT0002", "South", "Driver", "0911", "2025-11-01"))
+            
+            plan = assignment.auto_assign(package_db, route_db, "2025-11-01", commit=False)
+            self.assertEqual(sum(len(ids) for ids in plan["assigned"].values()), 4)
+            self.assertEqual(len(package_db.get_unassigned_packages()), 4)
+            self.assertEqual([r.package_ids for r in route_db.get_routes_by_date("2025-11-01")], [[], []])
+            
+            # A package taken by someone else after the preview is skipped
+            taken = package_db.get_package_by_id(plan["assigned"]["RT0002"][0])
+            taken.route_id = "RT0009"
+            package_db.update_package(taken)
+            
+            saved = assignment.commit_assignment(package_db, route_db, plan["assigned"])
+            self.assertEqual(saved["RT0001"], plan["assigned"]["RT0001"])
+            self.assertEqual(saved["RT0002"], plan["assigned"]["RT0002"][1:])
+            self.assertEqual(package_db.get_unassigned_packages(), [])
+            for route in route_db.get_routes_by_date("2025-11-01"):
+                self.assertEqual(route.package_ids, saved[route.route_id])
+                self.assertEqual([pkg.route_id for pkg in package_db.get_packages_by_ids(route.package_ids)],
+                                 [route.route_id] * len(route.package_ids))
+
+
+class TestRouteProposals(unittest.TestCase):
+    """Test cases for drafting routes from package locations."""
+    
+    def test_propose_balanced_sectors(self):
+        """Test 35: Drafted routes are compact sectors balanced by stops."""
+        depot = routing.DEPOT_LOCATION
+        packages = []
+        # Four groups of stops to the north, east, south and west of the depot
+        for n, (dlat, dlon) in enumerate([(0.1, 0), (0, 0.1), (-0.1, 0), (0, -0.1)]):
+            for i in range(5):
+                packages.append(Package(f"PKG{n}{i}", "S", "R", "A", "0912", 2.0, "Other",
+                                        latitude=depot[0] + dlat + i * 0.001, longitude=depot[1] + dlon))
+        packages.append(Package("PKG99", "S", "R", "A", "0912", 2.0, "Other"))
+        
+        drafts, unlocated = assignment.propose_routes(packages, "2025-11-01", 4)
+        self.assertEqual([pkg.package_id for pkg in unlocated], ["PKG99"])
+        self.assertEqual(len(drafts), 4)
+        self.assertEqual(sorted(sorted({pkg_id[:4] for pkg_id in route.package_ids}) for route in drafts),
+                         [["PKG0"], ["PKG1"], ["PKG2"], ["PKG3"]])
+        self.assertTrue(all(route.date == "2025-11-01" and len(route.package_ids) == 5 for route in drafts))
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            package_db = PackageDatabase(tmp)
+            route_db = RouteDatabase(tmp)
+            package_db.add_packages(packages)
+            # Another session assigns one drafted package before the drafts are saved
+            taken = drafts[0].package_ids[0]
+            package_db.assign_packages({"RT0050": [taken]})
+            self.assertEqual(assignment.save_proposed_routes(route_db, package_db, drafts), (4, 19))
+            saved = route_db.get_routes_by_date("2025-11-01")
+            self.assertEqual([route.route_id for route in saved], ["RT0001", "RT0002", "RT0003", "RT0004"])
+            self.assertEqual([route.package_ids for route in saved], [route.package_ids for route in drafts])
+            self.assertNotIn(taken, saved[0].package_ids)
+            self.assertEqual(package_db.get_package_by_id(taken).route_id, "RT0050")
+            self.assertEqual([pkg.package_id for pkg in package_db.get_unassigned_packages()], ["PKG99"])
+
+
+class TestSpatialIndex(unittest.TestCase):
+    """Test cases for the grid index over package locations."""
+    
+    def test_queries_follow_package_changes(self):
+        """Test 36: Radius and nearest queries match a scan and track edits."""
+        rng = random.Random(7)
+        depot = routing.DEPOT_LOCATION
+        with tempfile.TemporaryDirectory() as tmp:
+            package_db = PackageDatabase(tmp)
+            index = SpatialIndex(tmp)
+            index.attach(package_db)
+            package_db.add_packages([
+                Package(f"PKG{i:04d}", "S", "R", "A", "0912", 1.0, "Other",
+                        latitude=depot[0] + rng.uniform(-0.05, 0.05), longitude=depot[1] + rng.uniform(-0.05, 0.05))
+                for i in range(1, 301)])
+            package_db.add_package(Package("PKG0301", "S", "R", "A", "0912", 1.0, "Other"))
+            self.assertEqual(len(index), 300)
+            
+            points = {pkg.package_id: (pkg.latitude, pkg.longitude) for pkg in package_db.iter_packages()
+                      if pkg.latitude is not None}
+            for _ in range(20):
+                query = (depot[0] + rng.uniform(-0.06, 0.06), depot[1] + rng.uniform(-0.06, 0.06))
+                scan = sorted((routing.haversine_km(query, point), pkg_id) for pkg_id, point in points.items())
+                self.assertEqual([pkg_id for pkg_id, _km in index.nearest(*query, k=5)],
+                                 [pkg_id for _km, pkg_id in scan[:5]])
+                self.assertEqual([pkg_id for pkg_id, _km in index.within_radius(*query, 1.5)],
+                                 [pkg_id for km, pkg_id in scan if km <= 1.5])
+            
+            moved = package_db.get_package_by_id("PKG0001")
+            moved.latitude, moved.longitude = depot[0] + 1.0, depot[1] + 1.0
+            package_db.update_package(moved)
+            package_db.delete_package("PKG0002")
+            self.assertEqual(index.nearest(depot[0] + 1.0, depot[1] + 1.0)[0][0], "PKG0001")
+            self.assertIsNone(index.location("PKG0002"))
+            
+            # A new instance loads the persisted index instead of rescanning
+            reopened = SpatialIndex(tmp)
+            with mock.patch.object(package_db, "iter_packages", side_effect=AssertionError("rescanned")):
+                reopened.attach(package_db)
+            self.assertEqual(len(reopened), 299)
+            self.assertEqual(reopened.location("PKG0001"), (depot[0] + 1.0, depot[1] + 1.0))
+            
+            # A write made without the index attached is caught on the next attach
+            detached = PackageDatabase(tmp)
+            moved = detached.get_package_by_id("PKG0003")
+            moved.latitude, moved.longitude = depot[0] - 1.0, depot[1] - 1.0
+            detached.update_package(moved)
+            stale = SpatialIndex(tmp)
+            stale.attach(detached)
+            self.assertEqual(stale.location("PKG0003"), (depot[0] - 1.0, depot[1] - 1.0))
+    
+    def test_compaction_and_source_updates(self):
+        """Test 36b: A compaction keeps new points and status updates leave the source file alone."""
+        depot = routing.DEPOT_LOCATION
+        with tempfile.TemporaryDirectory() as tmp:
+            package_db = PackageDatabase(tmp)
+            index = SpatialIndex(tmp)
+            index._journal.compact_threshold = 1
+            index.attach(package_db)
+            package_db.add_package(Package("PKG0001", "S", "R", "A", "0912", 1.0, "Other",
+                                           latitude=depot[0], longitude=depot[1]))
+            index._journal.wait()
+            self.assertEqual(index.location("PKG0001"), depot)
+            self.assertEqual(SpatialIndex(tmp).location("PKG0001"), depot)
+            
+            source = os.stat(index.source_file).st_mtime_ns
+            package = package_db.get_package_by_id("PKG0001")
+            package.update_status("In Transit")
+            package_db.update_package(package)
+            self.assertEqual(os.stat(index.source_file).st_mtime_ns, source)
+            
+            # close() records the status update, so reopening does not rescan
+            index.close()
+            reopened = SpatialIndex(tmp)
+            with mock.patch.object(package_db, "iter_packages", side_effect=AssertionError("rescanned")):
+                reopened.attach(package_db)
+            self.assertEqual(reopened.location("PKG0001"), depot)
+
+
 if __name__ == "__main__":
-    print("Running 5 Simple Unit Tests for FreshRoute Logistics\n")
+    print("Running Unit Tests for FreshRoute Logistics\n")
     unittest.main(verbosity=2)
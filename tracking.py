@@ -53,13 +53,10 @@ def mark_route_out_for_delivery(route_db, package_db):
         utils.pause()
         return
     
-    count = 0
-    for pkg_id in route.package_ids:
-        pkg = package_db.get_package_by_id(pkg_id)
-        if pkg:
-            pkg.update_status("Out for Delivery")
-            package_db.update_package(pkg)
-            count += 1
+    packages = package_db.get_packages_by_ids(route.package_ids)
+    for pkg in packages:
+        pkg.update_status("Out for Delivery")
+    count = package_db.update_packages(packages)
     
     utils.print_success(f"{count} packages marked as Out for Delivery")
     utils.pause()